@@ -0,0 +1,7 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Performance benchmarks for the REST server
+"""
@@ -0,0 +1,89 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Route dispatch microbenchmark
+
+Compares matching request paths using the :class:`~c4.rest.server.routing.RouteTrie`
+against Tornado's linear scan over regular expressions for growing numbers of routes.
+
+Usage::
+
+    python -m benchmarks.dispatch [--routes 10 100 1000] [--lookups 100000]
+"""
+import argparse
+import json
+import re
+import timeit
+
+from c4.rest.server.routing import PARAMETER_PATTERN, RouteTrie
+
+
+def createRoutes(count):
+    """
+    Create a mix of static and parameterized routes
+
+    :param count: number of routes
+    :type count: int
+    :returns: routes
+    :rtype: [str]
+    """
+    routes = []
+    for index in range(count // 2):
+        routes.append("/api/static{0}".format(index))
+        routes.append("/api/resource{0}/{{name}}/items/{{item}}".format(index))
+    return routes
+
+def toRegex(path):
+    """
+    Convert route into the equivalent Tornado regular expression
+    """
+    segments = []
+    for segment in path.split("/"):
+        match = PARAMETER_PATTERN.match(segment)
+        segments.append("(?P<{0}>[^/]+)".format(match.group(1)) if match else re.escape(segment))
+    return re.compile("/".join(segments) + "$")
+
+def linearMatch(patterns, path):
+    """
+    Match like Tornado's default router by trying each pattern in order
+    """
+    for pattern, target in patterns:
+        match = pattern.match(path)
+        if match:
+            return target, match.groupdict()
+    return None
+
+def main():
+    """
+    Run dispatch benchmark
+    """
+    parser = argparse.ArgumentParser(description="route dispatch microbenchmark")
+    parser.add_argument("--routes", type=int, nargs="+", default=[10, 100, 1000], help="numbers of routes")
+    parser.add_argument("--lookups", type=int, default=100000, help="number of lookups per measurement")
+    args = parser.parse_args()
+
+    results = []
+    for count in args.routes:
+        routes = createRoutes(count)
+        trie = RouteTrie()
+        for path in routes:
+            trie.add(path, path)
+        patterns = [(toRegex(path), path) for path in routes]
+
+        # worst case for the linear scan is the last route
+        path = "/api/resource{0}/node1/items/cpu".format(count // 2 - 1)
+        assert trie.match(path)[0] == linearMatch(patterns, path)[0]
+
+        trieTime = timeit.timeit(lambda: trie.match(path), number=args.lookups)
+        linearTime = timeit.timeit(lambda: linearMatch(patterns, path), number=args.lookups)
+        results.append({
+            "routes": len(routes),
+            "trieMicroseconds": trieTime / args.lookups * 1e6,
+            "linearMicroseconds": linearTime / args.lookups * 1e6
+        })
+    print(json.dumps(results, indent=4, sort_keys=True, separators=(',', ': ')))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Response encoding benchmark
+
+Builds the node map, node list and cluster status payloads from the
+in-memory backend in :mod:`benchmarks.fakebackend` for each configured
+cluster size and measures encode time and encoded size for every encoding
+in the registry of :mod:`c4.rest.server.encoding`. Encodings whose
+packages are not installed are skipped.
+
+Usage::
+
+    python -m benchmarks.encoding [--nodes 10 100 1000] [--devices 3] [--repeat 20] [--output results.json]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+
+import tornado
+
+from benchmarks.fakebackend import FakeConfiguration, FakeDeviceHistory
+import c4.rest.server
+from c4.rest.handlers.nodes import NodeMap
+from c4.rest.handlers.status import formatStatus
+from c4.rest.server.encoding import ENCODERS
+
+
+def createPayloads(nodes, devices):
+    """
+    Create the payloads of the node map, node list and cluster status routes
+
+    :param nodes: number of nodes
+    :type nodes: int
+    :param devices: number of devices per node
+    :type devices: int
+    :returns: route to JSON serializable payload mapping
+    :rtype: dict
+    """
+    configuration = FakeConfiguration(nodes, devices)
+    deviceHistory = FakeDeviceHistory(configuration)
+    nodeNames = configuration.getNodeNames()
+
+    nodeMap = NodeMap()
+    for node in nodeNames:
+        nodeMap.add(configuration.getNode(node, includeDevices=False))
+
+    status = {"nodes": {}}
+    for node in nodeNames:
+        status["nodes"][node] = dict(
+            (device, formatStatus(deviceHistory.getLatest(node, device).status.toJSONSerializable(), None, None))
+            for device in configuration.getNode(node).devices
+        )
+
+    return {
+        "/api/nodes": json.loads(nodeMap.toJSON(pretty=True)),
+        "/api/nodes/": {"description": "list of nodes", "list": nodeNames},
+        "/api/status": status
+    }
+
+def measureEncoding(encoder, payload, repeat):
+    """
+    Measure encoding a payload
+
+    :param encoder: encoder
+    :type encoder: :class:`~c4.rest.server.encoding.Encoder`
+    :param payload: JSON serializable payload
+    :param repeat: number of repetitions
+    :type repeat: int
+    :returns: measurement
+    :rtype: dict
+    """
+    encoded = encoder.encode(payload)
+    if not isinstance(encoded, bytes):
+        encoded = encoded.encode("utf-8")
+    times = timeit.repeat(lambda: encoder.encode(payload), number=1, repeat=repeat)
+    return {
+        "encoding": encoder.mediaType,
+        "size": len(encoded),
+        "encodeTime": {
+            "min": min(times),
+            "mean": sum(times) / len(times)
+        }
+    }
+
+def runBenchmark(nodes, devices, repeat):
+    """
+    Measure all encodings of all payloads for the specified cluster size
+
+    :param nodes: number of nodes
+    :type nodes: int
+    :param devices: number of devices per node
+    :type devices: int
+    :param repeat: number of repetitions
+    :type repeat: int
+    :returns: measurements
+    :rtype: [dict]
+    """
+    results = []
+    for route, payload in sorted(createPayloads(nodes, devices).items()):
+        for encoder in ENCODERS.values():
+            result = measureEncoding(encoder, payload, repeat)
+            result.update({"route": route, "nodes": nodes, "devices": devices})
+            results.append(result)
+            sys.stderr.write("{nodes} nodes {route} {encoding}: {size} bytes, {mean:.6f}s\n".format(
+                mean=result["encodeTime"]["mean"], **result))
+    return results
+
+def main():
+    """
+    Run encoding benchmark
+    """
+    parser = argparse.ArgumentParser(description="REST server response encoding benchmark")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10, 100, 1000], help="numbers of nodes")
+    parser.add_argument("--devices", type=int, default=3, help="number of devices per node")
+    parser.add_argument("--repeat", type=int, default=20, help="number of times each payload is encoded")
+    parser.add_argument("--output", help="JSON result file")
+    args = parser.parse_args()
+
+    results = {
+        "version": c4.rest.server.__version__,
+        "python": platform.python_version(),
+        "tornado": tornado.version,
+        "timestamp": time.time(),
+        "encodings": list(ENCODERS),
+        "results": []
+    }
+    for nodes in args.nodes:
+        results["results"].extend(runBenchmark(nodes, args.devices, args.repeat))
+
+    output = json.dumps(results, indent=4, sort_keys=True, separators=(',', ': '))
+    if args.output:
+        with open(args.output, "w") as outputFile:
+            outputFile.write(output)
+    print(output)
+
+if __name__ == '__main__':
+    main()
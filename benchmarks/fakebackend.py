@@ -0,0 +1,142 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+In-memory stand-in for the backend
+
+Provides the parts of the backend used by the REST handlers, the node and
+device configuration and the latest device status, for an arbitrary
+number of nodes and devices without database or system manager processes.
+"""
+import random
+import time
+
+from c4.system.backend import Backend
+from c4.system.configuration import (DeviceInfo,
+                                     NodeInfo,
+                                     Roles)
+from c4.utils.jsonutil import JSONSerializable
+
+
+# device types of generated devices, the first devices of a node are named after them
+DEVICE_TYPES = [
+    ("cpu", "c4.devices.cpu.Cpu"),
+    ("disk", "c4.devices.disk.Disk"),
+    ("memory", "c4.devices.mem.Memory")
+]
+
+class FakeConfiguration(object):
+    """
+    In-memory node and device configuration
+
+    :param nodes: number of nodes
+    :type nodes: int
+    :param devices: number of devices per node
+    :type devices: int
+    """
+    def __init__(self, nodes=10, devices=3):
+        self.nodes = {}
+        for nodeIndex in range(nodes):
+            name = "node{0}".format(nodeIndex + 1)
+            nodeInfo = NodeInfo(name, "tcp://127.0.0.1:{0}".format(5000 + nodeIndex),
+                                role=Roles.ACTIVE if nodeIndex == 0 else Roles.PASSIVE)
+            for deviceName in getDeviceNames(devices):
+                nodeInfo.addDevice(DeviceInfo(deviceName, getDeviceType(deviceName)))
+            self.nodes[name] = nodeInfo
+        self.nodeNames = sorted(self.nodes)
+
+    def getNodeNames(self):
+        """
+        Get node names
+        """
+        return list(self.nodeNames)
+
+    def getNode(self, node, includeDevices=True, flatDeviceHierarchy=False): # pylint: disable=unused-argument
+        """
+        Get node information, generated devices have no hierarchy so it is always flat
+        """
+        nodeInfo = self.nodes.get(node)
+        if nodeInfo is None or includeDevices:
+            return nodeInfo
+        return NodeInfo(nodeInfo.name, nodeInfo.address, role=nodeInfo.role, state=nodeInfo.state)
+
+class FakeStatus(JSONSerializable):
+    """
+    Device status with random utilization
+    """
+    def __init__(self):
+        self.state = "running"
+        self.timestamp = time.time()
+        self.usage = random.uniform(0, 100)
+
+class FakeEntry(object):
+    """
+    Device history entry
+    """
+    def __init__(self, status):
+        self.status = status
+        self.timestamp = status.timestamp
+
+class FakeDeviceHistory(object):
+    """
+    Device history that reports a new random status for every known device
+    """
+    def __init__(self, configuration):
+        self.configuration = configuration
+
+    def getLatest(self, node, name):
+        """
+        Get latest status of a device
+        """
+        nodeInfo = self.configuration.nodes.get(node)
+        if nodeInfo is None or name not in nodeInfo.devices:
+            return None
+        return FakeEntry(FakeStatus())
+
+class FakeBackend(object):
+    """
+    In-memory backend implementation
+
+    :param nodes: number of nodes
+    :type nodes: int
+    :param devices: number of devices per node
+    :type devices: int
+    """
+    def __init__(self, nodes=10, devices=3):
+        self.configuration = FakeConfiguration(nodes, devices)
+        self.deviceHistory = FakeDeviceHistory(self.configuration)
+
+def getDeviceNames(devices):
+    """
+    Get names of the generated devices of a node
+
+    :param devices: number of devices per node
+    :type devices: int
+    :returns: device names
+    :rtype: [str]
+    """
+    names = [name for name, _ in DEVICE_TYPES[:devices]]
+    names.extend("device{0}".format(index) for index in range(len(names) + 1, devices + 1))
+    return names
+
+def getDeviceType(name):
+    """
+    Get type of a generated device
+    """
+    return dict(DEVICE_TYPES).get(name, "c4.devices.Unknown")
+
+def installFakeBackend(nodes=10, devices=3):
+    """
+    Replace the backend with an in-memory one
+
+    :param nodes: number of nodes
+    :type nodes: int
+    :param devices: number of devices per node
+    :type devices: int
+    :returns: fake backend
+    :rtype: :class:`FakeBackend`
+    """
+    fakeBackend = FakeBackend(nodes, devices)
+    Backend(implementation=fakeBackend)
+    return fakeBackend
@@ -0,0 +1,135 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+TLS handshake throughput benchmark
+
+Measures full and resumed handshakes per second against a TLS server using
+a context created by :func:`~c4.rest.server.tls.createSSLContext`. If no
+certificate and key are specified a self-signed one is generated using ``openssl``.
+
+Usage::
+
+    python -m benchmarks.handshake [--handshakes 500] [--certfile cert.pem --keyfile key.pem]
+"""
+import argparse
+import json
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+
+from c4.rest.server.tls import createSSLContext
+
+
+def generateCertificate(directory):
+    """
+    Generate a self-signed certificate for localhost
+
+    :param directory: output directory
+    :type directory: str
+    :returns: certificate and key file
+    :rtype: (str, str)
+    """
+    certfile = directory + "/cert.pem"
+    keyfile = directory + "/key.pem"
+    subprocess.check_call(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+                           "-subj", "/CN=localhost", "-days", "1",
+                           "-keyout", keyfile, "-out", certfile],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return certfile, keyfile
+
+def serve(serverSocket, context, stopped):
+    """
+    Accept connections and complete handshakes until stopped
+    """
+    while not stopped.is_set():
+        try:
+            connection, _ = serverSocket.accept()
+        except socket.timeout:
+            continue
+        try:
+            sslConnection = context.wrap_socket(connection, server_side=True)
+            # TLS 1.3 sends session tickets after the handshake, make sure the client gets them
+            sslConnection.sendall(b"x")
+            sslConnection.close()
+        except (ssl.SSLError, socket.error):
+            connection.close()
+
+def measure(port, handshakes, resume):
+    """
+    Perform handshakes and return the rate per second
+    """
+    clientContext = ssl.SSLContext(getattr(ssl, "PROTOCOL_TLS_CLIENT", ssl.PROTOCOL_SSLv23))
+    clientContext.check_hostname = False
+    clientContext.verify_mode = ssl.CERT_NONE
+    session = None
+    resumed = 0
+    start = time.time()
+    for _ in range(handshakes):
+        connection = socket.create_connection(("127.0.0.1", port))
+        if resume and session is not None:
+            sslConnection = clientContext.wrap_socket(connection, session=session)
+        else:
+            sslConnection = clientContext.wrap_socket(connection)
+        sslConnection.recv(1)
+        if resume:
+            resumed += 1 if sslConnection.session_reused else 0
+            session = sslConnection.session
+        sslConnection.close()
+    elapsed = time.time() - start
+    return {
+        "handshakes": handshakes,
+        "resumed": resumed,
+        "seconds": elapsed,
+        "handshakesPerSecond": handshakes / elapsed
+    }
+
+def main():
+    """
+    Run handshake benchmark
+    """
+    parser = argparse.ArgumentParser(description="TLS handshake throughput benchmark")
+    parser.add_argument("--handshakes", type=int, default=500, help="number of handshakes per measurement")
+    parser.add_argument("--certfile", help="certificate file")
+    parser.add_argument("--keyfile", help="key file")
+    parser.add_argument("--no-tickets", action="store_true", help="disable session tickets")
+    args = parser.parse_args()
+
+    directory = None
+    certfile, keyfile = args.certfile, args.keyfile
+    if not certfile:
+        directory = tempfile.mkdtemp()
+        certfile, keyfile = generateCertificate(directory)
+
+    try:
+        context = createSSLContext(certfile, keyfile, sessionTickets=not args.no_tickets)
+        serverSocket = socket.socket()
+        serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        serverSocket.bind(("127.0.0.1", 0))
+        serverSocket.listen(128)
+        serverSocket.settimeout(0.1)
+        stopped = threading.Event()
+        server = threading.Thread(target=serve, args=(serverSocket, context, stopped))
+        server.daemon = True
+        server.start()
+
+        port = serverSocket.getsockname()[1]
+        results = {
+            "full": measure(port, args.handshakes, resume=False),
+            "resumed": measure(port, args.handshakes, resume=True),
+        }
+        stopped.set()
+        server.join()
+        serverSocket.close()
+        print(json.dumps(results, indent=4, sort_keys=True, separators=(',', ': ')))
+    finally:
+        if directory:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main()
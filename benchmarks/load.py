@@ -0,0 +1,200 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+REST server load benchmark
+
+Starts a :class:`~c4.rest.server.tornadoserver.RestServerProcess` against the
+in-memory backend from :mod:`benchmarks.fakebackend` for each configured
+cluster size and drives concurrent load per route with an asynchronous
+client. Throughput and latency percentiles per route are written as JSON
+so results of different versions can be compared.
+
+Usage::
+
+    python -m benchmarks.load [--nodes 10 100 50000] [--devices 3] [--requests 500]
+                              [--concurrency 50] [--workers 1] [--output results.json]
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from tornado import gen
+from tornado.httpclient import AsyncHTTPClient
+from tornado.ioloop import IOLoop
+from tornado.netutil import bind_sockets
+import tornado
+
+from benchmarks.fakebackend import getDeviceNames, installFakeBackend
+import c4.rest.server
+from c4.rest.server import RestServerProcess
+
+
+# routes to measure, parameters are filled in with random nodes and devices
+ROUTES = [
+    "/api",
+    "/api/nodes/",
+    "/api/nodes",
+    "/api/nodes/{node}/devices/{device}/status",
+    "/api/status"
+]
+
+def getPercentile(latencies, percentile):
+    """
+    Get percentile of sorted latencies using the nearest rank
+
+    :param latencies: sorted latencies
+    :type latencies: [float]
+    :param percentile: percentile between 0 and 100
+    :type percentile: float
+    :returns: percentile or ``None`` if there are no latencies
+    :rtype: float
+    """
+    if not latencies:
+        return None
+    return latencies[min(int(len(latencies) * percentile / 100.0), len(latencies) - 1)]
+
+@gen.coroutine
+def measureRoute(url, route, nodes, devices, requests, concurrency):
+    """
+    Send requests to a route from a number of concurrent clients
+
+    :param url: server url
+    :type url: str
+    :param route: route, ``{node}`` and ``{device}`` are replaced by random names
+    :type route: str
+    :param nodes: number of nodes
+    :type nodes: int
+    :param devices: number of devices per node
+    :type devices: int
+    :param requests: total number of requests
+    :type requests: int
+    :param concurrency: number of concurrent requests
+    :type concurrency: int
+    :returns: measurement
+    :rtype: dict
+    """
+    client = AsyncHTTPClient(max_clients=concurrency)
+    deviceNames = getDeviceNames(devices)
+    latencies = []
+    errors = [0]
+    remaining = [requests]
+
+    @gen.coroutine
+    def worker():
+        """
+        Send requests one after another until all requests are sent
+        """
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            path = route.format(node="node{0}".format(random.randint(1, nodes)),
+                                device=random.choice(deviceNames))
+            start = time.time()
+            response = yield client.fetch(url + path, raise_error=False, request_timeout=300)
+            latencies.append(time.time() - start)
+            if response.code != 200:
+                errors[0] += 1
+
+    start = time.time()
+    yield [worker() for _ in range(concurrency)]
+    duration = time.time() - start
+
+    latencies.sort()
+    raise gen.Return({
+        "route": route,
+        "requests": requests,
+        "errors": errors[0],
+        "throughput": requests / duration,
+        "latency": {
+            "mean": sum(latencies) / len(latencies),
+            "p50": getPercentile(latencies, 50),
+            "p90": getPercentile(latencies, 90),
+            "p99": getPercentile(latencies, 99),
+            "max": latencies[-1]
+        }
+    })
+
+def runBenchmark(nodes, devices, routes, requests, concurrency, workers):
+    """
+    Measure all routes against a server with the specified cluster size
+
+    :param nodes: number of nodes
+    :type nodes: int
+    :param devices: number of devices per node
+    :type devices: int
+    :param routes: routes
+    :type routes: [str]
+    :param requests: number of requests per route
+    :type requests: int
+    :param concurrency: number of concurrent requests
+    :type concurrency: int
+    :param workers: number of server worker processes
+    :type workers: int
+    :returns: measurements
+    :rtype: [dict]
+    """
+    # server process inherits the fake backend when forked
+    installFakeBackend(nodes, devices)
+    sockets = bind_sockets(0, "127.0.0.1")
+    url = "http://127.0.0.1:{0}".format(sockets[0].getsockname()[1])
+    process = RestServerProcess("node1", sockets=sockets, workers=workers,
+                                history={"interval": 0}, device_status={"timeout": 60})
+    process.start()
+    try:
+        if not process.ready.wait(60):
+            raise RuntimeError("REST server did not start")
+
+        results = []
+        for route in routes:
+            result = IOLoop.current().run_sync(
+                lambda: measureRoute(url, route, nodes, devices, requests, concurrency))
+            result.update({"nodes": nodes, "devices": devices})
+            results.append(result)
+            sys.stderr.write("{nodes} nodes {route}: {throughput:.1f} requests/s, p99 {p99:.4f}s, {errors} errors\n".format(
+                p99=result["latency"]["p99"], **result))
+        return results
+    finally:
+        process.terminate()
+        process.join()
+        for serverSocket in sockets:
+            serverSocket.close()
+
+def main():
+    """
+    Run load benchmark
+    """
+    parser = argparse.ArgumentParser(description="REST server load benchmark")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10, 100], help="numbers of nodes")
+    parser.add_argument("--devices", type=int, default=3, help="number of devices per node")
+    parser.add_argument("--routes", nargs="+", default=ROUTES, help="routes to measure")
+    parser.add_argument("--requests", type=int, default=500, help="number of requests per route")
+    parser.add_argument("--concurrency", type=int, default=50, help="number of concurrent requests")
+    parser.add_argument("--workers", type=int, default=1, help="number of server worker processes")
+    parser.add_argument("--output", help="JSON result file")
+    args = parser.parse_args()
+
+    results = {
+        "version": c4.rest.server.__version__,
+        "python": platform.python_version(),
+        "tornado": tornado.version,
+        "timestamp": time.time(),
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "results": []
+    }
+    for nodes in args.nodes:
+        results["results"].extend(runBenchmark(nodes, args.devices, args.routes,
+                                               args.requests, args.concurrency, args.workers))
+
+    output = json.dumps(results, indent=4, sort_keys=True, separators=(',', ': '))
+    if args.output:
+        with open(args.output, "w") as outputFile:
+            outputFile.write(output)
+    print(output)
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,18 @@ This project is licensed under the MIT License, see LICENSE
 
 REST service device manager
 """
-from c4.rest.server import RestServerProcess
+import os
+import signal
+import threading
+import time
+
+from tornado.httpclient import HTTPClient
+from tornado.netutil import bind_sockets
+
+from c4.rest.server import (RestServerProcess,
+                            bindUnixSocket,
+                            createConfigurationChange,
+                            createNodeStateChange)
 from c4.system.configuration import States
 from c4.system.deviceManager import (DeviceManagerImplementation, DeviceManagerStatus,
                                      operation)
@@ -21,6 +32,36 @@ class RESTServer(DeviceManagerImplementation):
     def __init__(self, host, name, properties=None):
         super(RESTServer, self).__init__(host, name, properties=properties)
         self.restServerProcess = None
+        self.sockets = None
+        self.unixSockets = None
+        self.processLock = threading.RLock()
+        self.supervisor = None
+
+    def createRestServerProcess(self):
+        """
+        Create a REST server process that serves on the listening sockets
+        owned by this device manager. The sockets are bound on first use
+        and kept open across restarts so that no connections are refused.
+
+        :returns: REST server process
+        :rtype: :class:`~c4.rest.server.tornadoserver.RestServerProcess`
+        """
+        if self.sockets is None:
+            self.sockets = bind_sockets(int(self.properties.get("port", 8888)))
+            self.unixSockets = []
+            if "unix_socket" in self.properties:
+                self.unixSockets.append(bindUnixSocket(**self.properties["unix_socket"]))
+
+        arguments = {
+            "node": self.node,
+            "sockets": self.sockets,
+            "unixSockets": self.unixSockets
+        }
+        for key in ("port", "ssl_options", "circuit_breaker", "cache", "workers", "device_status", "history", "jobs",
+                    "admin_token", "slow_requests", "change_log", "async_logging", "unix_socket", "shutdown_timeout"):
+            if key in self.properties:
+                arguments[key] = self.properties[key]
+        return RestServerProcess(**arguments)
 
     def handleLocalStartDeviceManager(self, message, envelope):
         """
@@ -46,6 +87,43 @@ class RESTServer(DeviceManagerImplementation):
         self.stop()
         return super(RESTServer, self).handleLocalStopDeviceManager(message, envelope)
 
+    def handleConfigurationChanged(self, message, envelope): # pylint: disable=unused-argument
+        """
+        Handle configuration changed messages, i.e., the configuration version
+        was bumped, by invalidating the caches of the REST server
+
+        :param message: message with the new configuration ``version``
+        :type message: dict
+        :param envelope: envelope
+        :type envelope: :class:`~c4.system.messages.Envelope`
+        """
+        self.notifyChange(createConfigurationChange(message.get("version")))
+
+    def handleNodeStateChanged(self, message, envelope): # pylint: disable=unused-argument
+        """
+        Handle node state changed messages by invalidating the caches of the REST server
+
+        :param message: message with the ``node`` and its new ``state``
+        :type message: dict
+        :param envelope: envelope
+        :type envelope: :class:`~c4.system.messages.Envelope`
+        """
+        state = message.get("state")
+        self.notifyChange(createNodeStateChange(message.get("node"), getattr(state, "name", state)))
+
+    def notifyChange(self, change):
+        """
+        Push a configuration change into the REST server process
+
+        :param change: change, see :mod:`c4.rest.server.changes`
+        :type change: dict
+        """
+        with self.processLock:
+            process = self.restServerProcess
+        # sending does not block but do not hold up restarts while doing it
+        if process and process.is_alive():
+            process.notifyChange(change)
+
     @operation
     def start(self, isRecovery=False):
         """
@@ -55,38 +133,95 @@ class RESTServer(DeviceManagerImplementation):
             self.log.info("%s received start request, but state is already STARTING.", self.name)
             return
 
-        if self.restServerProcess and self.restServerProcess.is_alive():
-            self.log.info("REST server already started")
-            self.state = States.RUNNING
-        else:
-            self.state = States.STARTING
-            if self.restServerProcess:
-                self.log.info("Start requested after restServerProcess died, cleaning up old process")
-                self.stop()
-                
-            arguments = {
-                "node": self.node
-            }
-            if "port" in self.properties:
-                arguments["port"] = self.properties["port"]
-            if "ssl_options" in self.properties:
-                arguments["ssl_options"] = self.properties["ssl_options"]
-            self.restServerProcess = RestServerProcess(**arguments)
-            self.restServerProcess.start()
-            if isRecovery:
-                self.monitor.report(self.monitor.SUCCESS if self.restServerProcess.is_alive() else self.monitor.FAILURE)
-
-            self.state = States.RUNNING
+        with self.processLock:
+            if self.restServerProcess and self.restServerProcess.is_alive():
+                self.log.info("REST server already started")
+                self.state = States.RUNNING
+            else:
+                self.state = States.STARTING
+                if self.restServerProcess:
+                    self.log.info("Start requested after restServerProcess died, cleaning up old process")
+                    self.stopProcess(self.restServerProcess)
+
+                self.restServerProcess = self.createRestServerProcess()
+                self.restServerProcess.start()
+                if isRecovery:
+                    self.monitor.report(self.monitor.SUCCESS if self.restServerProcess.is_alive() else self.monitor.FAILURE)
+
+                self.state = States.RUNNING
+
+            if self.supervisor is None:
+                self.supervisor = RESTServerSupervisor(self, **self.properties.get("supervisor", {}))
+                self.supervisor.start()
 
     @operation
     def stop(self):
         """
-        Stop REST server
+        Stop REST server after draining in-flight requests
+        """
+        if self.supervisor:
+            self.supervisor.stop()
+            self.supervisor = None
+        with self.processLock:
+            if self.restServerProcess:
+                self.stopProcess(self.restServerProcess)
+                self.restServerProcess = None
+            for listeningSocket in (self.sockets or []) + (self.unixSockets or []):
+                listeningSocket.close()
+            self.sockets = None
+            self.unixSockets = None
+
+    @operation
+    def restart(self):
+        """
+        Restart REST server without refusing connections. A new process is
+        started on the same listening sockets and the old process is only
+        drained and stopped once the new one is ready.
         """
-        if self.restServerProcess and self.restServerProcess.is_alive():
-            self.restServerProcess.terminate()
-            self.restServerProcess.join()
-            self.restServerProcess = None
+        with self.processLock:
+            oldProcess = self.restServerProcess
+            newProcess = self.createRestServerProcess()
+            newProcess.start()
+            if not newProcess.ready.wait(float(self.properties.get("startup_timeout", 30.0))):
+                self.log.error("new REST server process did not become ready, keeping existing one")
+                self.stopProcess(newProcess)
+                return
+            self.restServerProcess = newProcess
+            if oldProcess:
+                self.stopProcess(oldProcess)
+            self.log.info("REST server restarted")
+
+    def recover(self):
+        """
+        Replace a dead or unresponsive REST server process with a new one
+        """
+        with self.processLock:
+            if self.restServerProcess:
+                # an unresponsive process will not drain, do not wait for the full shutdown timeout
+                self.stopProcess(self.restServerProcess, timeout=1.0)
+                self.restServerProcess = None
+            self.start(isRecovery=True)
+
+    def stopProcess(self, process, timeout=None):
+        """
+        Stop the REST server process gracefully. The process stops accepting
+        connections and drains in-flight requests, if it does not exit within
+        the shutdown timeout it is killed.
+
+        :param process: REST server process
+        :type process: :class:`~c4.rest.server.tornadoserver.RestServerProcess`
+        :param timeout: seconds to wait before killing the process, defaults to the shutdown timeout
+        :type timeout: float
+        """
+        if timeout is None:
+            timeout = process.shutdown_timeout + 5
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout)
+            if process.is_alive():
+                self.log.warning("REST server process %s did not exit after draining, killing it", process.pid)
+                os.kill(process.pid, signal.SIGKILL)
+        process.join()
 
     def handleStatus(self):
         """
@@ -98,7 +233,122 @@ class RESTServer(DeviceManagerImplementation):
             if not isAlive:
                 # Handle case where is_alive() returns None (which is not boolean)
                 isAlive = False
-        return RESTServerStatus(self.state, isAlive=isAlive)
+        statistics = {}
+        if self.restServerProcess:
+            statistics = self.restServerProcess.statistics.snapshot()
+            statistics["startupTime"] = self.restServerProcess.startupTime.value or None
+        if self.supervisor:
+            statistics["probeLatency"] = self.supervisor.probeLatency
+            statistics["restarts"] = self.supervisor.restarts
+        return RESTServerStatus(self.state, isAlive=isAlive, **statistics)
+
+@ClassLogger
+class RESTServerSupervisor(threading.Thread):
+    """
+    Periodically probes the REST server health route and restarts a server
+    that died or stopped answering, backing off exponentially between restarts
+
+    :param restServer: REST server device manager
+    :type restServer: :class:`RESTServer`
+    :param interval: seconds between probes
+    :type interval: float
+    :param timeout: probe timeout in seconds
+    :type timeout: float
+    :param failureThreshold: number of consecutive failed probes after which the server is restarted
+    :type failureThreshold: int
+    :param initialBackoff: minimum seconds between restarts
+    :type initialBackoff: float
+    :param maxBackoff: maximum seconds between restarts
+    :type maxBackoff: float
+    """
+    def __init__(self, restServer, interval=10.0, timeout=2.0, failureThreshold=3, initialBackoff=1.0, maxBackoff=300.0):
+        super(RESTServerSupervisor, self).__init__(name="REST server supervisor")
+        self.daemon = True
+        self.restServer = restServer
+        self.interval = float(interval)
+        self.timeout = float(timeout)
+        self.failureThreshold = int(failureThreshold)
+        self.initialBackoff = float(initialBackoff)
+        self.maxBackoff = float(maxBackoff)
+        self.backoff = self.initialBackoff
+        self.nextRestart = 0
+        self.failures = 0
+        self.probeLatency = None
+        self.restarts = 0
+        self.stopped = threading.Event()
+
+        scheme = "https" if "ssl_options" in restServer.properties else "http"
+        self.url = "{0}://127.0.0.1:{1}/api/health".format(scheme, restServer.properties.get("port", 8888))
+
+    def probe(self):
+        """
+        Probe the health route
+
+        :returns: probe latency in seconds or ``None`` if the probe failed
+        :rtype: float
+        """
+        client = HTTPClient()
+        start = time.time()
+        try:
+            client.fetch(self.url, connect_timeout=self.timeout, request_timeout=self.timeout, validate_cert=False)
+            return time.time() - start
+        except Exception as exception:
+            self.log.warning("REST server health probe failed: %s", exception)
+            return None
+        finally:
+            client.close()
+
+    def check(self):
+        """
+        Probe the REST server and restart it if necessary
+        """
+        process = self.restServer.restServerProcess
+        if process is None or self.restServer.state != States.RUNNING:
+            return
+
+        if process.is_alive():
+            self.probeLatency = self.probe()
+            if self.probeLatency is not None:
+                self.failures = 0
+                # changes dropped while a worker did not read them
+                process.flushChanges()
+                if time.time() >= self.nextRestart + self.maxBackoff:
+                    # server has been healthy for a while
+                    self.backoff = self.initialBackoff
+                return
+            self.failures += 1
+            if self.failures < self.failureThreshold:
+                return
+            self.log.error("REST server did not answer %d health probes", self.failures)
+        else:
+            self.probeLatency = None
+            self.log.error("REST server process died")
+
+        if time.time() < self.nextRestart:
+            return
+        self.restarts += 1
+        self.failures = 0
+        self.nextRestart = time.time() + self.backoff
+        self.backoff = min(self.backoff * 2, self.maxBackoff)
+        self.restServer.recover()
+
+    def run(self):
+        """
+        Supervise until stopped
+        """
+        while not self.stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as exception:
+                self.log.exception(exception)
+
+    def stop(self):
+        """
+        Stop supervising
+        """
+        self.stopped.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
 
 class RESTServerStatus(DeviceManagerStatus):
     """
@@ -108,8 +358,43 @@ class RESTServerStatus(DeviceManagerStatus):
     :type state: :class:`~c4.system.configuration.States`
     :param isAlive: tornado server isAlive
     :type isAlive: boolean
+    :param probeLatency: latency of the last health probe in seconds, ``None`` if it failed
+    :type probeLatency: float
+    :param restarts: number of restarts by the supervisor
+    :type restarts: int
+    :param requests: number of requests served
+    :type requests: int
+    :param requestRate: requests per second since the previous status
+    :type requestRate: float
+    :param latencyP50: median request latency in seconds since the previous status
+    :type latencyP50: float
+    :param latencyP99: 99th percentile request latency in seconds since the previous status
+    :type latencyP99: float
+    :param openConnections: number of open connections
+    :type openConnections: int
+    :param executorQueueDepth: number of backend tasks waiting for an executor thread
+    :type executorQueueDepth: int
+    :param cacheHitRatio: response cache hit ratio
+    :type cacheHitRatio: float
+    :param rss: resident set size of the REST server processes in bytes
+    :type rss: int
+    :param startupTime: seconds from starting the REST server process until it was serving
+    :type startupTime: float
     """
-    def __init__(self, state, isAlive=True):
+    def __init__(self, state, isAlive=True, probeLatency=None, restarts=0,
+                 requests=0, requestRate=None, latencyP50=None, latencyP99=None,
+                 openConnections=0, executorQueueDepth=0, cacheHitRatio=None, rss=None, startupTime=None):
         super(RESTServerStatus, self).__init__()
         self.state = state
         self.isAlive = isAlive
+        self.probeLatency = probeLatency
+        self.restarts = restarts
+        self.requests = requests
+        self.requestRate = requestRate
+        self.latencyP50 = latencyP50
+        self.latencyP99 = latencyP99
+        self.openConnections = openConnections
+        self.executorQueueDepth = executorQueueDepth
+        self.cacheHitRatio = cacheHitRatio
+        self.rss = rss
+        self.startupTime = startupTime
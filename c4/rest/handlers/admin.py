@@ -0,0 +1,200 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+REST API administrative request handlers
+"""
+import json
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from tornado import gen
+from tornado.web import HTTPError
+
+from c4.rest.server import (AdminRequestHandler,
+                            StackSampler,
+                            getCacheSizes,
+                            route)
+from c4.utils.logutil import ClassLogger
+
+
+# upper limit on the number of seconds to profile
+MAX_PROFILE_DURATION = 60.0
+# lower limit on the seconds between samples, sampling more often keeps the GIL busy and stalls the server
+MIN_PROFILE_INTERVAL = 0.001
+# ways to group allocations, see :meth:`tracemalloc.Snapshot.statistics`
+GROUP_BY = ("lineno", "filename", "traceback")
+
+@ClassLogger
+@route("/api/admin/profile")
+class Profile(AdminRequestHandler):
+    """
+    Handles REST requests for profiling the REST server
+    """
+    # the sampler runs on its own thread so that it neither occupies nor shows up as an executor thread
+    profilerExecutor = ThreadPoolExecutor(1)
+    profiling = threading.Lock()
+
+    @gen.coroutine
+    def get(self):
+        """
+        Sample the stacks of the IOLoop and executor threads of the worker
+        process handling the request for a number of seconds, e.g.,
+        ``?seconds=10&interval=0.005``. By default the profile is returned in
+        the collapsed stack format used by flame graph tools, with
+        ``?format=json`` as stack to count mapping.
+
+        ..
+            @api {get} /api/admin/profile Profile the REST server
+            @apiName GetProfile
+            @apiGroup Admin
+
+            @apiHeader {String} Authorization ``Bearer <admin token>``
+            @apiParam {Number} [seconds=5] Seconds to profile
+            @apiParam {Number} [interval=0.01] Seconds between samples, at least 0.001
+            @apiParam {String} [format=collapsed] ``collapsed`` or ``json``
+        """
+        try:
+            seconds = float(self.get_query_argument("seconds", 5))
+            interval = float(self.get_query_argument("interval", 0.01))
+        except ValueError:
+            raise HTTPError(400, reason="seconds and interval need to be numbers")
+        if not 0 < seconds <= MAX_PROFILE_DURATION or not MIN_PROFILE_INTERVAL <= interval <= seconds:
+            raise HTTPError(400, reason="seconds needs to be at most {0} and interval at least {1} and at most seconds".format(
+                MAX_PROFILE_DURATION, MIN_PROFILE_INTERVAL))
+        outputFormat = self.get_query_argument("format", "collapsed")
+        if outputFormat not in ("collapsed", "json"):
+            raise HTTPError(400, reason="format needs to be collapsed or json")
+
+        if not self.profiling.acquire(False):
+            raise HTTPError(409, reason="Profiling is already in progress")
+        try:
+            self.log.info("profiling for %.3f seconds", seconds)
+            sampler = yield self.profilerExecutor.submit(StackSampler(interval).run, seconds)
+        finally:
+            self.profiling.release()
+
+        if outputFormat == "json":
+            self.write(sampler.toJSONSerializable())
+        else:
+            self.set_header("Content-Type", "text/plain; charset=UTF-8")
+            self.write(sampler.toCollapsed())
+
+@ClassLogger
+@route("/api/admin/memory")
+class Memory(AdminRequestHandler):
+    """
+    Handles REST requests for the memory usage of the REST server
+    """
+    @gen.coroutine
+    def get(self):
+        """
+        Get the sizes of the internal caches of the worker process handling
+        the request and, if allocations are traced, the top allocation sites
+        and their growth since the baseline snapshot. ``?baseline=true``
+        keeps the current snapshot as baseline for the next request.
+
+        ..
+            @api {get} /api/admin/memory Get memory usage of the REST server
+            @apiName GetMemory
+            @apiGroup Admin
+
+            @apiHeader {String} Authorization ``Bearer <admin token>``
+            @apiParam {Number} [limit=20] Number of allocation sites
+            @apiParam {String} [groupBy=lineno] ``lineno``, ``filename`` or ``traceback``
+            @apiParam {Boolean} [baseline=false] Keep the current snapshot as baseline
+        """
+        try:
+            limit = int(self.get_query_argument("limit", 20))
+        except ValueError:
+            raise HTTPError(400, reason="limit needs to be a number")
+        if limit < 1:
+            raise HTTPError(400, reason="limit needs to be positive")
+        groupBy = self.get_query_argument("groupBy", "lineno")
+        if groupBy not in GROUP_BY:
+            raise HTTPError(400, reason="groupBy needs to be one of {0}".format(", ".join(GROUP_BY)))
+        baseline = self.get_query_argument("baseline", "false").lower() == "true"
+
+        tracker = self.application.memoryTracker
+        memory = {
+            "tracing": tracker.tracing,
+            "caches": getCacheSizes(self.application)
+        }
+        if tracker.tracing:
+            # taking and comparing snapshots is expensive
+            statistics = yield self.executor.submit(tracker.getStatistics, limit, groupBy, baseline)
+            if statistics is None:
+                # tracing was stopped in the meantime
+                memory["tracing"] = False
+            else:
+                memory.update(statistics)
+        self.write(memory)
+
+    @gen.coroutine
+    def put(self):
+        """
+        Start or stop tracing allocations in the worker process handling the
+        request. Tracing slows down allocations and should only be enabled
+        while investigating memory usage.
+
+        ..
+            @api {put} /api/admin/memory Start or stop tracing allocations
+            @apiName PutMemory
+            @apiGroup Admin
+
+            @apiHeader {String} Authorization ``Bearer <admin token>``
+            @apiParam {Boolean} tracing Trace allocations
+            @apiParam {Number} [frames=1] Number of frames stored per allocation
+
+            @apiParamExample {json} Request-Example:
+                {
+                    "tracing": true,
+                    "frames": 5
+                }
+        """
+        tracker = self.application.memoryTracker
+        if not tracker.available:
+            raise HTTPError(501, reason="Allocation tracing is not supported by this Python version")
+        try:
+            options = json.loads(self.request.body.decode("utf-8"))
+            tracing = bool(options["tracing"])
+            frames = int(options.get("frames", 1))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise HTTPError(400, reason="Expected JSON object with tracing flag")
+        if frames < 1:
+            raise HTTPError(400, reason="frames needs to be positive")
+
+        # waits for snapshots in progress
+        if tracing:
+            yield self.executor.submit(tracker.start, frames)
+        else:
+            yield self.executor.submit(tracker.stop)
+        self.write({"tracing": tracker.tracing})
+
+@route("/api/admin/slow-requests")
+class SlowRequests(AdminRequestHandler):
+    """
+    Handles REST requests for recent slow requests
+    """
+    def get(self):
+        """
+        Get the most recent requests of the worker process handling the
+        request that took longer than the slow request threshold, with
+        route, query arguments, time spent per phase, response size and
+        executor wait, most recent first
+
+        ..
+            @api {get} /api/admin/slow-requests Get recent slow requests
+            @apiName GetSlowRequests
+            @apiGroup Admin
+
+            @apiHeader {String} Authorization ``Bearer <admin token>``
+            @apiParam {Number} [limit] Maximum number of requests
+        """
+        limit = self.get_query_argument("limit", None)
+        try:
+            limit = int(limit) if limit is not None else None
+        except ValueError:
+            raise HTTPError(400, reason="limit needs to be a number")
+        self.write(self.application.slowRequests.toJSONSerializable(limit))
@@ -58,3 +58,20 @@ class APIList(BaseRequestHandler):
         }
         response = json.dumps(data, indent=4, sort_keys=True, separators=(',', ': '))
         self.write(response)
+
+@route("/api/health")
+class Health(BaseRequestHandler):
+    """
+    Handles REST requests for server liveness, does not access the backend
+    """
+    def get(self):
+        """
+        Get server health
+
+        @api {get} /api/health Get health
+        @apiName GetHealth
+        @apiGroup API
+
+        @apiSuccess (JSON Result) {String} status Status
+        """
+        self.write({"status": "ok"})
@@ -0,0 +1,194 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+REST API batch request handlers
+"""
+import json
+
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.escape import utf8
+from tornado.httputil import HTTPHeaders, HTTPServerRequest
+from tornado.util import basestring_type
+from tornado.web import HTTPError
+
+from c4.rest.server import (BaseRequestHandler,
+                            route)
+from c4.utils.logutil import ClassLogger
+
+
+# maximum number of sub-requests in a single batch
+MAX_BATCH_SIZE = 100
+
+# headers of the batch request that also apply to its sub-requests
+FORWARDED_HEADERS = ("Authorization", "Cookie", "User-Agent", "X-Forwarded-For", "X-Forwarded-Proto", "X-Real-Ip")
+
+class BatchConnection(object):
+    """
+    Connection that collects the response of a sub-request in memory
+
+    :param context: context of the connection the batch request was received on
+    """
+    def __init__(self, context=None):
+        self.context = context
+        self.code = None
+        self.reason = None
+        self.headers = None
+        self.chunks = []
+        self.finished = Future()
+
+    def set_close_callback(self, callback):
+        """
+        Ignored since the connection is never closed by a client
+        """
+        pass
+
+    def write_headers(self, start_line, headers, chunk=None, callback=None):
+        """
+        Collect response status and headers
+        """
+        self.code = start_line.code
+        self.reason = start_line.reason
+        self.headers = headers
+        return self.write(chunk, callback=callback)
+
+    def write(self, chunk, callback=None):
+        """
+        Collect response body
+        """
+        if chunk:
+            self.chunks.append(chunk)
+        if callback is not None:
+            callback()
+        future = Future()
+        future.set_result(None)
+        return future
+
+    def finish(self):
+        """
+        Mark the response as complete
+        """
+        if not self.finished.done():
+            self.finished.set_result(None)
+
+    @property
+    def body(self):
+        """
+        Response body
+        """
+        return b"".join(self.chunks)
+
+@ClassLogger
+@route("/api/batch")
+class Batch(BaseRequestHandler):
+    """
+    Handles REST requests combining multiple sub-requests
+    """
+    @gen.coroutine
+    def post(self):
+        """
+        Execute sub-requests concurrently through the regular request handlers.
+        Sub-requests share backend reads with the same key so each piece of
+        configuration is only retrieved once per batch.
+
+        ..
+            @api {post} /api/batch Execute multiple requests
+            @apiName PostBatch
+            @apiGroup API
+
+            @apiParam {Object[]} requests Sub-requests with ``path`` and optional ``method``, ``headers`` and ``body``
+            @apiSuccess {Object[]} responses Responses with ``path``, ``status``, ``headers`` and ``body``,
+                values of headers that appear more than once are lists
+            @apiParamExample {json} Request-Example:
+                {
+                    "requests": [
+                        {"path": "/api/nodes/"},
+                        {"path": "/api/nodes"}
+                    ]
+                }
+        """
+        try:
+            subRequests = json.loads(self.request.body.decode("utf-8"))["requests"]
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(400, reason="Expected JSON object with list of requests")
+        if not isinstance(subRequests, list):
+            raise HTTPError(400, reason="Expected JSON object with list of requests")
+        if len(subRequests) > MAX_BATCH_SIZE:
+            raise HTTPError(400, reason="Batch exceeds {0} requests".format(MAX_BATCH_SIZE))
+
+        sharedBackendCalls = {}
+        responses = yield [
+            self.execute(subRequest, sharedBackendCalls)
+            for subRequest in subRequests
+        ]
+
+        self.write(json.dumps({"responses": responses}, indent=4, sort_keys=True, separators=(',', ': ')))
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+
+    @gen.coroutine
+    def execute(self, subRequest, sharedBackendCalls):
+        """
+        Execute a single sub-request
+
+        :param subRequest: sub-request with ``path`` and optional ``method``, ``headers`` and ``body``
+        :type subRequest: dict
+        :param sharedBackendCalls: backend calls shared between the sub-requests
+        :type sharedBackendCalls: dict
+        :returns: response with ``path``, ``status``, ``headers`` and ``body``
+        :rtype: dict
+        """
+        if not isinstance(subRequest, dict) or not isinstance(subRequest.get("path"), basestring_type):
+            raise gen.Return({"status": 400, "body": "Sub-request requires a path"})
+        path = subRequest["path"]
+        if not isinstance(subRequest.get("method", "GET"), basestring_type):
+            raise gen.Return({"path": path, "status": 400, "body": "Sub-request method needs to be a string"})
+        method = subRequest.get("method", "GET").upper()
+        if path.split("?")[0] == self.route:
+            raise gen.Return({"path": path, "status": 400, "body": "Batches cannot be nested"})
+        subRequestHeaders = subRequest.get("headers", {})
+        if (not isinstance(subRequestHeaders, dict)
+                or not all(isinstance(value, basestring_type) for value in subRequestHeaders.values())):
+            raise gen.Return({"path": path, "status": 400, "body": "Sub-request headers need to be an object of strings"})
+
+        headers = HTTPHeaders()
+        for name in FORWARDED_HEADERS:
+            for value in self.request.headers.get_list(name):
+                headers.add(name, value)
+
+        body = subRequest.get("body")
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        elif body is not None and not isinstance(body, basestring_type):
+            raise gen.Return({"path": path, "status": 400, "body": "Sub-request body needs to be a string or JSON"})
+
+        for name, value in subRequestHeaders.items():
+            headers[name] = value
+        # responses are embedded in the JSON batch response
+        headers["Accept"] = "application/json"
+
+        connection = BatchConnection(getattr(self.request.connection, "context", None))
+        request = HTTPServerRequest(method=method, uri=path, headers=headers, body=utf8(body or ""),
+                                    host=self.request.host, connection=connection)
+        request.sharedBackendCalls = sharedBackendCalls
+        self.application.find_handler(request).execute()
+        yield connection.finished
+
+        responseBody = connection.body.decode("utf-8")
+        try:
+            responseBody = json.loads(responseBody)
+        except ValueError:
+            pass
+        responseHeaders = {}
+        for name in connection.headers or []:
+            values = connection.headers.get_list(name)
+            # headers that appear more than once, e.g., Vary, are lists
+            responseHeaders[name] = values[0] if len(values) == 1 else values
+        raise gen.Return({
+            "path": path,
+            "status": connection.code,
+            "headers": responseHeaders,
+            "body": responseBody
+        })
@@ -0,0 +1,98 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+REST API configuration export request handlers
+"""
+import json
+
+from tornado import gen
+
+from c4.rest.handlers.nodes import getNode, getNodeNames
+from c4.rest.server import (BaseRequestHandler,
+                            route)
+from c4.utils.logutil import ClassLogger
+
+
+def getDevices(devices, parent=None):
+    """
+    Get devices of a device hierarchy in depth-first order
+
+    :param devices: device name to device information mapping
+    :type devices: dict
+    :param parent: fully qualified name of the parent device
+    :type parent: str
+    :returns: fully qualified device name and device information tuples
+    :rtype: generator
+    """
+    for name, deviceInfo in sorted(devices.items()):
+        fullName = "{0}.{1}".format(parent, name) if parent else name
+        yield fullName, deviceInfo
+        for device in getDevices(getattr(deviceInfo, "devices", None) or {}, fullName):
+            yield device
+
+def formatRecord(recordType, information, **fields):
+    """
+    Format an export record as a single line of JSON
+
+    :param recordType: ``node`` or ``device``
+    :type recordType: str
+    :param information: serialized node or device information, child devices are left out
+    :type information: dict
+    :returns: JSON line
+    :rtype: str
+    """
+    record = dict(information)
+    record.pop("devices", None)
+    record.update(fields)
+    record["type"] = recordType
+    return json.dumps(record, sort_keys=True) + "\n"
+
+@ClassLogger
+@route("/api/export")
+class Export(BaseRequestHandler):
+    """
+    Handles REST requests for exporting the cluster configuration
+    """
+    @gen.coroutine
+    def get(self):
+        """
+        Stream the configuration as newline-delimited JSON with one record
+        per node followed by one record per device of the node, devices
+        are identified by their fully qualified name, e.g., ``disk.sda``.
+        Nodes are read from the backend and written one at a time so memory
+        use does not depend on the cluster size. The last record has the
+        ``end`` type and the number of exported nodes and devices, exports
+        without it were cut short.
+
+        ..
+            @api {get} /api/export Export the cluster configuration
+            @apiName GetExport
+            @apiGroup Nodes
+
+            @apiSuccessExample {json} Success-Response:
+                HTTP/1.1 200 OK
+                {"address": "tcp://10.0.0.1:5000", "name": "node1", "role": "ACTIVE", "state": "RUNNING", "type": "node"}
+                {"name": "cpu", "node": "node1", "state": "RUNNING", "type": "device", ...}
+                {"devices": 1, "nodes": 1, "type": "end"}
+        """
+        nodeNames = yield self.backendCall(("getNodeNames",), getNodeNames)
+        self.set_header("Content-Type", "application/x-ndjson")
+
+        nodes = 0
+        devices = 0
+        for node in nodeNames:
+            # no snapshots so that memory use stays constant
+            nodeInfo = yield self.backendCall(None, getNode, node)
+            if not nodeInfo:
+                self.log.warning("node '%s' was removed during the export", node)
+                continue
+            self.write(formatRecord("node", nodeInfo.toJSONSerializable()))
+            nodes += 1
+            for name, deviceInfo in getDevices(nodeInfo.devices):
+                self.write(formatRecord("device", deviceInfo.toJSONSerializable(), name=name, node=node))
+                devices += 1
+            # wait for slow clients instead of buffering the export
+            yield self.flush()
+        self.write(json.dumps({"type": "end", "nodes": nodes, "devices": devices}, sort_keys=True) + "\n")
@@ -0,0 +1,57 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+REST API job request handlers
+"""
+from tornado import gen
+from tornado.web import HTTPError
+
+from c4.rest.server import (BaseRequestHandler,
+                            route)
+from c4.utils.logutil import ClassLogger
+
+
+# upper limit on the number of seconds to wait for a job to finish
+MAX_WAIT = 60.0
+
+@ClassLogger
+@route("/api/jobs/{job}")
+class JobStatus(BaseRequestHandler):
+    """
+    Handles REST requests for job information
+    """
+    @gen.coroutine
+    def get(self, job): # pylint: disable=arguments-differ
+        """
+        Get job state and, once it finished, its result or error. With
+        ``?wait=<seconds>`` the response is delayed until the job finished
+        or the time passed.
+
+        ..
+            @api {get} /api/jobs/{id} Get job information
+            @apiName GetJob
+            @apiGroup Jobs
+
+            @apiParam {Number} [wait] Seconds to wait for the job to finish
+            @apiSuccess {String} id Job id
+            @apiSuccess {String} name Job name
+            @apiSuccess {String} state ``pending``, ``running``, ``done`` or ``failed``
+            @apiSuccess {Number} created Creation time
+            @apiSuccess {Number} started Start time
+            @apiSuccess {Number} finished Completion time
+            @apiSuccess {Object} result Result of a job that is done
+            @apiSuccess {String} error Error of a job that failed
+        """
+        try:
+            wait = min(float(self.get_query_argument("wait", 0)), MAX_WAIT)
+        except ValueError:
+            raise HTTPError(400, reason="wait needs to be a number of seconds")
+        if wait > 0:
+            information = yield self.application.jobManager.wait(job, wait)
+        else:
+            information = self.application.jobManager.get(job)
+        if information is None:
+            raise HTTPError(404, reason="Job '{0}' does not exist or expired".format(job))
+        self.writeData(information)
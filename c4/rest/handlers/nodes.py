@@ -7,6 +7,7 @@ REST API nodes request handlers
 """
 import json
 from tornado import gen
+from tornado.web import HTTPError
 
 from c4.rest.server import (BaseRequestHandler,
                             route)
@@ -29,6 +30,39 @@ class NodeMap(JSONSerializable):
         """
         setattr(self, nodeInfo.name, nodeInfo)
 
+def getNodeNames():
+    """
+    Get node names from the backend
+    """
+    configuration = Backend().configuration
+    return configuration.getNodeNames()
+
+def getNode(node, includeDevices=True, flatDeviceHierarchy=False):
+    """
+    Get node information from the backend
+    """
+    configuration = Backend().configuration
+    return configuration.getNode(node, includeDevices=includeDevices, flatDeviceHierarchy=flatDeviceHierarchy)
+
+@gen.coroutine
+def getNodeSnapshots(context):
+    """
+    Get serialized information including devices of all nodes, used to
+    update the :class:`~c4.rest.server.changes.ChangeLog`
+
+    :param context: backend access context
+    :type context: :class:`~c4.rest.server.cache.RefreshContext`
+    :returns: node name to serialized node information mapping
+    :rtype: dict
+    """
+    nodes = {}
+    nodeNames = yield context.backendCall(("getNodeNames",), getNodeNames)
+    for node in nodeNames:
+        nodeInfo = yield context.backendCall(("getNode", node, True), getNode, node)
+        if nodeInfo:
+            nodes[node] = nodeInfo.toJSONSerializable()
+    raise gen.Return(nodes)
+
 @ClassLogger
 @route("/api/nodes")
 class Nodes(BaseRequestHandler):
@@ -47,31 +81,31 @@ class Nodes(BaseRequestHandler):
         """
         includeClassInfo = self.get_query_argument("includeClassInfo", "", strip=True).lower() in ["true"]
 
-        nodeMap = NodeMap()
+        response = yield self.cachedResponse(("nodes", includeClassInfo), self.createResponse, includeClassInfo)
+        self.writeEncoded(response)
 
-        def getNodeNames():
-            """
-            Get node names
-            """
-            configuration = Backend().configuration
-            return configuration.getNodeNames()
-        nodeNames = yield self.executor.submit(getNodeNames)
-
-        def getNode(node, includeDevices=True, flatDeviceHierarchy=False):
-            """
-            Get node information
-            """
-            configuration = Backend().configuration
-            return configuration.getNode(node, includeDevices=includeDevices, flatDeviceHierarchy=flatDeviceHierarchy)
+    @classmethod
+    @gen.coroutine
+    def createResponse(cls, context, includeClassInfo=False):
+        """
+        Create serialized node map
+
+        :param context: backend access context
+        :type context: :class:`~c4.rest.server.tornadoserver.BaseRequestHandler`
+        :param includeClassInfo: include class information
+        :type includeClassInfo: bool
+        :returns: serialized node map
+        :rtype: str
+        """
+        nodeMap = NodeMap()
+        nodeNames = yield context.backendCall(("getNodeNames",), getNodeNames)
         for node in nodeNames:
-            nodeInfo = yield self.executor.submit(getNode, node, includeDevices=False)
+            nodeInfo = yield context.backendCall(("getNode", node, False), getNode, node, includeDevices=False)
             if nodeInfo:
                 nodeMap.add(nodeInfo)
             else:
-                self.log.error("could not retrieve node information for '%s'", node)
-
-        self.write(nodeMap.toJSON(includeClassInfo=includeClassInfo, pretty=True))
-        self.set_header("Content-Type", "application/json; charset=UTF-8")
+                cls.log.error("could not retrieve node information for '%s'", node)
+        raise gen.Return(nodeMap.toJSON(includeClassInfo=includeClassInfo, pretty=True))
 
 @ClassLogger
 @route("/api/nodes/")
@@ -97,17 +131,70 @@ class NodeList(BaseRequestHandler):
                     "nodes": ["node1", "node2"]
                 }
         """
-        def getNodeNames():
-            """
-            Get node names
-            """
-            configuration = Backend().configuration
-            return configuration.getNodeNames()
-        nodeNames = yield self.executor.submit(getNodeNames)
+        response = yield self.cachedResponse(("nodeList",), self.createResponse)
+        self.writeEncoded(response)
 
+    @classmethod
+    @gen.coroutine
+    def createResponse(cls, context):
+        """
+        Create serialized node list
+
+        :param context: backend access context
+        :type context: :class:`~c4.rest.server.tornadoserver.BaseRequestHandler`
+        :returns: serialized node list
+        :rtype: str
+        """
+        nodeNames = yield context.backendCall(("getNodeNames",), getNodeNames)
         data = {
             "description": "list of nodes",
             "list": nodeNames
         }
-        response = json.dumps(data, indent=4, sort_keys=True, separators=(',', ': '))
-        self.write(response)
+        raise gen.Return(json.dumps(data, indent=4, sort_keys=True, separators=(',', ': ')))
+
+@route("/api/nodes/changes")
+class NodeChanges(BaseRequestHandler):
+    """
+    Handles REST requests for changes of nodes
+    """
+    def get(self):
+        """
+        Get the nodes that were added, removed or changed, i.e., their role,
+        state or devices, since the specified version. Without a version
+        all nodes are returned as added. Clients keep the returned version
+        for the next request and get ``410 Gone`` if they need to start over
+        because the version is no longer in the change log. Versions follow
+        the configuration version pushed by the device manager, changes found
+        without a notification are counted up. All worker processes share the
+        same change log and therefore the same versions.
+
+        ..
+            @api {get} /api/nodes/changes Get node changes
+            @apiName GetNodeChanges
+            @apiGroup Nodes
+
+            @apiParam {Number} [since] Version the client has
+
+            @apiSuccessExample {json} Success-Response:
+                HTTP/1.1 200 OK
+                {
+                    "version": 12,
+                    "added": {"node3": {...}},
+                    "changed": {"node1": {...}},
+                    "removed": ["node2"]
+                }
+        """
+        since = self.get_query_argument("since", None)
+        try:
+            since = int(since) if since is not None else None
+        except ValueError:
+            raise HTTPError(400, reason="since needs to be a version number")
+        changeLog = self.application.changeLog
+        changeLog.load()
+        if not changeLog.initialized:
+            raise HTTPError(503, reason="Change log is not available yet")
+        try:
+            changes = changeLog.getChanges(since)
+        except ValueError as exception:
+            raise HTTPError(410, reason=str(exception))
+        self.writeData(changes)
@@ -0,0 +1,236 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+REST API device status request handlers
+"""
+import calendar
+import datetime
+import time
+
+from tornado import gen
+from tornado.web import HTTPError
+
+from c4.rest.handlers.nodes import getNodeNames
+from c4.rest.server import (BaseRequestHandler,
+                            route)
+from c4.system.backend import Backend
+from c4.utils.logutil import ClassLogger
+
+
+# device types whose status is sampled into the metric history
+SAMPLED_DEVICE_TYPES = ("c4.devices.cpu.Cpu", "c4.devices.disk.Disk", "c4.devices.mem.Memory")
+
+def getDeviceNames(node):
+    """
+    Get the full names of all devices of a node from the backend
+    """
+    configuration = Backend().configuration
+    nodeInfo = configuration.getNode(node, includeDevices=True, flatDeviceHierarchy=True)
+    if not nodeInfo:
+        return []
+    return sorted(nodeInfo.devices)
+
+def getDevicesOfType(deviceTypes):
+    """
+    Get node and full device names of all devices of the specified types from the backend
+    """
+    configuration = Backend().configuration
+    devices = []
+    for node in configuration.getNodeNames():
+        nodeInfo = configuration.getNode(node, includeDevices=True, flatDeviceHierarchy=True)
+        if nodeInfo:
+            devices.extend(
+                (node, name)
+                for name, deviceInfo in sorted(nodeInfo.devices.items())
+                if deviceInfo.type in deviceTypes
+            )
+    return devices
+
+def getDeviceStatus(node, device):
+    """
+    Get the latest status the device manager reported to the backend
+    """
+    entry = Backend().deviceHistory.getLatest(node, device)
+    if entry is None:
+        return None
+    return entry.status.toJSONSerializable()
+
+def getDeviceSample(node, device):
+    """
+    Get the latest status the device manager reported to the backend together
+    with the time it was reported in seconds since the epoch
+    """
+    entry = Backend().deviceHistory.getLatest(node, device)
+    if entry is None:
+        return None
+    timestamp = entry.timestamp
+    if isinstance(timestamp, datetime.datetime):
+        # backend times are in UTC
+        timestamp = calendar.timegm(timestamp.utctimetuple()) + timestamp.microsecond / 1e6
+    return float(timestamp), entry.status.toJSONSerializable()
+
+@gen.coroutine
+def getSampleCalls(context, deviceTypes=SAMPLED_DEVICE_TYPES):
+    """
+    Get status calls for the devices whose status is kept in the metric history,
+    see :class:`~c4.rest.server.history.HistorySampler`
+
+    :param context: backend access context
+    :type context: :class:`~c4.rest.server.cache.RefreshContext`
+    :param deviceTypes: device types to sample
+    :type deviceTypes: [str]
+    :returns: device key to status function and arguments mapping
+    :rtype: dict
+    """
+    devices = yield context.backendCall(("getDevicesOfType", tuple(sorted(deviceTypes))), getDevicesOfType, deviceTypes)
+    raise gen.Return(dict(
+        (("deviceSample", node, device), (getDeviceSample, node, device))
+        for node, device in devices
+    ))
+
+def formatStatus(status, age, error):
+    """
+    Format a collected status result
+
+    :param status: serialized status
+    :type status: dict
+    :param age: age of the status in seconds, ``None`` if it is fresh
+    :type age: float
+    :param error: error if no status is available
+    :type error: str
+    :returns: status information
+    :rtype: dict
+    """
+    result = {"status": status}
+    if age is not None:
+        result["age"] = age
+    if error is not None:
+        result["error"] = error
+    return result
+
+@ClassLogger
+@route("/api/nodes/{node}/devices/{device}/status")
+class DeviceStatus(BaseRequestHandler):
+    """
+    Handles REST requests for device status
+    """
+    @gen.coroutine
+    def get(self, node, device): # pylint: disable=arguments-differ
+        """
+        Get the latest status of a device
+
+        ..
+            @api {get} /api/nodes/{node}/devices/{device}/status Get device status
+            @apiName GetDeviceStatus
+            @apiGroup Status
+
+            @apiSuccess {Object} status Device status
+            @apiSuccess {Number} [age] Age in seconds if the device did not answer in time
+        """
+        try:
+            status, age = yield self.application.statusCollector.collect(
+                ("deviceStatus", node, device), getDeviceStatus, node, device)
+        except gen.TimeoutError:
+            raise HTTPError(504, reason="Device status timed out")
+        if status is None:
+            raise HTTPError(404, reason="No status for device '{0}' on node '{1}'".format(device, node))
+        if age is not None:
+            self.markStale(age)
+        self.writeData(formatStatus(status, age, None))
+
+@ClassLogger
+@route("/api/status")
+class ClusterStatus(BaseRequestHandler):
+    """
+    Handles REST requests for the status of all devices in the cluster
+    """
+    @gen.coroutine
+    def get(self):
+        """
+        Get the latest status of all devices on all nodes. Status of
+        all devices is collected concurrently with a timeout per device.
+        With ``?async=true`` the status is collected as a job instead.
+
+        ..
+            @api {get} /api/status Get status of all devices
+            @apiName GetStatus
+            @apiGroup Status
+
+            @apiParam {Boolean} [async] Collect status as a job, see ``/api/jobs/{id}``
+            @apiSuccess {Object} nodes Node name to device name to device status mapping
+        """
+        if self.get_query_argument("async", "", strip=True).lower() in ["true"]:
+            self.submitJob("status", self.createResponse)
+            return
+        response = yield self.createResponse(self)
+        self.writeData(response)
+
+    @classmethod
+    @gen.coroutine
+    def createResponse(cls, context):
+        """
+        Collect the status of all devices
+
+        :param context: backend access context
+        :type context: :class:`~c4.rest.server.tornadoserver.BaseRequestHandler`
+        :returns: node name to device name to device status mapping
+        :rtype: dict
+        """
+        nodeNames = yield context.backendCall(("getNodeNames",), getNodeNames)
+        deviceNames = yield dict(
+            (node, context.backendCall(("getDeviceNames", node), getDeviceNames, node))
+            for node in nodeNames
+        )
+
+        results = yield context.application.statusCollector.collectAll(dict(
+            (("deviceStatus", node, device), (getDeviceStatus, node, device))
+            for node, devices in deviceNames.items()
+            for device in devices
+        ))
+
+        nodes = dict((node, {}) for node in nodeNames)
+        for (_, node, device), result in results.items():
+            nodes[node][device] = formatStatus(*result)
+        raise gen.Return({"nodes": nodes})
+
+@ClassLogger
+@route("/api/nodes/{node}/devices/{device}/history")
+class DeviceHistory(BaseRequestHandler):
+    """
+    Handles REST requests for the recent metric history of a device
+    """
+    def get(self, node, device): # pylint: disable=arguments-differ
+        """
+        Get downsampled metrics of a device, e.g., ``?from=1500000000&to=1500003600&step=60&metric=usage``.
+        ``to`` defaults to now, ``from`` to one hour before ``to`` and ``step``
+        to a sixtieth of the time range.
+
+        ..
+            @api {get} /api/nodes/{node}/devices/{device}/history Get device metric history
+            @apiName GetDeviceHistory
+            @apiGroup Status
+
+            @apiParam {Number} [from] Start of the time range in seconds since the epoch
+            @apiParam {Number} [to] End of the time range in seconds since the epoch
+            @apiParam {Number} [step] Bucket size in seconds
+            @apiParam {String[]} [metric] Metric names, all metrics by default
+            @apiSuccess {Object} metrics Metric name to lists of bucket
+                ``timestamp``, ``count``, ``min``, ``max``, ``mean``, ``p50``, ``p90`` and ``p99``
+        """
+        try:
+            end = float(self.get_query_argument("to", time.time()))
+            start = float(self.get_query_argument("from", end - 3600))
+            step = float(self.get_query_argument("step", (end - start) / 60))
+            metrics = self.application.metricHistory.query(("deviceSample", node, device), start, end, step,
+                                                           metrics=self.get_query_arguments("metric") or None)
+        except ValueError as exception:
+            raise HTTPError(400, reason=str(exception))
+        data = {
+            "from": start,
+            "to": end,
+            "step": step,
+            "metrics": metrics
+        }
+        self.writeData(data)
@@ -8,10 +8,45 @@ REST server implementation
 from pkgutil import extend_path
 __path__ = extend_path(__path__, __name__)
 
-from .tornadoserver import (BaseRequestHandler,
+from .cache import (CacheRefresher,
+                    ResponseCache)
+from .changes import (ChangeListener,
+                      ChangeLog,
+                      ChangeLogUpdater,
+                      createConfigurationChange,
+                      createNodeStateChange)
+from .circuitbreaker import (CircuitBreaker,
+                             CircuitBreakerOpen)
+from .encoding import (negotiate,
+                       registerEncoder)
+from .history import (HistorySampler,
+                      MetricHistory,
+                      RingBuffer)
+from .jobs import (Job,
+                   JobManager,
+                   JobStoreFull)
+from .logqueue import (AsyncLogHandler,
+                       installAsyncLogging,
+                       uninstallAsyncLogging)
+from .memory import (MemoryTracker,
+                     getCacheSizes)
+from .profiler import StackSampler
+from .routing import RouteTrie
+from .sharedcache import SharedResponseStore
+from .slowrequests import SlowRequestLog
+from .status import StatusCollector
+from .tornadoserver import (AdminRequestHandler,
+                            BaseRequestHandler,
+                            RestApplication,
+                            RestServer,
                             RestServerProcess,
+                            RestServerThread,
+                            bindUnixSocket,
+                            createApplication,
                             getRouteMap,
                             route)
+from .tls import (CertificateReloader,
+                  createSSLContext)
 
 from ._version import get_versions
 __version__ = get_versions()['version']
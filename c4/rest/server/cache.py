@@ -0,0 +1,392 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Response cache with stale-while-revalidate background refresh
+"""
+import time
+
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+from c4.rest.server.encoding import transcode
+from c4.utils.logutil import ClassLogger
+
+
+class StaleSnapshot(Exception):
+    """
+    Raised when a background refresh only got a stale backend snapshot
+    """
+
+class CacheEntry(object):
+    """
+    Cached serialized response
+
+    :param value: serialized response
+    :type value: str
+    :param producer: coroutine function ``producer(context, *args)`` that recomputes the response
+    :type producer: func
+    :param args: additional producer arguments
+    :type args: tuple
+    :param created: creation time of the response
+    :type created: float
+    :param version: version stamp in the shared response store
+    :type version: int
+    """
+    def __init__(self, value, producer, args, created=None, version=0):
+        self.value = value
+        self.producer = producer
+        self.args = args
+        self.created = created or time.time()
+        self.lastAccess = time.time()
+        self.refreshing = False
+        # set when the configuration changed, the value needs to be recomputed before it is served again
+        self.expired = False
+        # time of the change that expired the value
+        self.invalidated = 0.0
+        self.version = version
+        # media type to the value in other encodings
+        self.variants = {}
+
+    @property
+    def age(self):
+        """
+        Age of the cached value in seconds
+        """
+        return time.time() - self.created
+
+    def encode(self, mediaType):
+        """
+        Get the value in another encoding, derived from the JSON value once per value
+
+        :param mediaType: media type of a registered encoder
+        :type mediaType: str
+        :returns: encoded response
+        :rtype: bytes
+        """
+        variant = self.variants.get(mediaType)
+        if variant is None:
+            variant = self.variants[mediaType] = transcode(self.value, mediaType)
+        return variant
+
+class RefreshContext(object):
+    """
+    Backend access context used by producers when refreshing in the background.
+
+    Provides the same ``backendCall`` interface as
+    :class:`~c4.rest.server.tornadoserver.BaseRequestHandler` but refuses
+    to use stale circuit breaker snapshots.
+
+    :param application: application
+    :type application: :class:`~tornado.web.Application`
+    """
+    def __init__(self, application):
+        self.application = application
+
+    @gen.coroutine
+    def backendCall(self, key, function, *args, **kwargs):
+        """
+        Execute a blocking backend function on the executor, guarded by
+        the application's circuit breaker
+
+        :param key: key identifying the call and its snapshot
+        :type key: tuple
+        :param function: blocking function
+        :type function: func
+        :returns: function result
+        :raises StaleSnapshot: if the backend is unavailable
+        """
+        value, age = yield self.application.circuitBreaker.call(key, self.application.executor, function, *args, **kwargs)
+        if age is not None:
+            raise StaleSnapshot("backend unavailable, snapshot is {0:.3f} seconds old".format(age))
+        raise gen.Return(value)
+
+@ClassLogger
+class ResponseCache(object):
+    """
+    Cache of serialized responses that are kept warm by a :class:`CacheRefresher`.
+    Concurrent requests for a response that is not cached wait for a single
+    computation of it, see :meth:`produce`.
+
+    :param ttl: seconds after which a cached response is considered expired
+    :type ttl: float
+    :param idleTimeout: seconds without access after which a response is evicted
+    :type idleTimeout: float
+    :param sharedStore: store that shares responses with other worker processes
+    :type sharedStore: :class:`~c4.rest.server.sharedcache.SharedResponseStore`
+    """
+    def __init__(self, ttl=5.0, idleTimeout=300.0, sharedStore=None):
+        self.ttl = float(ttl)
+        self.idleTimeout = float(idleTimeout)
+        self.sharedStore = sharedStore
+        self.entries = {}
+        # key -> future of the computation in progress
+        self.pending = {}
+        # number of invalidations, responses computed across one are not cached
+        self.invalidations = 0
+        # time of the last change that invalidated all responses
+        self.invalidated = 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        Get cache entry for the specified key and mark it as accessed
+
+        :param key: cache key
+        :type key: tuple
+        :returns: cache entry or ``None``
+        :rtype: :class:`CacheEntry`
+        """
+        entry = self.sync(key)
+        if entry is not None:
+            entry.lastAccess = time.time()
+        return entry
+
+    def load(self, key, producer, args=()):
+        """
+        Load a response that is not cached locally from the shared store
+
+        :param key: cache key
+        :type key: tuple
+        :param producer: coroutine function ``producer(context, *args)`` that recomputes the response
+        :type producer: func
+        :param args: additional producer arguments
+        :type args: tuple
+        :returns: cache entry or ``None``
+        :rtype: :class:`CacheEntry`
+        """
+        if self.sharedStore is None:
+            return None
+        shared = self.sharedStore.get(key)
+        if shared is None:
+            return None
+        value, version, created = shared
+        if time.time() - created > self.ttl or created <= self.invalidated:
+            return None
+        entry = CacheEntry(value, producer, args, created=created, version=version)
+        self.entries[key] = entry
+        return entry
+
+    def sync(self, key):
+        """
+        Update the local entry for the specified key if another worker
+        published a newer version to the shared store. An expired entry
+        is valid again if the newer version was created after the change
+        that expired it.
+
+        :param key: cache key
+        :type key: tuple
+        :returns: cache entry or ``None``
+        :rtype: :class:`CacheEntry`
+        """
+        entry = self.entries.get(key)
+        if entry is not None and self.sharedStore is not None:
+            shared = self.sharedStore.get(key, newerThan=entry.version)
+            if shared is not None:
+                entry.value, entry.version, entry.created = shared
+                entry.variants = {}
+                if entry.expired and entry.created > entry.invalidated:
+                    entry.expired = False
+        return entry
+
+    @gen.coroutine
+    def produce(self, key, producer, args, context):
+        """
+        Compute a response using ``producer(context, *args)`` and cache it
+        unless it is based on stale backend snapshots. If the response is
+        already being computed, e.g., after an invalidation, the result of
+        that computation is used instead.
+
+        :param key: cache key
+        :type key: tuple
+        :param producer: coroutine function ``producer(context, *args)`` that computes the response
+        :type producer: func
+        :param args: additional producer arguments
+        :type args: tuple
+        :param context: backend access context, its ``staleAge`` is set if stale snapshots were used
+        :type context: :class:`~c4.rest.server.tornadoserver.BaseRequestHandler`
+        :returns: serialized response and the snapshot age in seconds, ``None`` for fresh responses
+        :rtype: (str, float)
+        """
+        while key in self.pending:
+            result = yield self.pending[key]
+            if result is not None:
+                raise gen.Return(result)
+            # a background refresh did not get fresh data
+
+        future = self.pending[key] = Future()
+        invalidations = self.invalidations
+        try:
+            value = yield producer(context, *args)
+        except Exception as exception:
+            del self.pending[key]
+            future.set_exception(exception)
+            # waiting requests fail as well, nothing else retrieves the exception
+            future.exception()
+            raise
+        age = getattr(context, "staleAge", None)
+        if age is None and invalidations == self.invalidations:
+            self.put(key, value, producer, args)
+        del self.pending[key]
+        future.set_result((value, age))
+        raise gen.Return((value, age))
+
+    def put(self, key, value, producer, args=()):
+        """
+        Cache a response
+
+        :param key: cache key
+        :type key: tuple
+        :param value: serialized response
+        :type value: str
+        :param producer: coroutine function ``producer(context, *args)`` that recomputes the response
+        :type producer: func
+        :param args: additional producer arguments
+        :type args: tuple
+        :returns: cache entry
+        :rtype: :class:`CacheEntry`
+        """
+        entry = CacheEntry(value, producer, args)
+        if self.sharedStore is not None:
+            if not isinstance(value, bytes):
+                value = value.encode("utf-8")
+            entry.version = self.sharedStore.put(key, value, created=entry.created) or 0
+        self.entries[key] = entry
+        return entry
+
+    def invalidate(self, key=None, changed=None, shared=True):
+        """
+        Mark the specified entry or all entries as expired. Expired entries
+        are recomputed on the next request or by the :class:`CacheRefresher`
+        but, unlike evicted ones, keep track of the responses in demand.
+        Responses other workers publish to the shared store after the change
+        are used instead of recomputing them.
+
+        :param key: cache key
+        :type key: tuple
+        :param changed: time of the change, defaults to now
+        :type changed: float
+        :param shared: invalidate the shared store as well, it only needs to
+            be done by one worker per change
+        :type shared: bool
+        """
+        self.invalidations += 1
+        if changed is None:
+            changed = time.time()
+        if key is None:
+            self.invalidated = max(self.invalidated, changed)
+            entries = list(self.entries.values())
+            if shared and self.sharedStore is not None:
+                self.sharedStore.invalidate()
+        else:
+            entries = [self.entries[key]] if key in self.entries else []
+        for entry in entries:
+            entry.expired = True
+            entry.invalidated = max(entry.invalidated, changed)
+
+    def evictIdle(self):
+        """
+        Remove entries that have not been accessed within the idle timeout
+
+        :returns: evicted keys
+        :rtype: [tuple]
+        """
+        now = time.time()
+        evicted = [
+            key
+            for key, entry in self.entries.items()
+            if now - entry.lastAccess > self.idleTimeout
+        ]
+        for key in evicted:
+            del self.entries[key]
+        return evicted
+
+@ClassLogger
+class CacheRefresher(object):
+    """
+    Periodically recomputes cached responses on the IOLoop before they expire
+
+    :param application: application with ``responseCache``, ``circuitBreaker`` and ``executor``
+    :type application: :class:`~tornado.web.Application`
+    :param interval: seconds between refresh checks
+    :type interval: float
+    :param lease: seconds a worker may take to refresh a shared response
+        before another worker takes over
+    :type lease: float
+    """
+    def __init__(self, application, interval=1.0, lease=30.0):
+        self.application = application
+        self.interval = float(interval)
+        self.lease = float(lease)
+        self.periodicCallback = PeriodicCallback(self.check, self.interval * 1000)
+
+    @property
+    def cache(self):
+        """
+        Response cache
+        """
+        return self.application.responseCache
+
+    def check(self):
+        """
+        Evict idle entries and schedule refreshes for entries about to expire
+        """
+        for key in self.cache.evictIdle():
+            self.log.debug("evicted idle response '%s'", key)
+        for key, entry in list(self.cache.entries.items()):
+            if not entry.refreshing and (entry.expired or entry.age + self.interval >= self.cache.ttl):
+                IOLoop.current().spawn_callback(self.refresh, key)
+
+    @gen.coroutine
+    def refresh(self, key):
+        """
+        Recompute the cached response for the specified key
+
+        :param key: cache key
+        :type key: tuple
+        """
+        entry = self.cache.sync(key)
+        if entry is None or entry.refreshing or key in self.cache.pending:
+            return
+        if self.cache.sharedStore is not None:
+            # another worker already refreshed or is refreshing the response
+            if ((not entry.expired and entry.age + self.interval < self.cache.ttl)
+                    or not self.cache.sharedStore.claim(key, self.lease)):
+                return
+        entry.refreshing = True
+        # requests for an expired entry wait for the refresh
+        future = self.cache.pending[key] = Future()
+        invalidations = self.cache.invalidations
+        result = None
+        try:
+            value = yield entry.producer(RefreshContext(self.application), *entry.args)
+            # only replace if the entry was not evicted or invalidated in the meantime
+            if self.cache.entries.get(key) is entry and self.cache.invalidations == invalidations:
+                newEntry = self.cache.put(key, value, entry.producer, entry.args)
+                newEntry.lastAccess = entry.lastAccess
+                result = (value, None)
+        except StaleSnapshot as exception:
+            self.log.debug("could not refresh '%s': %s", key, exception)
+        except Exception as exception:
+            self.log.error("could not refresh '%s'", key)
+            self.log.exception(exception)
+        finally:
+            entry.refreshing = False
+            del self.cache.pending[key]
+            future.set_result(result)
+
+    def start(self):
+        """
+        Start refreshing on the current IOLoop
+        """
+        self.periodicCallback.start()
+
+    def stop(self):
+        """
+        Stop refreshing
+        """
+        self.periodicCallback.stop()
@@ -0,0 +1,373 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Configuration change notifications
+
+The :class:`~c4.devices.rest.RESTServer` device manager receives
+configuration changes from the system manager and pushes them through a
+pipe per worker process into the REST server. There a :class:`ChangeListener`
+watches the pipe on the IOLoop and invalidates the caches right away instead
+of waiting for them to expire or polling the backend for changes.
+
+Changes are dictionaries with a ``type`` of either :data:`CONFIGURATION`,
+with the new configuration ``version``, or :data:`NODE_STATE`, with the
+``node`` and its new ``state``.
+
+A :class:`ChangeLog` keeps track of the nodes that changed between versions
+of the node map so that clients can fetch only the differences. With multiple
+worker processes only one of them updates the change log and publishes it
+to a shared store from which the others load it, so that versions are the
+same in all workers.
+"""
+import collections
+import json
+import time
+
+from tornado import gen
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+from c4.rest.server.cache import RefreshContext, StaleSnapshot
+from c4.utils.logutil import ClassLogger
+
+
+# configuration version bump
+CONFIGURATION = "configuration"
+# node state change
+NODE_STATE = "nodeState"
+
+def createConfigurationChange(version=None):
+    """
+    Create a configuration version change
+
+    :param version: new configuration version
+    :type version: int
+    :returns: change
+    :rtype: dict
+    """
+    return {
+        "type": CONFIGURATION,
+        "version": version,
+        "time": time.time()
+    }
+
+def createNodeStateChange(node, state):
+    """
+    Create a node state change
+
+    :param node: node
+    :type node: str
+    :param state: new state
+    :type state: str
+    :returns: change
+    :rtype: dict
+    """
+    return {
+        "type": NODE_STATE,
+        "node": node,
+        "state": state,
+        "time": time.time()
+    }
+
+@ClassLogger
+class ChangeListener(object):
+    """
+    Receives changes from the device manager and passes them on to the
+    application's callbacks, by default the response cache is invalidated.
+
+    :param application: application
+    :type application: :class:`~c4.rest.server.tornadoserver.RestApplication`
+    :param connection: receiving end of the change pipe
+    :type connection: :class:`~multiprocessing.connection.Connection`
+    """
+    def __init__(self, application, connection):
+        self.application = application
+        self.connection = connection
+        self.ioloop = None
+
+    def start(self):
+        """
+        Start watching the pipe on the current IOLoop
+        """
+        self.ioloop = IOLoop.current()
+        self.ioloop.add_handler(self.connection.fileno(), self.receive, IOLoop.READ)
+
+    def stop(self):
+        """
+        Stop watching the pipe
+        """
+        if self.ioloop is not None:
+            self.ioloop.remove_handler(self.connection.fileno())
+            self.ioloop = None
+
+    def receive(self, fd, events): # pylint: disable=unused-argument
+        """
+        Receive all pending changes
+        """
+        try:
+            while self.connection.poll():
+                self.apply(self.connection.recv())
+        except (EOFError, IOError, OSError):
+            self.log.warning("change notifications closed by the device manager")
+            self.stop()
+
+    def apply(self, change):
+        """
+        Apply a change to the application
+
+        :param change: change
+        :type change: dict
+        """
+        self.log.debug("received change %s", change)
+        if change.get("type") == CONFIGURATION:
+            self.application.configurationVersion = change.get("version")
+        for callback in self.application.changeCallbacks:
+            try:
+                callback(change)
+            except Exception as exception:
+                self.log.exception(exception)
+
+def invalidateResponseCache(application, change):
+    """
+    Invalidate the cached responses, they are all derived from the configuration.
+    Every worker receives the change but only the primary worker invalidates
+    the shared response store so that responses other workers already
+    recomputed are kept.
+
+    :param application: application
+    :type application: :class:`~c4.rest.server.tornadoserver.RestApplication`
+    :param change: change
+    :type change: dict
+    """
+    application.responseCache.invalidate(changed=change.get("time"),
+                                          shared=application.primaryWorker)
+
+@ClassLogger
+class ChangeLog(object):
+    """
+    Bounded log of node changes between versions of the node map. Versions
+    follow the configuration version pushed by the device manager, if
+    known, and are counted up otherwise.
+
+    :param maxChanges: maximum number of node changes kept
+    :type maxChanges: int
+    :param sharedStore: store that shares the change log with other worker processes
+    :type sharedStore: :class:`~c4.rest.server.sharedcache.SharedResponseStore`
+    """
+    def __init__(self, maxChanges=1000, sharedStore=None):
+        self.version = 0
+        # oldest version changes can be computed from
+        self.oldestVersion = 0
+        self.initialized = False
+        self.nodes = {}
+        # (version, node, added) tuples in ascending version order
+        self.changes = collections.deque()
+        self.maxChanges = int(maxChanges)
+        self.sharedStore = sharedStore
+        # version of the change log in the shared store
+        self.sharedVersion = 0
+
+    def toJSONSerializable(self):
+        """
+        Get a JSON serializable representation of the change log
+
+        :returns: change log information
+        :rtype: dict
+        """
+        return {
+            "version": self.version,
+            "oldestVersion": self.oldestVersion,
+            "nodes": self.nodes,
+            "changes": list(self.changes)
+        }
+
+    def publish(self):
+        """
+        Publish the change log to the shared store
+        """
+        if self.sharedStore is None:
+            return
+        value = json.dumps(self.toJSONSerializable()).encode("utf-8")
+        version = self.sharedStore.put(("changeLog",), value)
+        if version is None:
+            self.log.warning("change log with %d bytes is too large to share with other workers", len(value))
+        else:
+            self.sharedVersion = version
+
+    def load(self):
+        """
+        Load the change log from the shared store if it was published after the current one
+
+        :returns: ``True`` if a newer change log was loaded, ``False`` otherwise
+        :rtype: bool
+        """
+        if self.sharedStore is None:
+            return False
+        shared = self.sharedStore.get(("changeLog",), newerThan=self.sharedVersion)
+        if shared is None:
+            return False
+        information = json.loads(shared[0].decode("utf-8"))
+        self.version = information["version"]
+        self.oldestVersion = information["oldestVersion"]
+        self.nodes = information["nodes"]
+        self.changes = collections.deque(tuple(change) for change in information["changes"])
+        self.initialized = True
+        self.sharedVersion = shared[1]
+        return True
+
+    def update(self, nodes, version=None):
+        """
+        Record the nodes that were added, removed or changed compared to
+        the previous node map. The first update only sets the baseline.
+
+        :param nodes: node name to serialized node information mapping
+        :type nodes: dict
+        :param version: configuration version of the node map
+        :type version: int
+        :returns: names of the changed nodes
+        :rtype: [str]
+        """
+        if not self.initialized:
+            # continue a change log published before, e.g., by a replaced worker
+            self.load()
+        if not self.initialized:
+            self.nodes = dict(nodes)
+            self.initialized = True
+            if version is not None:
+                self.version = self.oldestVersion = version
+            self.publish()
+            return []
+
+        changed = sorted(
+            name
+            for name in set(self.nodes) | set(nodes)
+            if self.nodes.get(name) != nodes.get(name)
+        )
+        if not changed:
+            return changed
+        if version is None or version <= self.version:
+            version = self.version + 1
+        for name in changed:
+            self.changes.append((version, name, name not in self.nodes))
+        while len(self.changes) > self.maxChanges:
+            self.oldestVersion = self.changes.popleft()[0]
+        self.nodes = dict(nodes)
+        self.version = version
+        self.publish()
+        return changed
+
+    def getChanges(self, since):
+        """
+        Get the nodes that were added, removed or changed after the specified
+        version, all nodes are added if no version is specified
+
+        :param since: version the client has
+        :type since: int
+        :returns: current version with added and changed nodes and removed node names
+        :rtype: dict
+        :raises ValueError: if the log has no baseline yet or the version is older than the log or unknown
+        """
+        if not self.initialized:
+            raise ValueError("change log is not available yet")
+        if since is None:
+            return {
+                "version": self.version,
+                "added": dict(self.nodes),
+                "changed": {},
+                "removed": []
+            }
+        if since < self.oldestVersion or since > self.version:
+            raise ValueError("changes since version {0} are not available".format(since))
+        existed = {}
+        for version, name, added in self.changes:
+            if version > since and name not in existed:
+                existed[name] = not added
+        result = {
+            "version": self.version,
+            "added": {},
+            "changed": {},
+            "removed": []
+        }
+        for name, hadNode in sorted(existed.items()):
+            if name not in self.nodes:
+                if hadNode:
+                    result["removed"].append(name)
+            elif hadNode:
+                result["changed"][name] = self.nodes[name]
+            else:
+                result["added"][name] = self.nodes[name]
+        return result
+
+@ClassLogger
+class ChangeLogUpdater(object):
+    """
+    Updates the application's :class:`ChangeLog` when a change is received
+    and periodically to also catch changes without a notification
+
+    :param application: application
+    :type application: :class:`~tornado.web.Application`
+    :param getNodes: coroutine function ``getNodes(context)`` returning a node
+        name to serialized node information mapping
+    :type getNodes: func
+    :param interval: seconds between periodic updates, ``0`` to only update on changes
+    :type interval: float
+    """
+    def __init__(self, application, getNodes, interval=60.0):
+        self.application = application
+        self.getNodes = getNodes
+        self.context = RefreshContext(application)
+        self.updating = False
+        self.pending = False
+        self.interval = float(interval)
+        self.periodicCallback = PeriodicCallback(self.update, self.interval * 1000) if self.interval > 0 else None
+
+    def handleChange(self, change): # pylint: disable=unused-argument
+        """
+        Update the change log after a change was received
+        """
+        IOLoop.current().add_callback(self.update)
+
+    @gen.coroutine
+    def update(self):
+        """
+        Compare the current node map with the previous one
+        """
+        if self.updating:
+            # changes during an update require another one
+            self.pending = True
+            return
+        self.updating = True
+        try:
+            while True:
+                self.pending = False
+                nodes = yield self.getNodes(self.context)
+                changed = self.application.changeLog.update(nodes, self.application.configurationVersion)
+                if changed:
+                    self.log.debug("nodes changed in version %s: %s", self.application.changeLog.version, changed)
+                if not self.pending:
+                    break
+        except StaleSnapshot as exception:
+            self.log.debug("skipping change log update: %s", exception)
+        except Exception as exception:
+            self.log.error("could not update change log: %s", exception)
+        finally:
+            self.updating = False
+
+    def start(self):
+        """
+        Record the baseline and start listening for changes on the current IOLoop
+        """
+        self.application.changeCallbacks.append(self.handleChange)
+        if self.periodicCallback is not None:
+            self.periodicCallback.start()
+        IOLoop.current().add_callback(self.update)
+
+    def stop(self):
+        """
+        Stop updating
+        """
+        if self.handleChange in self.application.changeCallbacks:
+            self.application.changeCallbacks.remove(self.handleChange)
+        if self.periodicCallback is not None:
+            self.periodicCallback.stop()
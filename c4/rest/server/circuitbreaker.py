@@ -0,0 +1,196 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Circuit breaker guarding blocking backend access from the REST server
+"""
+import collections
+import datetime
+import time
+
+from tornado import gen
+
+from c4.utils.logutil import ClassLogger
+
+
+class CircuitBreakerOpen(Exception):
+    """
+    Raised when the circuit breaker is open and no snapshot is available
+    """
+
+@ClassLogger
+class CircuitBreaker(object):
+    """
+    Circuit breaker for backend calls that are executed on an executor.
+
+    The breaker opens after ``failureThreshold`` consecutive failed or slow calls.
+    While open calls are not executed but answered with the last good snapshot for
+    the same key or fail fast. After ``resetTimeout`` seconds a single probe call is
+    let through (half-open) which either closes or re-opens the breaker.
+
+    Snapshots are kept for at most ``maxSnapshots`` keys, the least recently
+    stored ones are evicted first, and for at most ``maxSnapshotAge`` seconds
+    so that snapshots of removed nodes do not accumulate.
+
+    :param failureThreshold: number of consecutive failures before opening
+    :type failureThreshold: int
+    :param slowCallThreshold: calls taking longer than this many seconds count as failures
+    :type slowCallThreshold: float
+    :param callTimeout: seconds to wait for a call before giving up on it
+    :type callTimeout: float
+    :param resetTimeout: seconds to stay open before probing for recovery
+    :type resetTimeout: float
+    :param maxSnapshots: maximum number of snapshots kept
+    :type maxSnapshots: int
+    :param maxSnapshotAge: seconds after which a snapshot is no longer served
+    :type maxSnapshotAge: float
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failureThreshold=5, slowCallThreshold=2.0, callTimeout=5.0, resetTimeout=30.0,
+                 maxSnapshots=1000, maxSnapshotAge=3600.0):
+        self.failureThreshold = int(failureThreshold)
+        self.slowCallThreshold = float(slowCallThreshold)
+        self.callTimeout = float(callTimeout)
+        self.resetTimeout = float(resetTimeout)
+        self.maxSnapshots = int(maxSnapshots)
+        self.maxSnapshotAge = float(maxSnapshotAge)
+        self.failures = 0
+        self.openedAt = None
+        self.probing = False
+        # key -> (value, time stored) in the order stored
+        self.snapshots = collections.OrderedDict()
+        self._state = self.CLOSED
+
+    @property
+    def state(self):
+        """
+        Current state of the breaker
+        """
+        if self._state == self.OPEN and time.time() - self.openedAt >= self.resetTimeout:
+            self._state = self.HALF_OPEN
+            self.probing = False
+            self.log.info("circuit breaker half-open, probing backend")
+        return self._state
+
+    def allowRequest(self):
+        """
+        Check if a call should be executed
+
+        :returns: ``True`` if the call is allowed, ``False`` otherwise
+        :rtype: bool
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def recordFailure(self):
+        """
+        Record a failed call
+        """
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failureThreshold:
+            if self._state != self.OPEN:
+                self.log.warning("circuit breaker opened after %d failure(s)", self.failures)
+            self._state = self.OPEN
+            self.openedAt = time.time()
+            self.probing = False
+
+    def recordSuccess(self, duration):
+        """
+        Record a successful call
+
+        :param duration: call duration in seconds
+        :type duration: float
+        """
+        if duration >= self.slowCallThreshold:
+            self.log.warning("slow backend call took %.3f seconds", duration)
+            self.recordFailure()
+            return
+        if self._state != self.CLOSED:
+            self.log.info("circuit breaker closed")
+        self._state = self.CLOSED
+        self.failures = 0
+        self.probing = False
+
+    def getSnapshot(self, key):
+        """
+        Get last good value for the specified key
+
+        :param key: call key
+        :type key: tuple
+        :returns: value and its age in seconds or ``None``
+        :rtype: (object, float)
+        """
+        if key in self.snapshots:
+            value, timestamp = self.snapshots[key]
+            age = time.time() - timestamp
+            if age <= self.maxSnapshotAge:
+                return value, age
+            del self.snapshots[key]
+        return None
+
+    def putSnapshot(self, key, value):
+        """
+        Keep a good value for the specified key, evicting expired snapshots
+        and the least recently stored ones if there are too many
+
+        :param key: call key
+        :type key: tuple
+        :param value: value
+        """
+        now = time.time()
+        # re-insert to move the key to the end
+        self.snapshots.pop(key, None)
+        self.snapshots[key] = (value, now)
+        while self.snapshots:
+            oldestKey, (_, timestamp) = next(iter(self.snapshots.items()))
+            if len(self.snapshots) <= self.maxSnapshots and now - timestamp <= self.maxSnapshotAge:
+                break
+            del self.snapshots[oldestKey]
+
+    @gen.coroutine
+    def call(self, key, executor, function, *args, **kwargs):
+        """
+        Execute the function on the executor, guarded by the breaker
+
+        :param key: key identifying the call and its snapshot, ``None`` to not keep a snapshot
+        :type key: tuple
+        :param executor: executor to run the blocking function on
+        :type executor: :class:`~concurrent.futures.Executor`
+        :param function: blocking function
+        :type function: func
+        :returns: value and snapshot age in seconds, age is ``None`` for fresh values
+        :rtype: (object, float)
+        :raises CircuitBreakerOpen: if the breaker is open and there is no snapshot
+        """
+        if not self.allowRequest():
+            snapshot = self.getSnapshot(key)
+            if snapshot is None:
+                raise CircuitBreakerOpen("backend circuit breaker is open")
+            raise gen.Return(snapshot)
+
+        start = time.time()
+        try:
+            value = yield gen.with_timeout(datetime.timedelta(seconds=self.callTimeout),
+                                           executor.submit(function, *args, **kwargs))
+        except Exception as exception:
+            if isinstance(exception, gen.TimeoutError):
+                self.log.warning("backend call %s timed out after %.3f seconds", key, self.callTimeout)
+            self.recordFailure()
+            snapshot = self.getSnapshot(key)
+            if snapshot is None:
+                raise
+            raise gen.Return(snapshot)
+
+        self.recordSuccess(time.time() - start)
+        if key is not None:
+            self.putSnapshot(key, value)
+        raise gen.Return((value, None))
@@ -0,0 +1,148 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Response encodings selected through the ``Accept`` header
+
+Responses are JSON by default. Machine clients may ask for the more compact
+binary MessagePack or CBOR encodings of the same payloads, these are
+available if the ``msgpack`` or ``cbor2`` packages are installed. Further
+encodings can be added to the registry with :func:`registerEncoder`.
+"""
+import collections
+import json
+
+try:
+    import msgpack
+except ImportError: # pragma: no cover
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError: # pragma: no cover
+    cbor2 = None
+
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+# media type to encoder mapping, the first one is the default
+ENCODERS = collections.OrderedDict()
+# alternative media types clients use for registered encodings
+ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK
+}
+
+Encoder = collections.namedtuple("Encoder", ["mediaType", "contentType", "encode"])
+
+def encodeJSON(data):
+    """
+    Encode data as pretty-printed JSON, the format of all JSON responses
+
+    :param data: JSON serializable data
+    :returns: serialized data
+    :rtype: str
+    """
+    return json.dumps(data, indent=4, sort_keys=True, separators=(',', ': '))
+
+def registerEncoder(mediaType, encode, contentType=None):
+    """
+    Register an encoding
+
+    :param mediaType: media type, e.g., ``application/cbor``
+    :type mediaType: str
+    :param encode: function that encodes JSON serializable data
+    :type encode: func
+    :param contentType: ``Content-Type`` header value, defaults to the media type
+    :type contentType: str
+    """
+    ENCODERS[mediaType] = Encoder(mediaType, contentType or mediaType, encode)
+
+registerEncoder(JSON, encodeJSON, contentType="application/json; charset=UTF-8")
+if msgpack is not None:
+    registerEncoder(MSGPACK, lambda data: msgpack.packb(data, use_bin_type=True))
+if cbor2 is not None:
+    registerEncoder(CBOR, cbor2.dumps)
+
+def parseAccept(accept):
+    """
+    Parse an ``Accept`` header into media ranges and their quality values
+
+    :param accept: header value
+    :type accept: str
+    :returns: list of media range and quality tuples
+    :rtype: [(str, float)]
+    """
+    ranges = []
+    for part in accept.split(","):
+        parameters = part.split(";")
+        mediaRange = parameters[0].strip().lower()
+        if not mediaRange:
+            continue
+        quality = 1.0
+        for parameter in parameters[1:]:
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges.append((ALIASES.get(mediaRange, mediaRange), quality))
+    return ranges
+
+def negotiate(accept):
+    """
+    Select the encoder for an ``Accept`` header. The encoding with the highest
+    quality wins, explicitly listed media types win over wildcards and JSON is
+    used if nothing registered is acceptable, as clients did before
+    encodings could be negotiated.
+
+    :param accept: header value
+    :type accept: str
+    :returns: encoder
+    :rtype: :class:`Encoder`
+    """
+    ranges = parseAccept(accept or "")
+    best = None
+    for index, mediaType in enumerate(ENCODERS):
+        candidates = {
+            mediaType: 2,
+            mediaType.split("/")[0] + "/*": 1,
+            "*/*": 0
+        }
+        # the most specific matching range determines the quality, e.g., to exclude with q=0
+        matches = [
+            (candidates[mediaRange], quality)
+            for mediaRange, quality in ranges
+            if mediaRange in candidates
+        ]
+        if not matches:
+            continue
+        specificity, quality = max(matches)
+        if quality <= 0:
+            continue
+        rank = (quality, specificity, -index)
+        if best is None or rank > best[0]:
+            best = (rank, mediaType)
+    if best is None:
+        return ENCODERS[JSON]
+    return ENCODERS[best[1]]
+
+def transcode(response, mediaType):
+    """
+    Encode a JSON response in another encoding, used to derive encoded
+    responses from cached JSON responses
+
+    :param response: serialized JSON response
+    :type response: str
+    :param mediaType: media type of a registered encoder
+    :type mediaType: str
+    :returns: encoded response
+    :rtype: bytes
+    """
+    if isinstance(response, bytes):
+        response = response.decode("utf-8")
+    return ENCODERS[mediaType].encode(json.loads(response))
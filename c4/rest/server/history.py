@@ -0,0 +1,322 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Recent history of device metrics
+
+Numeric status values of sampled devices are kept in fixed-size ring
+buffers backed by arrays of doubles so memory use is bounded and known up
+front. Queries downsample a time range into buckets of min, max, mean and
+percentiles, vectorized with NumPy if it is available.
+"""
+import array
+import bisect
+import math
+import numbers
+import time
+
+from tornado import gen
+from tornado.ioloop import IOLoop, PeriodicCallback
+
+from c4.rest.server.cache import RefreshContext, StaleSnapshot
+from c4.utils.logutil import ClassLogger
+
+try:
+    import numpy
+except ImportError: # pragma: no cover
+    numpy = None
+
+
+# percentiles reported for each bucket
+PERCENTILES = (50, 90, 99)
+
+# upper limit on the number of buckets of a single query
+MAX_BUCKETS = 1000
+
+class RingBuffer(object):
+    """
+    Fixed-size buffer of samples that overwrites the oldest sample when full.
+    Samples need to be appended in time order.
+
+    :param capacity: maximum number of samples
+    :type capacity: int
+    """
+    def __init__(self, capacity=360):
+        self.capacity = int(capacity)
+        self.timestamps = array.array("d", [0.0]) * self.capacity
+        self.values = array.array("d", [0.0]) * self.capacity
+        self.index = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, value):
+        """
+        Add sample
+
+        :param timestamp: sample time
+        :type timestamp: float
+        :param value: sample value
+        :type value: float
+        """
+        self.timestamps[self.index] = timestamp
+        self.values[self.index] = value
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def getRange(self, start, end):
+        """
+        Get samples within a time range in time order
+
+        :param start: start of the range, inclusive
+        :type start: float
+        :param end: end of the range, exclusive
+        :type end: float
+        :returns: sample times and values
+        :rtype: (:class:`~array.array`, :class:`~array.array`)
+        """
+        if self.count < self.capacity:
+            timestamps = self.timestamps[:self.count]
+            values = self.values[:self.count]
+        else:
+            timestamps = self.timestamps[self.index:] + self.timestamps[:self.index]
+            values = self.values[self.index:] + self.values[:self.index]
+        first = bisect.bisect_left(timestamps, start)
+        last = bisect.bisect_left(timestamps, end)
+        return timestamps[first:last], values[first:last]
+
+def getPercentile(values, percentile):
+    """
+    Get percentile of sorted values using linear interpolation between
+    closest ranks, the same method as :func:`numpy.percentile`
+
+    :param values: sorted values
+    :type values: [float]
+    :param percentile: percentile between 0 and 100
+    :type percentile: float
+    :returns: percentile
+    :rtype: float
+    """
+    rank = (len(values) - 1) * percentile / 100.0
+    lower = int(math.floor(rank))
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+def downsample(timestamps, values, start, step):
+    """
+    Aggregate samples into buckets of ``step`` seconds beginning at ``start``.
+    Empty buckets are omitted.
+
+    :param timestamps: sample times in time order
+    :type timestamps: :class:`~array.array`
+    :param values: sample values
+    :type values: :class:`~array.array`
+    :param start: start of the first bucket
+    :type start: float
+    :param step: bucket size in seconds
+    :type step: float
+    :returns: bucket start times and ``count``, ``min``, ``max``, ``mean`` and
+        percentile (e.g. ``p99``) lists
+    :rtype: dict
+    """
+    result = dict((name, []) for name in ["timestamp", "count", "min", "max", "mean"])
+    for percentile in PERCENTILES:
+        result["p{0}".format(percentile)] = []
+    if not len(timestamps):
+        return result
+
+    if numpy is not None:
+        timestamps = numpy.frombuffer(timestamps, dtype=numpy.float64)
+        values = numpy.frombuffer(values, dtype=numpy.float64)
+        buckets = numpy.floor((timestamps - start) / step).astype(numpy.int64)
+        # samples are in time order so each bucket is a contiguous slice
+        offsets = numpy.flatnonzero(numpy.diff(buckets)) + 1
+        boundaries = numpy.concatenate(([0], offsets, [len(values)]))
+        counts = numpy.diff(boundaries)
+        starts = boundaries[:-1]
+        result["timestamp"] = (start + buckets[starts] * step).tolist()
+        result["count"] = counts.tolist()
+        result["min"] = numpy.minimum.reduceat(values, starts).tolist()
+        result["max"] = numpy.maximum.reduceat(values, starts).tolist()
+        result["mean"] = (numpy.add.reduceat(values, starts) / counts).tolist()
+        percentiles = numpy.array([
+            numpy.percentile(values[first:last], PERCENTILES)
+            for first, last in zip(boundaries[:-1], boundaries[1:])
+        ])
+        for index, percentile in enumerate(PERCENTILES):
+            result["p{0}".format(percentile)] = percentiles[:, index].tolist()
+        return result
+
+    first = 0
+    while first < len(timestamps):
+        bucket = int(math.floor((timestamps[first] - start) / step))
+        last = bisect.bisect_left(timestamps, start + (bucket + 1) * step, first)
+        bucketValues = sorted(values[first:last])
+        result["timestamp"].append(start + bucket * step)
+        result["count"].append(len(bucketValues))
+        result["min"].append(bucketValues[0])
+        result["max"].append(bucketValues[-1])
+        result["mean"].append(sum(bucketValues) / len(bucketValues))
+        for percentile in PERCENTILES:
+            result["p{0}".format(percentile)].append(getPercentile(bucketValues, percentile))
+        first = last
+    return result
+
+def getMetrics(status, prefix=""):
+    """
+    Get numeric values from a serialized status, nested names are joined by ``.``
+
+    :param status: serialized status
+    :type status: dict
+    :param prefix: name prefix
+    :type prefix: str
+    :returns: metric name to value mapping
+    :rtype: dict
+    """
+    metrics = {}
+    for name, value in status.items():
+        if isinstance(value, dict):
+            metrics.update(getMetrics(value, prefix + name + "."))
+        elif isinstance(value, numbers.Real) and not isinstance(value, bool):
+            metrics[prefix + name] = float(value)
+    return metrics
+
+class MetricHistory(object):
+    """
+    Ring buffers of recent metric samples per device
+
+    :param capacity: maximum number of samples per metric
+    :type capacity: int
+    """
+    def __init__(self, capacity=360):
+        self.capacity = int(capacity)
+        # key -> metric name -> ring buffer
+        self.buffers = {}
+        # key -> time of the last recorded status
+        self.lastTimestamps = {}
+
+    def record(self, key, timestamp, status):
+        """
+        Record numeric values of a status unless it is not newer than the
+        last one recorded for the device, e.g., because the device did not
+        report a new status since
+
+        :param key: key identifying the device
+        :type key: tuple
+        :param timestamp: time the status was reported
+        :type timestamp: float
+        :param status: serialized status
+        :type status: dict
+        :returns: ``True`` if the status was recorded, ``False`` otherwise
+        :rtype: bool
+        """
+        if key in self.lastTimestamps and timestamp <= self.lastTimestamps[key]:
+            return False
+        self.lastTimestamps[key] = timestamp
+        buffers = self.buffers.setdefault(key, {})
+        for name, value in getMetrics(status).items():
+            if name not in buffers:
+                buffers[name] = RingBuffer(self.capacity)
+            buffers[name].append(timestamp, value)
+        return True
+
+    def query(self, key, start, end, step, metrics=None):
+        """
+        Get downsampled metrics of a device
+
+        :param key: key identifying the device
+        :type key: tuple
+        :param start: start of the time range, inclusive
+        :type start: float
+        :param end: end of the time range, exclusive
+        :type end: float
+        :param step: bucket size in seconds
+        :type step: float
+        :param metrics: metric names, all metrics by default
+        :type metrics: [str]
+        :returns: metric name to aggregates mapping, see :func:`downsample`
+        :rtype: dict
+        :raises ValueError: if the range or step is invalid
+        """
+        if any(math.isinf(value) or math.isnan(value) for value in (start, end, step)):
+            raise ValueError("time range and step need to be finite numbers")
+        if step <= 0 or end <= start:
+            raise ValueError("time range and step need to be positive")
+        if (end - start) / step > MAX_BUCKETS:
+            raise ValueError("query exceeds {0} buckets".format(MAX_BUCKETS))
+        buffers = self.buffers.get(key, {})
+        if metrics is not None:
+            buffers = dict((name, buffers[name]) for name in metrics if name in buffers)
+        return dict(
+            (name, downsample(*(buffer.getRange(start, end) + (start, step))))
+            for name, buffer in buffers.items()
+        )
+
+@ClassLogger
+class HistorySampler(object):
+    """
+    Periodically collects status through the application's
+    :class:`~c4.rest.server.status.StatusCollector` and records it in the
+    application's :class:`MetricHistory`. Samples are recorded with the
+    time the device reported them and taken at multiples of the interval,
+    so worker processes, which sample on their own, record the same
+    history as long as devices do not report more often than that.
+
+    :param application: application
+    :type application: :class:`~tornado.web.Application`
+    :param getCalls: coroutine function ``getCalls(context)`` returning a device key to
+        status function and arguments mapping of the devices to sample, the status
+        functions return the time the status was reported and the serialized status
+    :type getCalls: func
+    :param interval: seconds between samples
+    :type interval: float
+    """
+    def __init__(self, application, getCalls, interval=10.0):
+        self.application = application
+        self.getCalls = getCalls
+        self.context = RefreshContext(application)
+        self.sampling = False
+        self.interval = float(interval)
+        self.periodicCallback = PeriodicCallback(self.sample, self.interval * 1000)
+        self.startTimeout = None
+
+    @gen.coroutine
+    def sample(self):
+        """
+        Record the current status of all sampled devices
+        """
+        if self.sampling:
+            return
+        self.sampling = True
+        try:
+            calls = yield self.getCalls(self.context)
+            results = yield self.application.statusCollector.collectAll(calls)
+            for key, (sample, _, _) in results.items():
+                # status that was already recorded is skipped by the history
+                if sample is not None:
+                    timestamp, status = sample
+                    self.application.metricHistory.record(key, timestamp, status)
+        except StaleSnapshot as exception:
+            self.log.debug("skipping sample: %s", exception)
+        except Exception as exception:
+            self.log.error("could not sample device status: %s", exception)
+        finally:
+            self.sampling = False
+
+    def start(self):
+        """
+        Start sampling on the current IOLoop at the next multiple of the interval
+        """
+        ioloop = IOLoop.current()
+        self.startTimeout = ioloop.call_later(self.interval - time.time() % self.interval, self.periodicCallback.start)
+
+    def stop(self):
+        """
+        Stop sampling
+        """
+        if self.startTimeout is not None:
+            IOLoop.current().remove_timeout(self.startTimeout)
+            self.startTimeout = None
+        self.periodicCallback.stop()
@@ -0,0 +1,269 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Asynchronous jobs for long-running operations
+
+Instead of holding the connection until an expensive operation finished,
+handlers submit it as a job and answer with ``202 Accepted`` right away.
+Jobs run on the IOLoop with a bounded number running at the same time,
+the blocking parts on the executor. Finished jobs are kept for a limited
+time in a store of limited size where clients poll ``/api/jobs/{id}``.
+"""
+import collections
+import datetime
+import json
+import time
+import uuid
+
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.ioloop import PeriodicCallback
+from tornado.locks import Semaphore
+
+from c4.rest.server.cache import RefreshContext
+from c4.utils.logutil import ClassLogger
+
+
+class JobStoreFull(Exception):
+    """
+    Raised when the job store only contains unfinished jobs
+    """
+
+class Job(object):
+    """
+    Asynchronous job
+
+    :param name: job name, e.g., the operation
+    :type name: str
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.state = Job.PENDING
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.done = Future()
+
+    @property
+    def isFinished(self):
+        """
+        Job finished successfully or failed
+        """
+        return self.state in (Job.DONE, Job.FAILED)
+
+    def toJSONSerializable(self):
+        """
+        Get job information
+
+        :returns: job information
+        :rtype: dict
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "result": self.result,
+            "error": self.error
+        }
+
+@ClassLogger
+class JobManager(object):
+    """
+    Runs jobs and keeps their results
+
+    Job information is published to a shared store, if there is one, so
+    that pre-forked worker processes can answer for jobs running in another
+    worker. The store is separate from the shared response store, whose
+    entries are invalidated and evicted independently of the jobs.
+
+    :param application: application
+    :type application: :class:`~tornado.web.Application`
+    :param maxConcurrent: maximum number of jobs running at the same time
+    :type maxConcurrent: int
+    :param maxJobs: maximum number of jobs kept
+    :type maxJobs: int
+    :param ttl: seconds finished jobs are kept
+    :type ttl: float
+    :param sharedStore: store that shares job information with other worker processes,
+        needs room for the jobs of all workers
+    :type sharedStore: :class:`~c4.rest.server.sharedcache.SharedResponseStore`
+    """
+    def __init__(self, application, maxConcurrent=4, maxJobs=100, ttl=300.0, sharedStore=None):
+        self.application = application
+        self.semaphore = Semaphore(int(maxConcurrent))
+        self.maxJobs = int(maxJobs)
+        self.ttl = float(ttl)
+        self.sharedStore = sharedStore
+        self.jobs = collections.OrderedDict()
+        self.periodicCallback = PeriodicCallback(self.removeExpired, min(self.ttl, 60.0) * 1000) if self.ttl > 0 else None
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def start(self):
+        """
+        Start removing expired jobs periodically on the current IOLoop
+        """
+        if self.periodicCallback is not None:
+            self.periodicCallback.start()
+
+    def stop(self):
+        """
+        Stop removing expired jobs
+        """
+        if self.periodicCallback is not None:
+            self.periodicCallback.stop()
+
+    def removeExpired(self):
+        """
+        Remove jobs that finished more than ``ttl`` seconds ago
+        """
+        now = time.time()
+        for jobId, job in list(self.jobs.items()):
+            if job.isFinished and now - job.finished > self.ttl:
+                self.remove(jobId)
+
+    def evict(self):
+        """
+        Remove expired jobs and, if the store is full, the oldest finished job
+
+        :raises JobStoreFull: if the store is full and no job finished yet
+        """
+        self.removeExpired()
+        if len(self.jobs) < self.maxJobs:
+            return
+        finishedJobs = [job for job in self.jobs.values() if job.isFinished]
+        if not finishedJobs:
+            raise JobStoreFull("{0} jobs are still running".format(len(self.jobs)))
+        self.remove(min(finishedJobs, key=lambda job: job.finished).id)
+
+    def remove(self, jobId):
+        """
+        Remove a job and its shared information
+
+        :param jobId: job id
+        :type jobId: str
+        """
+        del self.jobs[jobId]
+        if self.sharedStore is not None:
+            self.sharedStore.delete(("job", jobId))
+
+    def submit(self, name, function, *args):
+        """
+        Submit a job
+
+        :param name: job name
+        :type name: str
+        :param function: coroutine function ``function(context, *args)`` returning a JSON serializable
+            result, where ``context`` is a :class:`~c4.rest.server.cache.RefreshContext`
+        :type function: func
+        :returns: job
+        :rtype: :class:`Job`
+        :raises JobStoreFull: if the store is full and no job finished yet
+        """
+        self.evict()
+        job = Job(name)
+        self.jobs[job.id] = job
+        self.publish(job)
+        self.run(job, function, *args)
+        return job
+
+    @gen.coroutine
+    def run(self, job, function, *args):
+        """
+        Run a job once the number of running jobs allows it
+        """
+        with (yield self.semaphore.acquire()):
+            job.state = Job.RUNNING
+            job.started = time.time()
+            self.publish(job)
+            try:
+                job.result = yield function(RefreshContext(self.application), *args)
+                job.state = Job.DONE
+            except Exception as exception:
+                self.log.error("job '%s' (%s) failed: %s", job.name, job.id, exception)
+                job.error = str(exception) or exception.__class__.__name__
+                job.state = Job.FAILED
+            job.finished = time.time()
+        self.publish(job)
+        job.done.set_result(job)
+
+    def publish(self, job):
+        """
+        Publish job information to the shared store. If the result of a
+        finished job does not fit, the job is published without it so
+        that other workers still see that it finished.
+        """
+        if self.sharedStore is None:
+            return
+        information = job.toJSONSerializable()
+        value = json.dumps(information).encode("utf-8")
+        if self.sharedStore.put(("job", job.id), value) is None and job.isFinished:
+            self.log.warning("result of job '%s' (%s) with %d bytes is too large to share with other workers",
+                             job.name, job.id, len(value))
+            information["result"] = None
+            information["error"] = "job result is too large to be shared between worker processes"
+            self.sharedStore.put(("job", job.id), json.dumps(information).encode("utf-8"))
+
+    def get(self, jobId):
+        """
+        Get job information
+
+        :param jobId: job id
+        :type jobId: str
+        :returns: job information or ``None`` if the job does not exist or expired
+        :rtype: dict
+        """
+        self.removeExpired()
+        job = self.jobs.get(jobId)
+        if job is not None:
+            return job.toJSONSerializable()
+        if self.sharedStore is not None:
+            shared = self.sharedStore.get(("job", jobId))
+            if shared is not None:
+                information = json.loads(shared[0].decode("utf-8"))
+                if information["finished"] is None or time.time() - information["finished"] <= self.ttl:
+                    return information
+        return None
+
+    @gen.coroutine
+    def wait(self, jobId, timeout):
+        """
+        Wait until a job finished
+
+        :param jobId: job id
+        :type jobId: str
+        :param timeout: maximum number of seconds to wait
+        :type timeout: float
+        :returns: job information or ``None`` if the job does not exist or expired
+        :rtype: dict
+        """
+        deadline = time.time() + timeout
+        self.removeExpired()
+        job = self.jobs.get(jobId)
+        if job is not None:
+            try:
+                yield gen.with_timeout(datetime.timedelta(seconds=timeout), job.done)
+            except gen.TimeoutError:
+                pass
+            raise gen.Return(job.toJSONSerializable())
+
+        # job of another worker process
+        information = self.get(jobId)
+        while information is not None and information["finished"] is None and time.time() < deadline:
+            yield gen.sleep(min(0.1, max(deadline - time.time(), 0)))
+            information = self.get(jobId)
+        raise gen.Return(information)
@@ -0,0 +1,161 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Non-blocking logging for REST server processes
+
+Log handlers write to files, consoles or syslog synchronously, so a stalled
+disk or syslog daemon stalls the IOLoop thread and with it all requests.
+The :class:`AsyncLogHandler` only puts records into a bounded queue and a
+background thread passes them on to the actual handlers. Successful access
+log lines can be sampled. Access log lines and records below ``WARNING`` are
+dropped while the queue is full, warnings and errors are always kept and
+queued beyond the limit if necessary, without blocking.
+"""
+import logging
+import random
+import threading
+
+try:
+    import queue
+except ImportError: # pragma: no cover
+    import Queue as queue # pylint: disable=import-error
+
+
+# logger used by Tornado for access log lines
+ACCESS_LOGGER = "tornado.access"
+
+class AsyncLogHandler(logging.Handler):
+    """
+    Log handler that hands records over to a background thread writing
+    them to the actual handlers
+
+    :param handlers: handlers that write the records
+    :type handlers: [:class:`~logging.Handler`]
+    :param queueSize: maximum number of queued records that may be dropped
+    :type queueSize: int
+    :param accessLogSampleRate: fraction of successful access log lines that are kept
+    :type accessLogSampleRate: float
+    """
+    def __init__(self, handlers, queueSize=10000, accessLogSampleRate=1.0):
+        super(AsyncLogHandler, self).__init__()
+        self.handlers = list(handlers)
+        # unbounded so that warnings and errors never block or get dropped
+        self.queue = queue.Queue()
+        self.queueSize = int(queueSize)
+        self.accessLogSampleRate = float(accessLogSampleRate)
+        self.dropped = 0
+        self.reportedDropped = 0
+        self.sampled = 0
+        self.writer = threading.Thread(target=self.write, name="Log writer")
+        self.writer.daemon = True
+
+    def start(self):
+        """
+        Start the background writer
+        """
+        self.writer.start()
+
+    def emit(self, record):
+        """
+        Queue a record, sampling successful access log lines and dropping
+        access log lines and records below ``WARNING`` if the queue is full
+        """
+        if record.name == ACCESS_LOGGER or record.levelno < logging.WARNING:
+            if (record.name == ACCESS_LOGGER and record.levelno < logging.WARNING
+                    and random.random() >= self.accessLogSampleRate):
+                self.sampled += 1
+                return
+            if self.queue.qsize() >= self.queueSize:
+                self.dropped += 1
+                return
+        self.queue.put(self.prepare(record))
+
+    def prepare(self, record):
+        """
+        Resolve the message of a record before it is queued, its arguments
+        might change before the writer gets to it
+
+        :param record: log record
+        :type record: :class:`~logging.LogRecord`
+        :returns: log record
+        :rtype: :class:`~logging.LogRecord`
+        """
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+        except Exception: # pylint: disable=broad-except
+            self.handleError(record)
+        return record
+
+    def write(self):
+        """
+        Write queued records until stopped
+        """
+        while True:
+            record = self.queue.get()
+            if record is None:
+                break
+            self.dispatch(record)
+            if self.dropped != self.reportedDropped:
+                dropped = self.dropped
+                self.dispatch(logging.makeLogRecord({
+                    "name": __name__,
+                    "levelno": logging.WARNING,
+                    "levelname": logging.getLevelName(logging.WARNING),
+                    "msg": "log queue full, dropped {0} log records".format(dropped - self.reportedDropped)
+                }))
+                self.reportedDropped = dropped
+
+    def dispatch(self, record):
+        """
+        Pass a record on to the actual handlers
+        """
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                try:
+                    handler.handle(record)
+                except Exception: # pylint: disable=broad-except
+                    handler.handleError(record)
+
+    def close(self):
+        """
+        Write the remaining records and stop the background writer
+        """
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+        for handler in self.handlers:
+            handler.flush()
+        super(AsyncLogHandler, self).close()
+
+def installAsyncLogging(queueSize=10000, accessLogSampleRate=1.0):
+    """
+    Replace the handlers of the root logger by an :class:`AsyncLogHandler`
+    that writes to them in the background. Loggers propagating to the root
+    logger, i.e., the Tornado and class loggers, no longer block on writes.
+
+    :param queueSize: maximum number of queued records that may be dropped
+    :type queueSize: int
+    :param accessLogSampleRate: fraction of successful access log lines that are kept
+    :type accessLogSampleRate: float
+    :returns: the handler, see :func:`uninstallAsyncLogging`
+    :rtype: :class:`AsyncLogHandler`
+    """
+    rootLogger = logging.getLogger()
+    handler = AsyncLogHandler(rootLogger.handlers, queueSize=queueSize, accessLogSampleRate=accessLogSampleRate)
+    handler.start()
+    rootLogger.handlers = [handler]
+    return handler
+
+def uninstallAsyncLogging(handler):
+    """
+    Write the remaining records and restore the original handlers of the root logger
+
+    :param handler: handler returned by :func:`installAsyncLogging`
+    :type handler: :class:`AsyncLogHandler`
+    """
+    rootLogger = logging.getLogger()
+    rootLogger.handlers = handler.handlers
+    handler.close()
@@ -0,0 +1,216 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Memory usage of the running REST server
+
+Allocation tracking uses :mod:`tracemalloc`, which is only switched on when
+requested since tracing slows down allocations. Top allocation sites are
+reported for the current snapshot and as difference to a baseline snapshot
+which makes growth between two points in time visible. Sizes of the
+internal caches are estimated from their contents.
+"""
+import sys
+import threading
+
+from c4.utils.logutil import ClassLogger
+
+try:
+    import tracemalloc
+except ImportError: # pragma: no cover
+    tracemalloc = None
+
+
+def getCacheSizes(application):
+    """
+    Get number of entries and estimated size in bytes of the internal caches
+
+    :param application: application
+    :type application: :class:`~c4.rest.server.tornadoserver.RestApplication`
+    :returns: cache name to ``entries`` and ``bytes`` mapping, shared stores
+        additionally report their number of ``slots``
+    :rtype: dict
+    """
+    sizes = {}
+
+    responseCache = application.responseCache
+    sizes["responseCache"] = {
+        "entries": len(responseCache.entries),
+        "bytes": sum(sys.getsizeof(entry.value) for entry in list(responseCache.entries.values()))
+    }
+
+    snapshots = application.circuitBreaker.snapshots
+    sizes["backendSnapshots"] = {
+        "entries": len(snapshots),
+        "bytes": sum(getObjectSize(value) for value, _ in list(snapshots.values()))
+    }
+
+    latest = application.statusCollector.latest
+    sizes["deviceStatus"] = {
+        "entries": len(latest),
+        "bytes": sum(getObjectSize(value) for value, _ in list(latest.values()))
+    }
+
+    buffers = [
+        buffer
+        for metrics in list(application.metricHistory.buffers.values())
+        for buffer in list(metrics.values())
+    ]
+    sizes["metricHistory"] = {
+        "entries": len(buffers),
+        "bytes": sum(sys.getsizeof(buffer.timestamps) + sys.getsizeof(buffer.values) for buffer in buffers)
+    }
+
+    jobs = list(application.jobManager.jobs.values())
+    sizes["jobs"] = {
+        "entries": len(jobs),
+        "bytes": sum(getObjectSize(job.result) for job in jobs)
+    }
+
+    for name, sharedStore in (("sharedStore", application.responseCache.sharedStore),
+                              ("sharedJobStore", application.jobManager.sharedStore),
+                              ("sharedChangeLogStore", application.changeLog.sharedStore)):
+        if sharedStore is not None:
+            sizes[name] = {
+                "entries": len(sharedStore),
+                "slots": sharedStore.slots,
+                "bytes": len(sharedStore.mapping)
+            }
+    return sizes
+
+def getObjectSize(value, depth=4):
+    """
+    Estimate the size of an object including the containers, strings and
+    numbers it references, up to a limited depth
+
+    :param value: object
+    :param depth: number of nested levels to include
+    :type depth: int
+    :returns: size in bytes
+    :rtype: int
+    """
+    size = sys.getsizeof(value)
+    if depth <= 0:
+        return size
+    if isinstance(value, dict):
+        items = list(value.items())
+        size += sum(getObjectSize(key, depth - 1) + getObjectSize(item, depth - 1) for key, item in items)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(getObjectSize(item, depth - 1) for item in list(value))
+    elif hasattr(value, "__dict__"):
+        size += getObjectSize(vars(value), depth - 1)
+    return size
+
+def formatStatistic(statistic):
+    """
+    Format a :mod:`tracemalloc` statistic or statistic difference
+
+    :returns: allocation site with size and count
+    :rtype: dict
+    """
+    frame = statistic.traceback[0]
+    result = {
+        "location": "{0}:{1}".format(frame.filename, frame.lineno),
+        "size": statistic.size,
+        "count": statistic.count
+    }
+    if hasattr(statistic, "size_diff"):
+        result["sizeDiff"] = statistic.size_diff
+        result["countDiff"] = statistic.count_diff
+    return result
+
+@ClassLogger
+class MemoryTracker(object):
+    """
+    Controls allocation tracking and keeps a baseline snapshot. Starting
+    and stopping waits for snapshots in progress, so these methods should
+    be called on an executor as well.
+    """
+    def __init__(self):
+        self.baseline = None
+        # tracing must not be stopped while a snapshot is taken
+        self.lock = threading.Lock()
+
+    @property
+    def available(self):
+        """
+        Allocation tracking is supported by this Python version
+        """
+        return tracemalloc is not None
+
+    @property
+    def tracing(self):
+        """
+        Allocations are being traced
+        """
+        return self.available and tracemalloc.is_tracing()
+
+    def start(self, frames=1):
+        """
+        Start tracing allocations
+
+        :param frames: number of frames stored per allocation
+        :type frames: int
+        """
+        with self.lock:
+            if not self.tracing:
+                tracemalloc.start(int(frames))
+                self.log.info("started tracing memory allocations with %d frame(s)", frames)
+
+    def stop(self):
+        """
+        Stop tracing allocations and drop the baseline
+        """
+        with self.lock:
+            if self.tracing:
+                tracemalloc.stop()
+                self.log.info("stopped tracing memory allocations")
+            self.baseline = None
+
+    def takeSnapshot(self):
+        """
+        Take a snapshot without allocations of the tracing machinery itself
+
+        :returns: snapshot
+        :rtype: :class:`tracemalloc.Snapshot`
+        """
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>")
+        ])
+
+    def getStatistics(self, limit=20, groupBy="lineno", baseline=False):
+        """
+        Get top allocation sites and the difference to the baseline snapshot.
+        This is expensive and should be called on an executor.
+
+        :param limit: number of allocation sites
+        :type limit: int
+        :param groupBy: ``lineno``, ``filename`` or ``traceback``
+        :type groupBy: str
+        :param baseline: keep the current snapshot as new baseline
+        :type baseline: bool
+        :returns: traced memory, top allocation sites and, if there is a baseline, top differences,
+            or ``None`` if allocations are not traced (anymore)
+        :rtype: dict
+        """
+        with self.lock:
+            if not self.tracing:
+                return None
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = self.takeSnapshot()
+            previous = self.baseline
+            if baseline:
+                self.baseline = snapshot
+        statistics = {
+            "traced": {"current": current, "peak": peak},
+            "top": [formatStatistic(statistic) for statistic in snapshot.statistics(groupBy)[:limit]]
+        }
+        if previous is not None:
+            statistics["diff"] = [
+                formatStatistic(statistic)
+                for statistic in snapshot.compare_to(previous, groupBy)[:limit]
+            ]
+        return statistics
@@ -0,0 +1,107 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Sampling profiler for the running REST server
+
+A background thread periodically captures the stacks of all other threads,
+i.e., the IOLoop thread and the executor threads, and counts identical
+stacks. Sampling only reads the current frames so the profiled code runs
+unmodified and the overhead is limited to the sampling thread itself.
+The result is available in the collapsed stack format understood by
+flame graph tools, one ``thread;outer;...;inner count`` line per stack.
+"""
+import collections
+import sys
+import threading
+import time
+
+
+class StackSampler(object):
+    """
+    Samples the stacks of all threads except the sampling one
+
+    :param interval: seconds between samples
+    :type interval: float
+    """
+    def __init__(self, interval=0.01):
+        self.interval = float(interval)
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.duration = 0.0
+
+    @staticmethod
+    def formatFrame(frame):
+        """
+        Format a frame as ``function (file:line)`` using the first line of
+        the function so that samples aggregate per function
+        """
+        code = frame.f_code
+        return "{0} ({1}:{2})".format(code.co_name, code.co_filename, code.co_firstlineno)
+
+    def sample(self):
+        """
+        Take a single sample of all other threads
+        """
+        currentThread = threading.current_thread().ident
+        threadNames = dict((thread.ident, thread.name) for thread in threading.enumerate())
+        for threadId, frame in sys._current_frames().items(): # pylint: disable=protected-access
+            if threadId == currentThread:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self.formatFrame(frame))
+                frame = frame.f_back
+            stack.append(threadNames.get(threadId, str(threadId)))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, duration):
+        """
+        Sample for the specified time, blocks the calling thread
+
+        :param duration: seconds to sample
+        :type duration: float
+        :returns: the sampler
+        :rtype: :class:`StackSampler`
+        """
+        start = time.time()
+        end = start + duration
+        nextSample = start
+        while True:
+            self.sample()
+            nextSample += self.interval
+            now = time.time()
+            if nextSample >= end:
+                break
+            if nextSample > now:
+                time.sleep(nextSample - now)
+        self.duration = time.time() - start
+        return self
+
+    def toCollapsed(self):
+        """
+        Get the profile in the collapsed stack format
+
+        :returns: one ``stack count`` line per stack
+        :rtype: str
+        """
+        return "".join(
+            "{0} {1}\n".format(stack, count)
+            for stack, count in sorted(self.stacks.items())
+        )
+
+    def toJSONSerializable(self):
+        """
+        Get the profile with the stacks and their counts
+
+        :returns: profile
+        :rtype: dict
+        """
+        return {
+            "samples": self.samples,
+            "interval": self.interval,
+            "duration": self.duration,
+            "stacks": dict(self.stacks)
+        }
@@ -0,0 +1,108 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Route dispatch using a prefix tree of path segments
+
+Routes are paths such as ``/api/nodes/{node}/devices/{device}`` where
+segments in curly braces are parameters matching any non-empty segment.
+Matching walks the tree one segment at a time so its cost depends on the
+depth of the path and not on the number of routes. Static segments take
+precedence over parameters.
+"""
+import re
+
+from tornado.escape import url_unescape
+
+
+PARAMETER_PATTERN = re.compile(r"^\{([A-Za-z_][A-Za-z0-9_]*)\}$")
+
+class RouteNode(object):
+    """
+    Node in the route tree
+    """
+    __slots__ = ["children", "parameter", "parameterNode", "target"]
+
+    def __init__(self):
+        self.children = {}
+        self.parameter = None
+        self.parameterNode = None
+        self.target = None
+
+class RouteTrie(object):
+    """
+    Prefix tree of routes
+    """
+    def __init__(self):
+        self.root = RouteNode()
+        self.routes = {}
+
+    def __len__(self):
+        return len(self.routes)
+
+    def add(self, path, target):
+        """
+        Add route
+
+        :param path: route path, parameters are specified as ``{name}``
+        :type path: str
+        :param target: target for the route, e.g., the request handler and its initialization arguments
+        :raises ValueError: if the route conflicts with an existing one
+        """
+        node = self.root
+        for segment in path.split("/"):
+            match = PARAMETER_PATTERN.match(segment)
+            if match:
+                parameter = match.group(1)
+                if node.parameterNode is None:
+                    node.parameter = parameter
+                    node.parameterNode = RouteNode()
+                elif node.parameter != parameter:
+                    raise ValueError("parameter '{0}' of route '{1}' conflicts with parameter '{2}'".format(
+                        parameter, path, node.parameter))
+                node = node.parameterNode
+            else:
+                node = node.children.setdefault(segment, RouteNode())
+        if node.target is not None:
+            raise ValueError("route '{0}' already exists".format(path))
+        node.target = target
+        self.routes[path] = target
+
+    def match(self, path):
+        """
+        Find the target for the specified request path
+
+        :param path: request path
+        :type path: str
+        :returns: target and path parameters as url unescaped bytes or ``None``
+        :rtype: (object, dict)
+        """
+        segments = path.split("/")
+        parameters = {}
+        node = self._match(self.root, segments, 0, parameters)
+        if node is None:
+            return None
+        return node.target, dict(
+            (name, url_unescape(value, encoding=None, plus=False))
+            for name, value in parameters.items()
+        )
+
+    def _match(self, node, segments, index, parameters):
+        """
+        Match remaining segments, preferring static segments over parameters
+        """
+        if index == len(segments):
+            return node if node.target is not None else None
+        segment = segments[index]
+        child = node.children.get(segment)
+        if child is not None:
+            result = self._match(child, segments, index + 1, parameters)
+            if result is not None:
+                return result
+        if node.parameterNode is not None and segment:
+            result = self._match(node.parameterNode, segments, index + 1, parameters)
+            if result is not None:
+                parameters[node.parameter] = segment
+                return result
+        return None
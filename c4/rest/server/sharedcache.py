@@ -0,0 +1,387 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Memory-mapped response store shared between pre-forked REST server workers
+
+The file consists of a header followed by a fixed number of slots. Each slot
+holds a single serialized response together with its version stamp. Writers
+are serialized across processes using a POSIX record lock on the file while
+readers do not lock at all but use a per slot sequence counter (seqlock) to
+detect and retry torn reads.
+
+Cached responses must not be readable or modifiable by other local users,
+so store files are only opened if they belong to the current user and are
+not accessible to anybody else, by default in a private runtime directory.
+"""
+import errno
+import fcntl
+import hashlib
+import mmap
+import os
+import stat
+import struct
+import tempfile
+import time
+import zlib
+
+from c4.utils.logutil import ClassLogger
+
+
+# magic, number of slots, slot size, generation, version
+HEADER = struct.Struct("<8sIIQQ")
+HEADER_SIZE = 64
+MAGIC = b"C4RCACHE"
+
+# sequence, version, generation, created, claimed until, length, key length, key
+SLOT_HEADER = struct.Struct("<QQQddII128s")
+SLOT_HEADER_SIZE = 192
+SEQUENCE = struct.Struct("<Q")
+# claimed until field follows sequence, version, generation and created
+CLAIMED_UNTIL = struct.Struct("<d")
+CLAIMED_UNTIL_OFFSET = 32
+
+MAX_READ_RETRIES = 10
+
+def encodeKey(key):
+    """
+    Encode cache key into a stable byte representation that fits into a slot
+
+    :param key: cache key
+    :type key: tuple
+    :returns: encoded key
+    :rtype: bytes
+    """
+    encoded = repr(key).encode("utf-8")
+    if len(encoded) > 128:
+        encoded = hashlib.sha1(encoded).hexdigest().encode("ascii")
+    return encoded
+
+def checkPrivate(path, status, isType):
+    """
+    Check that a file belongs to the current user and is not accessible to other users
+
+    :param path: path
+    :type path: str
+    :param status: status of the file, not following symbolic links
+    :type status: :class:`~os.stat_result`
+    :param isType: file type check, e.g., :func:`stat.S_ISREG`
+    :type isType: func
+    :raises ValueError: if the file is of another type, owned by another user or accessible to other users
+    """
+    if not isType(status.st_mode) or status.st_uid != os.geteuid() or status.st_mode & 0o077:
+        raise ValueError("'{0}' needs to be owned by and only accessible to user {1}".format(path, os.geteuid()))
+
+def getRuntimeDirectory():
+    """
+    Get a directory for store files that only the current user can access,
+    ``$XDG_RUNTIME_DIR`` if set or a private directory in ``/dev/shm``,
+    respectively the temporary directory, that is created if necessary
+
+    :returns: directory
+    :rtype: str
+    :raises ValueError: if the directory is not private
+    """
+    directory = os.environ.get("XDG_RUNTIME_DIR")
+    if not directory:
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        directory = os.path.join(base, "c4-rest-server-{0}".format(os.geteuid()))
+        try:
+            os.mkdir(directory, 0o700)
+        except OSError as exception:
+            if exception.errno != errno.EEXIST:
+                raise
+    checkPrivate(directory, os.lstat(directory), stat.S_ISDIR)
+    return directory
+
+@ClassLogger
+class SharedResponseStore(object):
+    """
+    Memory-mapped store for serialized responses
+
+    :param path: path of the memory-mapped file
+    :type path: str
+    :param slots: number of responses that can be stored
+    :type slots: int
+    :param slotSize: maximum size of a serialized response in bytes
+    :type slotSize: int
+    :raises ValueError: if the file is not private, see :func:`checkPrivate`
+    """
+    def __init__(self, path, slots=64, slotSize=1048576):
+        self.path = path
+        self.slots = int(slots)
+        self.slotSize = int(slotSize)
+        self.size = HEADER_SIZE + self.slots * (SLOT_HEADER_SIZE + self.slotSize)
+
+        # symbolic links are not followed, they could point to files of other users
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+        try:
+            checkPrivate(self.path, os.fstat(self.fd), stat.S_ISREG)
+        except ValueError:
+            os.close(self.fd)
+            raise
+        with self.lock():
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            header = os.read(self.fd, HEADER.size)
+            if (os.fstat(self.fd).st_size != self.size
+                    or len(header) != HEADER.size
+                    or HEADER.unpack(header)[:3] != (MAGIC, self.slots, self.slotSize)):
+                # (re)initialize, truncating first clears any existing content
+                os.ftruncate(self.fd, 0)
+                os.ftruncate(self.fd, self.size)
+                os.lseek(self.fd, 0, os.SEEK_SET)
+                os.write(self.fd, HEADER.pack(MAGIC, self.slots, self.slotSize, 1, 0))
+            self.mapping = mmap.mmap(self.fd, self.size)
+
+    def close(self):
+        """
+        Close the store
+        """
+        self.mapping.close()
+        os.close(self.fd)
+
+    def __len__(self):
+        """
+        Number of responses stored in the current generation
+        """
+        generation = self.generation
+        count = 0
+        for index in range(self.slots):
+            _, version, slotGeneration, created, _, _, slotKey = self.readSlotHeader(index)
+            if version != 0 and slotGeneration == generation and slotKey and created:
+                count += 1
+        return count
+
+    @property
+    def generation(self):
+        """
+        Current generation, entries written in previous generations are invalid
+        """
+        return HEADER.unpack_from(self.mapping, 0)[3]
+
+    def lock(self):
+        """
+        Get a context manager that holds the exclusive writer lock
+        """
+        return _FileLock(self.fd)
+
+    def slotOffset(self, index):
+        """
+        Get offset of the specified slot in the mapping
+
+        :param index: slot index
+        :type index: int
+        :returns: offset
+        :rtype: int
+        """
+        return HEADER_SIZE + index * (SLOT_HEADER_SIZE + self.slotSize)
+
+    def readSlotHeader(self, index):
+        """
+        Read header of the specified slot
+
+        :param index: slot index
+        :type index: int
+        :returns: sequence, version, generation, created, claimed until, length, key
+        :rtype: tuple
+        """
+        sequence, version, generation, created, claimedUntil, length, keyLength, key = SLOT_HEADER.unpack_from(self.mapping, self.slotOffset(index))
+        return sequence, version, generation, created, claimedUntil, length, key[:keyLength]
+
+    def findSlot(self, encodedKey):
+        """
+        Find slot that currently holds the specified key
+
+        :param encodedKey: encoded cache key
+        :type encodedKey: bytes
+        :returns: slot index or ``None``
+        :rtype: int
+        """
+        start = zlib.crc32(encodedKey) % self.slots
+        generation = self.generation
+        for probe in range(self.slots):
+            index = (start + probe) % self.slots
+            _, version, slotGeneration, _, _, _, slotKey = self.readSlotHeader(index)
+            if version == 0:
+                return None
+            if slotKey == encodedKey:
+                return index if slotGeneration == generation else None
+        return None
+
+    def get(self, key, newerThan=0):
+        """
+        Get serialized response for the specified key
+
+        :param key: cache key
+        :type key: tuple
+        :param newerThan: only return the response if its version is newer than this
+        :type newerThan: int
+        :returns: response, version and creation time or ``None``
+        :rtype: (bytes, int, float)
+        """
+        encodedKey = encodeKey(key)
+        index = self.findSlot(encodedKey)
+        if index is None:
+            return None
+        offset = self.slotOffset(index)
+        for _ in range(MAX_READ_RETRIES):
+            sequence, version, _, created, _, length, slotKey = self.readSlotHeader(index)
+            if sequence % 2:
+                # writer in progress
+                continue
+            if slotKey != encodedKey or version <= newerThan or not created:
+                # not stored, not newer or only claimed
+                return None
+            value = self.mapping[offset + SLOT_HEADER_SIZE:offset + SLOT_HEADER_SIZE + length]
+            if self.readSlotHeader(index)[0] == sequence:
+                return value, version, created
+        return None
+
+    def put(self, key, value, created=None):
+        """
+        Store serialized response for the specified key and release any refresh claim on it
+
+        :param key: cache key
+        :type key: tuple
+        :param value: serialized response
+        :type value: bytes
+        :param created: creation time of the response
+        :type created: float
+        :returns: version stamp of the stored response or ``None`` if it does not fit
+        :rtype: int
+        """
+        if len(value) > self.slotSize:
+            self.log.debug("response for '%s' with %d bytes exceeds slot size", key, len(value))
+            return None
+        encodedKey = encodeKey(key)
+        with self.lock():
+            generation = self.generation
+            index = self.allocateSlot(encodedKey)
+            offset = self.slotOffset(index)
+            sequence = self.readSlotHeader(index)[0]
+            version = self.nextVersion()
+            # odd sequence marks the slot as being written
+            SEQUENCE.pack_into(self.mapping, offset, sequence + 1)
+            self.mapping[offset + SLOT_HEADER_SIZE:offset + SLOT_HEADER_SIZE + len(value)] = value
+            SLOT_HEADER.pack_into(self.mapping, offset, sequence + 1, version, generation,
+                                  created or time.time(), 0.0, len(value), len(encodedKey), encodedKey)
+            # publishing the even sequence must be the last store, readers accept anything written before it
+            SEQUENCE.pack_into(self.mapping, offset, sequence + 2)
+        return version
+
+    def delete(self, key):
+        """
+        Remove the response for the specified key. The slot keeps an empty key
+        so that lookups of keys stored after it continue, and it is reused first.
+
+        :param key: cache key
+        :type key: tuple
+        :returns: ``True`` if the key was stored, ``False`` otherwise
+        :rtype: bool
+        """
+        encodedKey = encodeKey(key)
+        with self.lock():
+            index = self.findSlot(encodedKey)
+            if index is None:
+                return False
+            offset = self.slotOffset(index)
+            sequence = self.readSlotHeader(index)[0]
+            SEQUENCE.pack_into(self.mapping, offset, sequence + 1)
+            SLOT_HEADER.pack_into(self.mapping, offset, sequence + 1, self.nextVersion(), self.generation,
+                                  0.0, 0.0, 0, 0, b"")
+            SEQUENCE.pack_into(self.mapping, offset, sequence + 2)
+        return True
+
+    def allocateSlot(self, encodedKey):
+        """
+        Find slot for the specified key, either the one already holding it, an empty
+        one or the oldest one. Must be called while holding the writer lock.
+
+        :param encodedKey: encoded cache key
+        :type encodedKey: bytes
+        :returns: slot index
+        :rtype: int
+        """
+        start = zlib.crc32(encodedKey) % self.slots
+        generation = self.generation
+        oldest = None
+        oldestCreated = None
+        for probe in range(self.slots):
+            index = (start + probe) % self.slots
+            _, version, slotGeneration, created, _, _, slotKey = self.readSlotHeader(index)
+            if version == 0 or slotKey == encodedKey:
+                return index
+            if slotGeneration != generation:
+                created = 0.0
+            if oldestCreated is None or created < oldestCreated:
+                oldest = index
+                oldestCreated = created
+        return oldest
+
+    def nextVersion(self):
+        """
+        Get next version stamp. Must be called while holding the writer lock.
+
+        :returns: version
+        :rtype: int
+        """
+        magic, slots, slotSize, generation, version = HEADER.unpack_from(self.mapping, 0)
+        HEADER.pack_into(self.mapping, 0, magic, slots, slotSize, generation, version + 1)
+        return version + 1
+
+    def claim(self, key, lease):
+        """
+        Claim the right to refresh the specified key for the lease duration so
+        that only one worker recomputes it
+
+        :param key: cache key
+        :type key: tuple
+        :param lease: lease duration in seconds
+        :type lease: float
+        :returns: ``True`` if the claim succeeded, ``False`` if another worker holds it
+        :rtype: bool
+        """
+        encodedKey = encodeKey(key)
+        with self.lock():
+            index = self.findSlot(encodedKey)
+            now = time.time()
+            if index is None:
+                # claim an empty slot for the key, it holds no response until the refreshed one is put
+                index = self.allocateSlot(encodedKey)
+                offset = self.slotOffset(index)
+                sequence = self.readSlotHeader(index)[0]
+                SEQUENCE.pack_into(self.mapping, offset, sequence + 1)
+                SLOT_HEADER.pack_into(self.mapping, offset, sequence + 1, self.nextVersion(), self.generation,
+                                      0.0, now + lease, 0, len(encodedKey), encodedKey)
+                SEQUENCE.pack_into(self.mapping, offset, sequence + 2)
+                return True
+            claimedUntil = self.readSlotHeader(index)[4]
+            if claimedUntil > now:
+                return False
+            # readers do not use the claim so it is updated in place without changing the sequence
+            CLAIMED_UNTIL.pack_into(self.mapping, self.slotOffset(index) + CLAIMED_UNTIL_OFFSET, now + lease)
+            return True
+
+    def invalidate(self):
+        """
+        Invalidate all stored responses
+        """
+        with self.lock():
+            magic, slots, slotSize, generation, version = HEADER.unpack_from(self.mapping, 0)
+            HEADER.pack_into(self.mapping, 0, magic, slots, slotSize, generation + 1, version)
+
+class _FileLock(object):
+    """
+    Exclusive POSIX record lock on a file descriptor, these are owned by
+    processes and therefore also exclude forked processes sharing the descriptor
+    """
+    def __init__(self, fd):
+        self.fd = fd
+
+    def __enter__(self):
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        fcntl.lockf(self.fd, fcntl.LOCK_UN)
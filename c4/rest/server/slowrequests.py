@@ -0,0 +1,72 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Log of slow requests
+
+Requests taking longer than a threshold are logged together with the
+context needed to explain them, i.e., route, query arguments, the time
+spent in the different phases of the request, the response size and how
+long backend calls waited for an executor thread. The most recent slow
+requests of a worker process are kept in a bounded buffer.
+"""
+import collections
+
+from c4.utils.logutil import ClassLogger
+
+
+@ClassLogger
+class SlowRequestLog(object):
+    """
+    Bounded buffer of recent slow requests
+
+    :param threshold: seconds after which a request is considered slow, ``0`` disables the log
+    :type threshold: float
+    :param size: maximum number of slow requests kept
+    :type size: int
+    """
+    def __init__(self, threshold=1.0, size=100):
+        self.threshold = float(threshold)
+        self.requests = collections.deque(maxlen=int(size))
+
+    def isSlow(self, duration):
+        """
+        Check if a request duration is over the threshold
+
+        :param duration: request duration in seconds
+        :type duration: float
+        :rtype: bool
+        """
+        return self.threshold > 0 and duration >= self.threshold
+
+    def record(self, request):
+        """
+        Log and keep a slow request
+
+        :param request: request information, see :meth:`~c4.rest.server.tornadoserver.BaseRequestHandler.getRequestContext`
+        :type request: dict
+        """
+        self.requests.append(request)
+        self.log.warning("slow request %s %s (%s) %d took %.3fs: query %s, phases %s, %d bytes, executor wait %.3fs",
+                         request["method"], request["path"], request["route"], request["status"],
+                         request["duration"], request["query"],
+                         ", ".join("{0} {1:.3f}s".format(name, duration) for name, duration in sorted(request["phases"].items())),
+                         request["responseSize"], request["executorWait"])
+
+    def toJSONSerializable(self, limit=None):
+        """
+        Get the recent slow requests, most recent first
+
+        :param limit: maximum number of requests
+        :type limit: int
+        :returns: threshold and requests
+        :rtype: dict
+        """
+        requests = list(reversed(self.requests))
+        if limit is not None:
+            requests = requests[:limit]
+        return {
+            "threshold": self.threshold,
+            "requests": requests
+        }
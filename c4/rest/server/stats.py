@@ -0,0 +1,187 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Runtime statistics of REST server processes
+
+Statistics are kept in a block of shared memory counters with one row per
+worker process. Workers only ever update their own row so no locking is
+required, while the device manager reads all rows to compute aggregates.
+"""
+import bisect
+import multiprocessing
+import os
+import time
+
+
+# upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, float("inf"))
+
+# counter offsets within a worker row
+PID = 0
+REQUESTS = 1
+OPEN_CONNECTIONS = 2
+EXECUTOR_QUEUE_DEPTH = 3
+CACHE_HITS = 4
+CACHE_MISSES = 5
+HISTOGRAM = 6
+FIELDS = HISTOGRAM + len(LATENCY_BUCKETS)
+
+def getPercentile(histogram, percentile):
+    """
+    Estimate percentile from a latency histogram
+
+    :param histogram: counts per latency bucket
+    :type histogram: [float]
+    :param percentile: percentile between 0 and 1
+    :type percentile: float
+    :returns: upper bound of the bucket containing the percentile in seconds or ``None``
+    :rtype: float
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    cumulative = 0
+    for index, count in enumerate(histogram):
+        cumulative += count
+        if cumulative >= percentile * total:
+            # report the largest finite bound for the overflow bucket
+            return min(LATENCY_BUCKETS[index], LATENCY_BUCKETS[-2])
+    return LATENCY_BUCKETS[-2]
+
+def getResidentSetSize(pid):
+    """
+    Get resident set size of the specified process
+
+    :param pid: process id
+    :type pid: int
+    :returns: resident set size in bytes or ``None`` if not available
+    :rtype: int
+    """
+    try:
+        with open("/proc/{0}/statm".format(pid)) as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, OSError, ValueError, IndexError):
+        return None
+
+class ServerStatistics(object):
+    """
+    Shared memory statistics of a REST server process and its workers.
+    Needs to be created before the worker processes are forked.
+
+    :param workers: number of worker processes
+    :type workers: int
+    """
+    def __init__(self, workers=1):
+        self.workers = int(workers)
+        self.counters = multiprocessing.RawArray("d", self.workers * FIELDS)
+        self.offset = 0
+        self.previous = None
+
+    def setWorker(self, workerId):
+        """
+        Select the row updated by the current worker process
+
+        :param workerId: worker id
+        :type workerId: int
+        """
+        self.offset = workerId * FIELDS
+        self.counters[self.offset + PID] = os.getpid()
+        self.counters[self.offset + OPEN_CONNECTIONS] = 0
+        self.counters[self.offset + EXECUTOR_QUEUE_DEPTH] = 0
+
+    def recordRequest(self, duration):
+        """
+        Record a finished request
+
+        :param duration: request duration in seconds
+        :type duration: float
+        """
+        self.counters[self.offset + REQUESTS] += 1
+        self.counters[self.offset + HISTOGRAM + bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+
+    def connectionOpened(self):
+        """
+        Record a new connection
+        """
+        self.counters[self.offset + OPEN_CONNECTIONS] += 1
+
+    def connectionClosed(self):
+        """
+        Record a closed connection
+        """
+        self.counters[self.offset + OPEN_CONNECTIONS] -= 1
+
+    def setExecutorQueueDepth(self, depth):
+        """
+        Set number of tasks waiting for an executor thread
+
+        :param depth: queue depth
+        :type depth: int
+        """
+        self.counters[self.offset + EXECUTOR_QUEUE_DEPTH] = depth
+
+    def recordCacheHit(self):
+        """
+        Record a response cache hit
+        """
+        self.counters[self.offset + CACHE_HITS] += 1
+
+    def recordCacheMiss(self):
+        """
+        Record a response cache miss
+        """
+        self.counters[self.offset + CACHE_MISSES] += 1
+
+    def snapshot(self):
+        """
+        Aggregate statistics over all workers. Request rate and latency
+        percentiles cover the time since the previous snapshot.
+
+        :returns: statistics
+        :rtype: dict
+        """
+        counters = self.counters[:]
+        now = time.time()
+        requests = 0
+        histogram = [0] * len(LATENCY_BUCKETS)
+        openConnections = 0
+        executorQueueDepth = 0
+        cacheHits = 0
+        cacheMisses = 0
+        rss = None
+        for worker in range(self.workers):
+            row = counters[worker * FIELDS:(worker + 1) * FIELDS]
+            if not row[PID]:
+                continue
+            requests += row[REQUESTS]
+            openConnections += row[OPEN_CONNECTIONS]
+            executorQueueDepth += row[EXECUTOR_QUEUE_DEPTH]
+            cacheHits += row[CACHE_HITS]
+            cacheMisses += row[CACHE_MISSES]
+            for index in range(len(LATENCY_BUCKETS)):
+                histogram[index] += row[HISTOGRAM + index]
+            workerRss = getResidentSetSize(int(row[PID]))
+            if workerRss is not None:
+                rss = (rss or 0) + workerRss
+
+        requestRate = None
+        window = histogram
+        if self.previous is not None:
+            previousTime, previousRequests, previousHistogram = self.previous
+            if now > previousTime:
+                requestRate = max(requests - previousRequests, 0) / (now - previousTime)
+            window = [max(count - previous, 0) for count, previous in zip(histogram, previousHistogram)]
+        self.previous = (now, requests, histogram)
+
+        return {
+            "requests": int(requests),
+            "requestRate": requestRate,
+            "latencyP50": getPercentile(window, 0.5),
+            "latencyP99": getPercentile(window, 0.99),
+            "openConnections": int(openConnections),
+            "executorQueueDepth": int(executorQueueDepth),
+            "cacheHitRatio": cacheHits / (cacheHits + cacheMisses) if cacheHits + cacheMisses else None,
+            "rss": rss
+        }
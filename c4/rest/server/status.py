@@ -0,0 +1,161 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+Concurrent collection of device status
+
+Status of many devices is retrieved in parallel on an executor of its own,
+each with its own timeout, so collecting the status of a whole cluster takes
+as long as the slowest device rather than the sum over all devices and does
+not hold up the executor used for other backend access. The latest result
+of each device is kept and served when a device does not answer in time.
+"""
+import datetime
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from tornado import gen
+from tornado.concurrent import Future
+from tornado.ioloop import IOLoop
+
+from c4.utils.logutil import ClassLogger
+
+
+@ClassLogger
+class StatusCollector(object):
+    """
+    Collects status concurrently and keeps the latest result per target.
+    Unlike the :class:`~c4.rest.server.circuitbreaker.CircuitBreaker` a slow
+    or failing target only affects its own result.
+
+    :param executor: executor to run the blocking status functions on, by default
+        a dedicated one with ``maxWorkers`` threads
+    :type executor: :class:`~concurrent.futures.Executor`
+    :param timeout: seconds to wait for a single target once its call started
+    :type timeout: float
+    :param maxWorkers: number of status calls running at the same time
+    :type maxWorkers: int
+    :param queueTimeout: seconds a call may wait for a free thread before
+        the latest status is used instead
+    :type queueTimeout: float
+    """
+    def __init__(self, executor=None, timeout=2.0, maxWorkers=32, queueTimeout=10.0):
+        self.executor = executor or ThreadPoolExecutor(int(maxWorkers))
+        self.ownExecutor = executor is None
+        self.timeout = float(timeout)
+        self.queueTimeout = float(queueTimeout)
+        # key -> (value, time retrieved)
+        self.latest = {}
+        # key -> (future resolved with the start time, executor future) of the call still in progress
+        self.pending = {}
+
+    def shutdown(self):
+        """
+        Stop the dedicated executor
+        """
+        if self.ownExecutor:
+            self.executor.shutdown(wait=False)
+
+    def submit(self, key, function, *args):
+        """
+        Start retrieving the status of a target unless a call for it is
+        already in progress. Results arriving after the timeout still
+        update the latest status.
+
+        :param key: key identifying the target
+        :type key: tuple
+        :param function: blocking status function
+        :type function: func
+        :returns: future resolved with the time the call started and executor future
+        :rtype: (:class:`~tornado.concurrent.Future`, :class:`~concurrent.futures.Future`)
+        """
+        call = self.pending.get(key)
+        if call is None:
+            ioloop = IOLoop.current()
+            started = Future()
+
+            def run():
+                """
+                Report start and execute the status function
+                """
+                ioloop.add_callback(started.set_result, time.time())
+                return function(*args)
+
+            future = self.executor.submit(run)
+            call = self.pending[key] = (started, future)
+
+            def done(future):
+                """
+                Keep latest successful result
+                """
+                if self.pending.get(key) is call:
+                    del self.pending[key]
+                if not started.done():
+                    # cancelled before it started
+                    started.set_result(time.time())
+                if not future.cancelled() and future.exception() is None:
+                    self.latest[key] = (future.result(), time.time())
+
+            # done callbacks may run on executor threads while the dictionaries are only modified on the IOLoop thread
+            future.add_done_callback(lambda future: ioloop.add_callback(done, future))
+        return call
+
+    @gen.coroutine
+    def collect(self, key, function, *args):
+        """
+        Get the status of a single target
+
+        :param key: key identifying the target
+        :type key: tuple
+        :param function: blocking status function
+        :type function: func
+        :returns: status and its age in seconds, age is ``None`` for fresh values
+        :rtype: (object, float)
+        :raises Exception: if the call failed or timed out and there is no previous status
+        """
+        started, future = self.submit(key, function, *args)
+        try:
+            # the timeout only starts once a thread runs the call
+            startTime = yield gen.with_timeout(datetime.timedelta(seconds=self.queueTimeout), started)
+            remaining = max(startTime + self.timeout - time.time(), 0)
+            value = yield gen.with_timeout(datetime.timedelta(seconds=remaining), future)
+        except Exception as exception:
+            if isinstance(exception, gen.TimeoutError):
+                self.log.warning("status call %s timed out after %.3f seconds", key, self.timeout)
+            else:
+                self.log.warning("status call %s failed: %s", key, exception)
+            if key not in self.latest:
+                raise
+            value, retrieved = self.latest[key]
+            raise gen.Return((value, time.time() - retrieved))
+        self.latest[key] = (value, time.time())
+        raise gen.Return((value, None))
+
+    @gen.coroutine
+    def collectAll(self, calls):
+        """
+        Get the status of multiple targets concurrently
+
+        :param calls: key to status function and arguments mapping
+        :type calls: dict
+        :returns: key to ``(status, age, error)`` mapping, ``status`` is ``None`` if
+            the target did not answer in time and there is no previous status
+        :rtype: dict
+        """
+        @gen.coroutine
+        def collectSafely(key, function, args):
+            """
+            Turn failures into results so that one target does not affect others
+            """
+            try:
+                value, age = yield self.collect(key, function, *args)
+            except Exception as exception:
+                raise gen.Return((None, None, str(exception) or exception.__class__.__name__))
+            raise gen.Return((value, age, None))
+
+        results = yield dict(
+            (key, collectSafely(key, call[0], call[1:]))
+            for key, call in calls.items()
+        )
+        raise gen.Return(results)
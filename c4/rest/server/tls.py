@@ -0,0 +1,136 @@
+"""
+Copyright (c) IBM 2015-2017. All Rights Reserved.
+Project name: c4-rest-server
+This project is licensed under the MIT License, see LICENSE
+
+TLS support for the REST server
+"""
+import os
+import ssl
+
+from tornado.ioloop import PeriodicCallback
+
+from c4.utils.logutil import ClassLogger
+
+
+def createSSLContext(certfile, keyfile, ssl_version=None, minimumVersion="TLSv1_2", sessionTickets=True, numTickets=None, ciphers=None):
+    """
+    Create a server side SSL context.
+
+    Unless a fixed ``ssl_version`` is specified the highest protocol version
+    supported by both sides is negotiated, restricted by ``minimumVersion``.
+    OpenSSL's server side session cache is enabled by default which allows
+    clients to resume sessions by session id in addition to session tickets.
+
+    :param certfile: certificate file
+    :type certfile: str
+    :param keyfile: key file
+    :type keyfile: str
+    :param ssl_version: fixed protocol, e.g., ``ssl.PROTOCOL_TLSv1_2``
+    :type ssl_version: int
+    :param minimumVersion: minimum protocol version, ``TLSv1_2`` or ``TLSv1_3``
+    :type minimumVersion: str
+    :param sessionTickets: allow session resumption through session tickets
+    :type sessionTickets: bool
+    :param numTickets: number of TLS 1.3 session tickets issued per connection
+    :type numTickets: int
+    :param ciphers: OpenSSL cipher list
+    :type ciphers: str
+    :returns: SSL context
+    :rtype: :class:`~ssl.SSLContext`
+    """
+    if ssl_version is None:
+        context = ssl.SSLContext(getattr(ssl, "PROTOCOL_TLS_SERVER", ssl.PROTOCOL_SSLv23))
+        if hasattr(ssl, "TLSVersion"):
+            context.minimum_version = getattr(ssl.TLSVersion, minimumVersion)
+        else:
+            # disable protocols older than the minimum version
+            disabledProtocols = ["OP_NO_SSLv2", "OP_NO_SSLv3", "OP_NO_TLSv1", "OP_NO_TLSv1_1"]
+            if minimumVersion == "TLSv1_3":
+                disabledProtocols.append("OP_NO_TLSv1_2")
+            for option in disabledProtocols:
+                context.options |= getattr(ssl, option, 0)
+    else:
+        context = ssl.SSLContext(ssl_version)
+
+    for option in ["OP_NO_COMPRESSION", "OP_CIPHER_SERVER_PREFERENCE", "OP_SINGLE_ECDH_USE"]:
+        context.options |= getattr(ssl, option, 0)
+
+    if not sessionTickets:
+        context.options |= getattr(ssl, "OP_NO_TICKET", 0)
+    if numTickets is not None and hasattr(context, "num_tickets"):
+        context.num_tickets = int(numTickets)
+    if ciphers:
+        context.set_ciphers(ciphers)
+
+    context.load_cert_chain(certfile, keyfile)
+    return context
+
+@ClassLogger
+class CertificateReloader(object):
+    """
+    Watches certificate and key files and loads them into the SSL context
+    when they change. Established connections are not affected and the
+    context keeps its session cache and ticket keys.
+
+    :param context: SSL context
+    :type context: :class:`~ssl.SSLContext`
+    :param certfile: certificate file
+    :type certfile: str
+    :param keyfile: key file
+    :type keyfile: str
+    :param interval: seconds between checks
+    :type interval: float
+    """
+    def __init__(self, context, certfile, keyfile, interval=10.0):
+        self.context = context
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.fileStates = self.getFileStates()
+        self.periodicCallback = PeriodicCallback(self.check, float(interval) * 1000)
+
+    def getFileStates(self):
+        """
+        Get modification information on the certificate and key files
+
+        :returns: modification information
+        :rtype: tuple
+        """
+        states = []
+        for path in (self.certfile, self.keyfile):
+            try:
+                fileStat = os.stat(path)
+                states.append((fileStat.st_ino, fileStat.st_size, fileStat.st_mtime))
+            except OSError:
+                states.append(None)
+        return tuple(states)
+
+    def check(self):
+        """
+        Reload certificate and key if they changed
+        """
+        fileStates = self.getFileStates()
+        if fileStates == self.fileStates:
+            return
+        try:
+            # validate new certificate and key first since a failed load leaves the context half updated
+            testContext = ssl.SSLContext(getattr(ssl, "PROTOCOL_TLS_SERVER", ssl.PROTOCOL_SSLv23))
+            testContext.load_cert_chain(self.certfile, self.keyfile)
+            self.context.load_cert_chain(self.certfile, self.keyfile)
+            self.fileStates = fileStates
+            self.log.info("reloaded SSL certificate '%s' and key '%s'", self.certfile, self.keyfile)
+        except (IOError, OSError, ssl.SSLError) as exception:
+            # files may be in the middle of being rotated, try again on next check
+            self.log.warning("could not reload SSL certificate '%s' and key '%s': %s", self.certfile, self.keyfile, exception)
+
+    def start(self):
+        """
+        Start watching on the current IOLoop
+        """
+        self.periodicCallback.start()
+
+    def stop(self):
+        """
+        Stop watching
+        """
+        self.periodicCallback.stop()
@@ -5,24 +5,58 @@ This project is licensed under the MIT License, see LICENSE
 
 Tornado based REST service implementation
 """
+import errno
+import functools
+import grp
+import hmac
 import logging
 import multiprocessing
 import os
-import pkg_resources
-import ssl
+import select
+import signal
+import threading
+import time
+import warnings
 
 from concurrent.futures import ThreadPoolExecutor
+from tornado import gen
 from tornado.httpserver import HTTPServer
-from tornado.ioloop import IOLoop
-from tornado.web import Application, RequestHandler
+from tornado.httputil import HTTPMessageDelegate
+from tornado.ioloop import IOLoop, PeriodicCallback
+from tornado.netutil import bind_sockets, bind_unix_socket
+from tornado.web import Application, HTTPError, RequestHandler
 
 import c4.rest.handlers
+from c4.rest.server.cache import CacheRefresher, ResponseCache
+from c4.rest.server.changes import (CONFIGURATION,
+                                    ChangeListener,
+                                    ChangeLog,
+                                    ChangeLogUpdater,
+                                    createConfigurationChange,
+                                    invalidateResponseCache)
+from c4.rest.server.circuitbreaker import CircuitBreaker, CircuitBreakerOpen
+from c4.rest.server.encoding import JSON, negotiate, transcode
+from c4.rest.server.history import HistorySampler, MetricHistory
+from c4.rest.server.jobs import JobManager, JobStoreFull
+from c4.rest.server.logqueue import installAsyncLogging, uninstallAsyncLogging
+from c4.rest.server.memory import MemoryTracker
+from c4.rest.server.routing import RouteTrie
+from c4.rest.server.sharedcache import SharedResponseStore, getRuntimeDirectory
+from c4.rest.server.slowrequests import SlowRequestLog
+from c4.rest.server.stats import ServerStatistics
+from c4.rest.server.status import StatusCollector
+from c4.rest.server.tls import CertificateReloader, createSSLContext
 from c4.utils.logutil import ClassLogger
 from c4.utils.util import getModuleClasses
 
 
 log = logging.getLogger(__name__)
 
+_routeMapCache = {}
+
+# entry point group for registering request handlers from other packages
+HANDLER_ENTRY_POINT_GROUP = "c4.rest.handlers"
+
 class BaseRequestHandler(RequestHandler):
     """
     Base request handler
@@ -34,6 +68,212 @@ class BaseRequestHandler(RequestHandler):
         """
         return self.application.executor
 
+    @gen.coroutine
+    def backendCall(self, key, function, *args, **kwargs):
+        """
+        Execute a blocking backend function on the executor, guarded by
+        the application's circuit breaker. If the backend is unavailable
+        the last good snapshot is returned and the response is marked stale.
+
+        Requests that are part of a batch share the results of calls with
+        the same key, see :class:`~c4.rest.handlers.batch.Batch`.
+
+        :param key: key identifying the call and its snapshot, ``None`` for calls
+            that neither keep a snapshot nor are shared, e.g., when streaming
+        :type key: tuple
+        :param function: blocking function
+        :type function: func
+        :returns: function result
+        :raises HTTPError: if the breaker is open and there is no snapshot
+        """
+        function = self.measureExecutorWait(function)
+        sharedCalls = getattr(self.request, "sharedBackendCalls", None)
+        if sharedCalls is None or key is None:
+            call = self.application.circuitBreaker.call(key, self.executor, function, *args, **kwargs)
+        else:
+            if key not in sharedCalls:
+                sharedCalls[key] = self.application.circuitBreaker.call(key, self.executor, function, *args, **kwargs)
+            call = sharedCalls[key]
+        start = time.time()
+        try:
+            value, age = yield call
+        except CircuitBreakerOpen:
+            raise HTTPError(503, reason="Backend unavailable")
+        finally:
+            self.recordPhase("backend", time.time() - start)
+        if age is not None:
+            self.markStale(age)
+        raise gen.Return(value)
+
+    @gen.coroutine
+    def cachedResponse(self, key, producer, *args):
+        """
+        Get a serialized response from the application's response cache.
+
+        On a miss the response is computed using ``producer(self, *args)`` and
+        cached unless it is based on stale backend snapshots, concurrent misses
+        wait for a single computation. Cached responses are kept warm by the
+        background :class:`~c4.rest.server.cache.CacheRefresher`.
+        Responses in other encodings than JSON are derived from the cached
+        JSON response, see :mod:`~c4.rest.server.encoding`.
+
+        :param key: cache key
+        :type key: tuple
+        :param producer: coroutine function ``producer(context, *args)`` that computes the JSON response
+        :type producer: func
+        :returns: serialized response in the negotiated encoding
+        :rtype: str
+        """
+        mediaType = self.encoder.mediaType
+        cache = self.application.responseCache
+        entry = cache.get(key) or cache.load(key, producer, args)
+        if entry is not None and not entry.expired:
+            self.application.statistics.recordCacheHit()
+            if entry.age > cache.ttl:
+                self.markStale(entry.age)
+            raise gen.Return(entry.value if mediaType == JSON else entry.encode(mediaType))
+
+        self.application.statistics.recordCacheMiss()
+        response, age = yield cache.produce(key, producer, args, self)
+        if age is not None and not self.stale:
+            # computed by a concurrent request
+            self.markStale(age)
+        raise gen.Return(response if mediaType == JSON else transcode(response, mediaType))
+
+    def writeData(self, data):
+        """
+        Write JSON serializable data in the encoding negotiated through the ``Accept`` header
+
+        :param data: JSON serializable data
+        """
+        self.writeEncoded(self.encoder.encode(data))
+
+    def writeEncoded(self, response):
+        """
+        Write a response that is already in the negotiated encoding, e.g.,
+        from :meth:`cachedResponse`
+
+        :param response: serialized response
+        :type response: str
+        """
+        self.set_header("Content-Type", self.encoder.contentType)
+        self.add_header("Vary", "Accept")
+        self.write(response)
+
+    def submitJob(self, name, function, *args):
+        """
+        Run a long-running operation as a job and respond with ``202 Accepted``
+        and the job information, see :class:`~c4.rest.server.jobs.JobManager`
+
+        :param name: job name
+        :type name: str
+        :param function: coroutine function ``function(context, *args)`` returning a JSON serializable result
+        :type function: func
+        :raises HTTPError: if too many jobs are running
+        """
+        try:
+            job = self.application.jobManager.submit(name, function, *args)
+        except JobStoreFull:
+            raise HTTPError(503, reason="Too many jobs")
+        self.set_status(202)
+        self.set_header("Location", "/api/jobs/{0}".format(job.id))
+        self.write(job.toJSONSerializable())
+
+    def measureExecutorWait(self, function):
+        """
+        Wrap a blocking function so that the time between submitting it to
+        the executor and it starting to run is recorded for the request
+
+        :param function: blocking function
+        :type function: func
+        :returns: wrapped function
+        :rtype: func
+        """
+        submitted = time.time()
+        @functools.wraps(function)
+        def execute(*args, **kwargs):
+            """
+            Record executor wait and execute function
+            """
+            # list append is atomic, the function runs on an executor thread
+            self.executorWaits.append(time.time() - submitted)
+            return function(*args, **kwargs)
+        return execute
+
+    def recordPhase(self, name, duration):
+        """
+        Add time spent in a phase of the request, reported for slow requests
+
+        :param name: phase name
+        :type name: str
+        :param duration: duration in seconds
+        :type duration: float
+        """
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def getRequestContext(self):
+        """
+        Get information about the finished request for the slow request log
+
+        :returns: request information
+        :rtype: dict
+        """
+        duration = self.request.request_time()
+        phases = dict(self.phases)
+        phases["handler"] = duration - phases.get("queued", 0.0)
+        return {
+            "time": self.request._start_time, # pylint: disable=protected-access
+            "method": self.request.method,
+            "path": self.request.path,
+            "route": getattr(self, "route", None),
+            "query": dict(
+                (name, [value.decode("utf-8", "replace") for value in values])
+                for name, values in self.request.query_arguments.items()
+            ),
+            "status": self.get_status(),
+            "duration": duration,
+            "phases": phases,
+            "responseSize": self.responseSize,
+            "executorWait": sum(self.executorWaits)
+        }
+
+    def markStale(self, age):
+        """
+        Mark the response as being based on stale data
+
+        :param age: age of the data in seconds
+        :type age: float
+        """
+        self.stale = True
+        self.staleAge = age
+        self.set_header("Warning", '110 - "Response is Stale"')
+        self.set_header("X-C4-Snapshot-Age", "{0:.3f}".format(age))
+
+    def prepare(self):
+        """
+        Track in-flight requests so that the server can drain them on shutdown
+        """
+        self.application.activeRequests += 1
+        self.active = True
+        self.recordPhase("queued", self.request.request_time())
+
+    def on_finish(self):
+        """
+        Track in-flight requests so that the server can drain them on shutdown
+        """
+        if self.active:
+            self.application.activeRequests -= 1
+            self.active = False
+        duration = self.request.request_time()
+        self.application.statistics.recordRequest(duration)
+        slowRequests = getattr(self.application, "slowRequests", None)
+        if slowRequests is not None and slowRequests.isSlow(duration):
+            slowRequests.record(self.getRequestContext())
+
+    def flush(self, *args, **kwargs):
+        self.responseSize += sum(len(part) for part in self._write_buffer) # pylint: disable=protected-access
+        return super(BaseRequestHandler, self).flush(*args, **kwargs)
+
     def initialize(self, node): # pylint: disable=arguments-differ
         """
         Information shared across request handlers
@@ -42,6 +282,466 @@ class BaseRequestHandler(RequestHandler):
         :type node: str
         """
         self.node = node
+        self.active = False
+        self.stale = False
+        self.staleAge = None
+        self.phases = {}
+        self.executorWaits = []
+        self.responseSize = 0
+        self.encoder = negotiate(self.request.headers.get("Accept"))
+
+class AdminRequestHandler(BaseRequestHandler):
+    """
+    Base request handler for administrative routes. Requests need to
+    provide the application's admin token as ``Authorization: Bearer <token>``
+    header and are refused if no admin token is configured.
+    """
+    def prepare(self):
+        """
+        Authenticate the request before tracking it
+        """
+        adminToken = getattr(self.application, "adminToken", None)
+        if not adminToken:
+            raise HTTPError(403, reason="Admin API is disabled")
+        authorization = self.request.headers.get("Authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        # constant time comparison to not leak the token through response times
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode("utf-8"), adminToken.encode("utf-8")):
+            self.set_header("WWW-Authenticate", 'Bearer realm="c4"')
+            raise HTTPError(401, reason="Invalid admin token")
+        super(AdminRequestHandler, self).prepare()
+
+@ClassLogger
+class RestApplication(Application):
+    """
+    Application that dispatches requests using a :class:`~c4.rest.server.routing.RouteTrie`
+    instead of scanning a list of regular expressions. Routes may contain
+    parameters, e.g., ``/api/nodes/{node}``, that are passed to the request
+    handler methods as keyword arguments.
+
+    :param handlers: list of route, handler and initialization dict tuples
+    :type handlers: list
+    """
+    def __init__(self, handlers=None, **settings):
+        super(RestApplication, self).__init__(**settings)
+        self.routeTrie = RouteTrie()
+        for path, handler, handlerKwargs in handlers or []:
+            try:
+                self.routeTrie.add(path, (handler, handlerKwargs))
+            except ValueError as exception:
+                self.log.error("could not add REST handler '%s': %s", handler, exception)
+
+    def find_handler(self, request, **kwargs):
+        match = self.routeTrie.match(request.path)
+        if match is None:
+            return super(RestApplication, self).find_handler(request, **kwargs)
+        (handler, handlerKwargs), pathKwargs = match
+        return self.get_handler_delegate(request, handler, target_kwargs=handlerKwargs, path_kwargs=pathKwargs)
+
+class RequestTrackingDelegate(HTTPMessageDelegate):
+    """
+    Message delegate that reports when a request was received on a connection
+
+    :param delegate: actual delegate
+    :type delegate: :class:`~tornado.httputil.HTTPMessageDelegate`
+    :param onRequest: function called when the request headers were received
+    :type onRequest: func
+    """
+    def __init__(self, delegate, onRequest):
+        self.delegate = delegate
+        self.onRequest = onRequest
+
+    def headers_received(self, start_line, headers):
+        self.onRequest()
+        return self.delegate.headers_received(start_line, headers)
+
+    def data_received(self, chunk):
+        return self.delegate.data_received(chunk)
+
+    def finish(self):
+        return self.delegate.finish()
+
+    def on_connection_close(self):
+        return self.delegate.on_connection_close()
+
+class RestHTTPServer(HTTPServer):
+    """
+    HTTP server that keeps track of open connections in the
+    statistics of the application and of the connections that are
+    idle, i.e., waiting for the next request, so that they can be
+    closed when draining
+    """
+    def initialize(self, *args, **kwargs): # pylint: disable=arguments-differ
+        super(RestHTTPServer, self).initialize(*args, **kwargs)
+        self.connections = set()
+        self.busyConnections = set()
+
+    def handle_stream(self, stream, address):
+        self.request_callback.statistics.connectionOpened()
+        super(RestHTTPServer, self).handle_stream(stream, address)
+
+    def start_request(self, server_conn, request_conn):
+        # called before reading each request, i.e., once the previous response finished
+        self.connections.add(server_conn)
+        self.busyConnections.discard(server_conn)
+        delegate = super(RestHTTPServer, self).start_request(server_conn, request_conn)
+        return RequestTrackingDelegate(delegate, lambda: self.busyConnections.add(server_conn))
+
+    def on_close(self, server_conn):
+        self.connections.discard(server_conn)
+        self.busyConnections.discard(server_conn)
+        self.request_callback.statistics.connectionClosed()
+        super(RestHTTPServer, self).on_close(server_conn)
+
+    def drain(self):
+        """
+        Stop accepting connections and close connections after their current response
+        """
+        self.stop()
+        self.conn_params.no_keep_alive = True
+        self.closeIdleConnections()
+
+    def closeIdleConnections(self):
+        """
+        Close connections that are waiting for the next request
+        """
+        for connection in list(self.connections - self.busyConnections):
+            connection.stream.close()
+
+    def closeAllConnections(self):
+        """
+        Close all connections, including those with a request in progress
+        """
+        for connection in list(self.connections):
+            connection.stream.close()
+
+def getHandlers(node):
+    """
+    Get a list of handlers with their route information
+
+    :param node: node
+    :type node: str
+    :returns: list of route and handler tuples
+    :rtype: (route, handler, <initialization dict>)
+    """
+    routeMap = getRouteMap()
+    return [
+        (actualRoute, handler, dict(node=node))
+        for actualRoute, handler in sorted(routeMap.items())
+    ]
+
+def createApplication(node, handlers=None, circuit_breaker=None, cache=None, device_status=None, jobs=None, history=None,
+                      admin_token=None, slow_requests=None, change_log=None, statistics=None, sharedStore=None,
+                      jobStore=None, changeLogStore=None, primaryWorker=True, executor=None):
+    """
+    Create the REST application together with its backend access, caching,
+    status and job infrastructure. Background tasks are started by :class:`RestServer`.
+
+    :param node: node
+    :type node: str
+    :param handlers: list of route, handler and initialization dict tuples, defaults to all REST handlers
+    :type handlers: list
+    :param circuit_breaker: circuit breaker options, see :class:`~c4.rest.server.circuitbreaker.CircuitBreaker`
+    :type circuit_breaker: dict
+    :param cache: response cache options, see :class:`~c4.rest.server.cache.ResponseCache`
+    :type cache: dict
+    :param device_status: device status collection options, see :class:`~c4.rest.server.status.StatusCollector`
+    :type device_status: dict
+    :param jobs: job options, see :class:`~c4.rest.server.jobs.JobManager`
+    :type jobs: dict
+    :param history: metric history options, see :class:`~c4.rest.server.history.MetricHistory`
+    :type history: dict
+    :param admin_token: token for administrative routes, see :class:`AdminRequestHandler`
+    :type admin_token: str
+    :param slow_requests: slow request log options, see :class:`~c4.rest.server.slowrequests.SlowRequestLog`
+    :type slow_requests: dict
+    :param change_log: node change log options, see :class:`~c4.rest.server.changes.ChangeLog`
+    :type change_log: dict
+    :param statistics: statistics shared with the parent process
+    :type statistics: :class:`~c4.rest.server.stats.ServerStatistics`
+    :param sharedStore: store that shares responses with other worker processes
+    :type sharedStore: :class:`~c4.rest.server.sharedcache.SharedResponseStore`
+    :param jobStore: store that shares job information with other worker processes
+    :type jobStore: :class:`~c4.rest.server.sharedcache.SharedResponseStore`
+    :param changeLogStore: store that shares the node change log with other worker processes
+    :type changeLogStore: :class:`~c4.rest.server.sharedcache.SharedResponseStore`
+    :param primaryWorker: whether this is the primary worker process, see :class:`RestServer`
+    :type primaryWorker: bool
+    :param executor: executor for blocking backend calls
+    :type executor: :class:`~concurrent.futures.Executor`
+    :returns: application
+    :rtype: :class:`RestApplication`
+    """
+    application = RestApplication(handlers=handlers if handlers is not None else getHandlers(node))
+    application.executor = executor or ThreadPoolExecutor(10)
+    application.activeRequests = 0
+    if statistics is None:
+        statistics = ServerStatistics()
+        statistics.setWorker(0)
+    application.statistics = statistics
+    application.circuitBreaker = CircuitBreaker(**(circuit_breaker or {}))
+    application.responseCache = ResponseCache(sharedStore=sharedStore, **dict(
+        (key, value)
+        for key, value in (cache or {}).items()
+        if key not in ("refreshInterval", "shared", "directory", "slots", "slotSize")
+    ))
+    application.statusCollector = StatusCollector(**(device_status or {}))
+    application.jobManager = JobManager(application, sharedStore=jobStore, **dict(
+        (key, value)
+        for key, value in (jobs or {}).items()
+        if key != "slotSize"
+    ))
+    application.metricHistory = MetricHistory((history or {}).get("capacity", 360))
+    application.memoryTracker = MemoryTracker()
+    application.slowRequests = SlowRequestLog(**(slow_requests or {}))
+    application.adminToken = admin_token
+    application.configurationVersion = None
+    application.primaryWorker = primaryWorker
+    # called with each configuration change, see :class:`~c4.rest.server.changes.ChangeListener`
+    application.changeCallbacks = [functools.partial(invalidateResponseCache, application)]
+    application.changeLog = ChangeLog((change_log or {}).get("maxChanges", 1000), sharedStore=changeLogStore)
+    return application
+
+@ClassLogger
+class RestServer(object):
+    """
+    REST server running on the current IOLoop, e.g., one owned by the
+    caller, a :class:`RestServerThread` or a :class:`RestServerProcess`
+
+    :param node: node
+    :type node: str
+    :param port: port number, ``0`` picks a free port
+    :type port: int
+    :param address: address to listen on, defaults to all addresses
+    :type address: str
+    :param ssl_options: SSL options, see :meth:`getSSLContext`
+    :type ssl_options: dict
+    :param ssl_version: fixed SSL protocol version
+    :type ssl_version: int
+    :param shutdown_timeout: seconds to wait for in-flight requests to finish on shutdown
+    :type shutdown_timeout: float
+    :param sockets: already bound TCP sockets
+    :type sockets: [:class:`~socket.socket`]
+    :param unixSockets: already bound Unix domain sockets
+    :type unixSockets: [:class:`~socket.socket`]
+    :param changeConnection: receiving end of a pipe with configuration changes,
+        see :class:`~c4.rest.server.changes.ChangeListener`
+    :type changeConnection: :class:`~multiprocessing.connection.Connection`
+    :param primaryWorker: whether this is the primary worker process, with multiple worker
+        processes only the primary one updates the node change log, the others load it
+        from the shared store, and invalidates the shared response store on changes
+    :type primaryWorker: bool
+
+    Further options are passed to :func:`createApplication`, see :class:`RestServerProcess` for details.
+    """
+    def __init__(self, node, port=8888, address=None, ssl_options=None, ssl_version=None, circuit_breaker=None, cache=None,
+                 device_status=None, history=None, jobs=None, admin_token=None, slow_requests=None, change_log=None,
+                 unix_socket=None, shutdown_timeout=10.0, sockets=None, unixSockets=None, handlers=None, statistics=None,
+                 sharedStore=None, jobStore=None, changeLogStore=None, changeConnection=None, primaryWorker=True):
+        self.node = node
+        self.port = int(port)
+        self.address = address
+        self.ssl_options = ssl_options
+        self.ssl_version = ssl_version
+        self.cache = cache or {}
+        self.history = history or {}
+        self.change_log = change_log or {}
+        self.unix_socket = unix_socket
+        self.shutdown_timeout = float(shutdown_timeout)
+        self.sockets = sockets
+        self.unixSockets = unixSockets
+        self.changeConnection = changeConnection
+        self.primaryWorker = primaryWorker
+        self.application = createApplication(node, handlers=handlers, circuit_breaker=circuit_breaker, cache=cache,
+                                             device_status=device_status, jobs=jobs, history=history,
+                                             admin_token=admin_token, slow_requests=slow_requests, change_log=change_log,
+                                             statistics=statistics, sharedStore=sharedStore, jobStore=jobStore,
+                                             changeLogStore=changeLogStore, primaryWorker=primaryWorker)
+        self.servers = []
+        self.tasks = []
+
+    def getSSLContext(self):
+        """
+        Create SSL context based on the SSL options. Certificate and key files
+        without a directory are resolved relative to the ``directory`` in the
+        specified ``package``. If ``reloadInterval`` is set the files are
+        watched and reloaded when they change.
+
+        :returns: SSL context or ``None`` if SSL is not enabled
+        :rtype: :class:`~ssl.SSLContext`
+        """
+        if not self.ssl_options:
+            return None
+        package = self.ssl_options.get("package")
+        directory = self.ssl_options.get("directory") or ""
+
+        def resolve(fileName):
+            """
+            Resolve file name relative to the package
+            """
+            if fileName and os.path.dirname(fileName) == "" and package:
+                # pkg_resources is slow to import, only load it when needed
+                import pkg_resources
+                return pkg_resources.resource_filename(package, directory + fileName)  # @UndefinedVariable
+            return fileName
+        certfile = resolve(self.ssl_options.get("certfile"))
+        keyfile = resolve(self.ssl_options.get("keyfile"))
+
+        sslEnabled = True
+        if not certfile or not os.path.exists(certfile):
+            self.log.error("SSL certificate file not found at location: %s", certfile)
+            sslEnabled = False
+        if not keyfile or not os.path.exists(keyfile):
+            self.log.error("SSL key file not found at location: %s", keyfile)
+            sslEnabled = False
+        if not sslEnabled:
+            self.log.warning("SSL options specified but unable to enable SSL for REST server")
+            return None
+
+        contextOptions = dict(
+            (key, self.ssl_options[key])
+            for key in ("minimumVersion", "sessionTickets", "numTickets", "ciphers")
+            if key in self.ssl_options
+        )
+        sslContext = createSSLContext(certfile, keyfile, ssl_version=self.ssl_version, **contextOptions)
+        self.log.info("SSL enabled using certificate '%s' and key '%s'", certfile, keyfile)
+        if self.ssl_options.get("reloadInterval"):
+            certificateReloader = CertificateReloader(sslContext, certfile, keyfile, interval=self.ssl_options["reloadInterval"])
+            certificateReloader.start()
+            self.tasks.append(certificateReloader)
+        return sslContext
+
+    def start(self):
+        """
+        Start listening and start the background tasks on the current IOLoop
+        """
+        application = self.application
+        if not self.sockets:
+            self.sockets = bind_sockets(self.port, self.address)
+            self.port = self.sockets[0].getsockname()[1]
+        unixSockets = self.unixSockets or []
+        if self.unix_socket and not unixSockets:
+            unixSockets.append(bindUnixSocket(**self.unix_socket))
+
+        self.tasks.append(PeriodicCallback(
+            lambda: application.statistics.setExecutorQueueDepth(application.executor._work_queue.qsize()), # pylint: disable=protected-access
+            1000))
+        historyOptions = dict(self.history)
+        historyOptions.pop("capacity", None)
+        historyInterval = float(historyOptions.pop("interval", 10.0))
+        if historyInterval > 0:
+            # handler modules depend on the server package so they can only be imported here
+            from c4.rest.handlers.status import getSampleCalls
+            self.tasks.append(HistorySampler(application, functools.partial(getSampleCalls, **historyOptions),
+                                             interval=historyInterval))
+        self.tasks.append(CacheRefresher(application, interval=self.cache.get("refreshInterval", 1.0)))
+        self.tasks.append(application.jobManager)
+        if self.changeConnection is not None:
+            self.tasks.append(ChangeListener(application, self.changeConnection))
+        if self.change_log.get("enabled", True) and self.primaryWorker:
+            from c4.rest.handlers.nodes import getNodeSnapshots
+            self.tasks.append(ChangeLogUpdater(application, getNodeSnapshots, interval=self.change_log.get("interval", 60.0)))
+        for task in self.tasks:
+            task.start()
+
+        restServer = RestHTTPServer(application, ssl_options=self.getSSLContext())
+        restServer.add_sockets(self.sockets)
+        self.servers.append(restServer)
+        if unixSockets:
+            # local clients are authenticated through file system permissions, no TLS needed
+            unixServer = RestHTTPServer(application)
+            unixServer.add_sockets(unixSockets)
+            self.servers.append(unixServer)
+
+    @gen.coroutine
+    def stop(self):
+        """
+        Stop accepting new connections, wait until in-flight requests
+        finished or the shutdown timeout expired and stop the background tasks.
+        Keep-alive connections are closed once they are idle so that no
+        request is received after the server stopped.
+        """
+        application = self.application
+        self.log.info("draining %d in-flight request(s)", application.activeRequests)
+        for server in self.servers:
+            server.drain()
+        deadline = time.time() + self.shutdown_timeout
+        while time.time() < deadline:
+            for server in self.servers:
+                server.closeIdleConnections()
+            if application.activeRequests <= 0 and not any(server.connections for server in self.servers):
+                break
+            yield gen.sleep(0.05)
+        if application.activeRequests > 0:
+            self.log.warning("shutdown timeout expired with %d request(s) in-flight", application.activeRequests)
+        for server in self.servers:
+            server.closeAllConnections()
+        self.servers = []
+        for task in self.tasks:
+            task.stop()
+        self.tasks = []
+        application.statusCollector.shutdown()
+        application.executor.shutdown(wait=False)
+
+@ClassLogger
+class RestServerThread(threading.Thread):
+    """
+    REST server running on its own IOLoop in a daemon thread
+
+    :param node: node
+    :type node: str
+    :param kwargs: server options, see :class:`RestServer`
+    """
+    def __init__(self, node, **kwargs):
+        super(RestServerThread, self).__init__(name="REST server")
+        self.daemon = True
+        self.server = RestServer(node, **kwargs)
+        self.ioloop = None
+        self.ready = threading.Event()
+        self.exception = None
+
+    def start(self):
+        """
+        Start the thread and wait until the server listens
+
+        :raises Exception: if the server could not be started
+        """
+        super(RestServerThread, self).start()
+        self.ready.wait()
+        if self.exception is not None:
+            raise self.exception
+
+    def run(self):
+        self.ioloop = createIOLoop()
+        try:
+            self.server.start()
+        except Exception as exception:
+            self.exception = exception
+            self.ready.set()
+            return
+        self.ready.set()
+        self.ioloop.start()
+        self.ioloop.close()
+
+    def stop(self, timeout=None):
+        """
+        Stop the server and wait for the thread to finish
+
+        :param timeout: seconds to wait for the thread
+        :type timeout: float
+        """
+        if self.ioloop is None or not self.is_alive():
+            return
+
+        @gen.coroutine
+        def stopServer():
+            """
+            Stop server and then its IOLoop
+            """
+            yield self.server.stop()
+            self.ioloop.stop()
+        self.ioloop.add_callback(stopServer)
+        self.join(timeout)
 
 @ClassLogger
 class RestServerProcess(multiprocessing.Process):
@@ -52,13 +752,90 @@ class RestServerProcess(multiprocessing.Process):
     :type node: str
     :param port: port number
     :type port: int
+    :param ssl_options: SSL options, see :meth:`RestServer.getSSLContext` and
+        :func:`~c4.rest.server.tls.createSSLContext`
+    :type ssl_options: dict
+    :param ssl_version: fixed SSL protocol version, by default the highest version supported by both sides is negotiated
+    :type ssl_version: int
+    :param circuit_breaker: circuit breaker options for backend access,
+        see :class:`~c4.rest.server.circuitbreaker.CircuitBreaker`
+    :type circuit_breaker: dict
+    :param cache: response cache options, see :class:`~c4.rest.server.cache.ResponseCache`,
+        ``refreshInterval`` for the :class:`~c4.rest.server.cache.CacheRefresher` and
+        ``shared``, ``directory``, ``slots`` and ``slotSize`` for the
+        :class:`~c4.rest.server.sharedcache.SharedResponseStore`
+    :type cache: dict
+    :param workers: number of pre-forked worker processes
+    :type workers: int
+    :param device_status: device status collection options, ``timeout`` per device, ``maxWorkers``
+        for the number of devices queried at the same time and ``queueTimeout``,
+        see :class:`~c4.rest.server.status.StatusCollector`
+    :type device_status: dict
+    :param history: metric history options, ``capacity`` samples per metric, sampling ``interval``
+        in seconds and ``deviceTypes`` to sample, see :class:`~c4.rest.server.history.MetricHistory`
+    :type history: dict
+    :param jobs: job options, see :class:`~c4.rest.server.jobs.JobManager`, and ``slotSize``,
+        the maximum size of job information shared between worker processes
+    :type jobs: dict
+    :param admin_token: token for administrative routes, disabled if not set
+    :type admin_token: str
+    :param slow_requests: slow request log options, ``threshold`` in seconds and number of
+        requests kept per worker process, see :class:`~c4.rest.server.slowrequests.SlowRequestLog`
+    :type slow_requests: dict
+    :param change_log: node change log options, ``maxChanges`` kept, periodic update ``interval``
+        in seconds in addition to updates on changes, ``slotSize``, the maximum size of the change log
+        shared between worker processes, and ``enabled`` set to ``false`` disables it,
+        see :class:`~c4.rest.server.changes.ChangeLog`
+    :type change_log: dict
+    :param async_logging: options for writing log records in the background, ``queueSize`` and
+        ``accessLogSampleRate``, see :class:`~c4.rest.server.logqueue.AsyncLogHandler`,
+        ``enabled`` set to ``false`` writes log records on the IOLoop thread
+    :type async_logging: dict
+    :param unix_socket: additional Unix domain socket listener for same-host clients,
+        see :func:`bindUnixSocket` for the ``path``, ``mode`` and ``group`` options
+    :type unix_socket: dict
+    :param shutdown_timeout: seconds to wait for in-flight requests to finish on shutdown
+    :type shutdown_timeout: float
+    :param sockets: already bound TCP sockets, e.g., inherited from a previous server process
+    :type sockets: [:class:`~socket.socket`]
+    :param unixSockets: already bound Unix domain sockets
+    :type unixSockets: [:class:`~socket.socket`]
     """
-    def __init__(self, node, port=8888, ssl_options=None, ssl_version=ssl.PROTOCOL_TLSv1_2):
+    def __init__(self, node, port=8888, ssl_options=None, ssl_version=None, circuit_breaker=None, cache=None, workers=1,
+                 device_status=None, history=None, jobs=None, admin_token=None, slow_requests=None, change_log=None,
+                 async_logging=None, unix_socket=None, shutdown_timeout=10.0, sockets=None, unixSockets=None):
         super(RestServerProcess, self).__init__(name="REST server")
         self.node = node
         self.port = int(port)
         self.ssl_options = ssl_options
         self.ssl_version = ssl_version
+        self.circuit_breaker = circuit_breaker or {}
+        self.cache = cache or {}
+        self.workers = int(workers)
+        self.device_status = device_status or {}
+        self.history = history or {}
+        self.jobs = jobs or {}
+        self.admin_token = admin_token
+        self.slow_requests = slow_requests or {}
+        self.change_log = change_log or {}
+        self.async_logging = async_logging or {}
+        self.unix_socket = unix_socket
+        self.shutdown_timeout = float(shutdown_timeout)
+        self.sockets = sockets
+        self.unixSockets = unixSockets
+        self.ready = multiprocessing.Event()
+        self.statistics = ServerStatistics(self.workers)
+        # compute routes in the parent so that forked processes inherit them
+        self.handlers = self.getHandlers()
+        self.startTime = None
+        self.startupTime = multiprocessing.RawValue("d", 0.0)
+        self.workerId = 0
+        # one pipe per worker so that every worker receives every change
+        self.changePipes = [multiprocessing.Pipe(duplex=False) for _ in range(self.workers)]
+        self.changeLock = threading.Lock()
+        # worker id to the change that replaces the changes dropped while its pipe was full
+        self.missedChanges = {}
+        self.configurationVersion = None
 
     def getHandlers(self):
         """
@@ -67,85 +844,337 @@ class RestServerProcess(multiprocessing.Process):
         :returns: list of route and handler tuples
         :rtype: (route, handler, <initialization dict>)
         """
-        routeMap = getRouteMap()
-        return [
-            (actualRoute, handler, dict(node=self.node))
-            for actualRoute, handler in sorted(routeMap.items())
-        ]
+        return getHandlers(self.node)
+
+    def notifyChange(self, change):
+        """
+        Push a configuration change to all worker processes, see
+        :mod:`c4.rest.server.changes`. Changes sent while a worker restarts
+        are received by the new worker. This never blocks, if the pipe of a
+        worker is full, e.g., because the worker is wedged, its changes are
+        dropped and replaced by a single configuration change that invalidates
+        all of its caches once the pipe has room again.
+
+        :param change: change
+        :type change: dict
+        """
+        with self.changeLock:
+            if change.get("type") == CONFIGURATION and change.get("version") is not None:
+                self.configurationVersion = change["version"]
+            for workerId in range(self.workers):
+                self.sendChange(workerId, change)
+
+    def flushChanges(self):
+        """
+        Send the changes replacing dropped ones to workers whose pipes have room again
+        """
+        with self.changeLock:
+            for workerId in list(self.missedChanges):
+                self.sendChange(workerId)
+
+    def sendChange(self, workerId, change=None):
+        """
+        Send a change to a worker without blocking, preceded by the change
+        replacing previously dropped ones
+
+        :param workerId: worker id
+        :type workerId: int
+        :param change: change
+        :type change: dict
+        :returns: ``True`` if the changes were sent, ``False`` if the pipe is full
+        :rtype: bool
+        """
+        sender = self.changePipes[workerId][1]
+        for pending in (self.missedChanges.pop(workerId, None), change):
+            if pending is None:
+                continue
+            # changes are smaller than the atomic pipe write size so a writable pipe takes them without blocking
+            if not select.select([], [sender.fileno()], [], 0)[1]:
+                self.log.warning("change pipe of worker %d is full, dropping changes", workerId)
+                self.missedChanges[workerId] = createConfigurationChange(self.configurationVersion)
+                return False
+            sender.send(pending)
+        return True
+
+    def createSharedStore(self, shared=None, directory=None, slots=64, slotSize=1048576, name="cache"):
+        """
+        Create a store shared between worker processes, by default the one for responses
+
+        :param shared: enable the shared store, defaults to enabled if there are multiple workers
+        :type shared: bool
+        :param directory: directory for the memory-mapped file, defaults to a private runtime directory,
+            see :func:`~c4.rest.server.sharedcache.getRuntimeDirectory`
+        :type directory: str
+        :param slots: number of responses that can be stored
+        :type slots: int
+        :param slotSize: maximum size of a serialized response in bytes
+        :type slotSize: int
+        :param name: name of the store, used as file extension
+        :type name: str
+        :returns: shared response store or ``None``
+        :rtype: :class:`~c4.rest.server.sharedcache.SharedResponseStore`
+        """
+        if shared is None:
+            shared = self.workers > 1
+        if not shared:
+            return None
+        if directory is None:
+            directory = getRuntimeDirectory()
+        path = os.path.join(directory, "c4-rest-server-{0}.{1}".format(self.node, name))
+        return SharedResponseStore(path, slots=slots, slotSize=slotSize)
+
+    def createProcessStore(self, name, slots, slotSize):
+        """
+        Create a store that is only shared with the worker processes of this
+        server process. Its file is removed right away, workers inherit the
+        mapping, so that a new server process started on restart does not
+        touch the store of the one it replaces while that one still drains.
+
+        :param name: name of the store
+        :type name: str
+        :param slots: number of entries that can be stored
+        :type slots: int
+        :param slotSize: maximum size of an entry in bytes
+        :type slotSize: int
+        :returns: shared store or ``None``
+        :rtype: :class:`~c4.rest.server.sharedcache.SharedResponseStore`
+        """
+        store = self.createSharedStore(directory=self.cache.get("directory"), slots=slots, slotSize=slotSize,
+                                       name="{0}.{1}".format(name, os.getpid()))
+        if store is not None:
+            os.unlink(store.path)
+        return store
+
+    def createJobStore(self):
+        """
+        Create the store that shares job information between worker processes.
+        It has room for the maximum number of jobs of all workers.
+
+        :returns: shared job store or ``None``
+        :rtype: :class:`~c4.rest.server.sharedcache.SharedResponseStore`
+        """
+        return self.createProcessStore("jobs", self.workers * int(self.jobs.get("maxJobs", 100)),
+                                       self.jobs.get("slotSize", 1048576))
+
+    def createChangeLogStore(self):
+        """
+        Create the store that shares the node change log between worker processes
+
+        :returns: shared change log store or ``None``
+        :rtype: :class:`~c4.rest.server.sharedcache.SharedResponseStore`
+        """
+        if not self.change_log.get("enabled", True):
+            return None
+        return self.createProcessStore("changes", 1, self.change_log.get("slotSize", 16777216))
+
+    def forkWorkers(self):
+        """
+        Fork worker processes and supervise them. Workers that die unexpectedly
+        are replaced and a ``SIGTERM`` is forwarded to all workers.
+
+        :returns: ``True`` in worker processes, ``False`` in the supervising
+            process once all workers exited
+        :rtype: bool
+        """
+        children = {}
+        stopping = []
+
+        def forkWorker(workerId):
+            """
+            Fork a single worker
+            """
+            pid = os.fork()
+            if pid == 0:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                self.workerId = workerId
+                return True
+            children[pid] = workerId
+            return False
+
+        for workerId in range(self.workers):
+            if forkWorker(workerId):
+                return True
+
+        def terminateWorkers(signum, frame): # pylint: disable=unused-argument
+            """
+            Forward termination to workers
+            """
+            stopping.append(signum)
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+        signal.signal(signal.SIGTERM, terminateWorkers)
+
+        while children:
+            try:
+                pid, status = os.wait()
+            except OSError as exception:
+                if exception.errno == errno.EINTR:
+                    continue
+                raise
+            workerId = children.pop(pid, None)
+            if workerId is None:
+                continue
+            if not stopping and status != 0:
+                self.log.error("REST server worker %d (pid %d) exited with status %d, restarting", workerId, pid, status)
+                if forkWorker(workerId):
+                    return True
+        return False
+
+    def start(self):
+        """
+        Start the REST server process
+        """
+        self.startTime = time.time()
+        super(RestServerProcess, self).start()
 
     def run(self):
         """
         The implementation of the REST server process
         """
+        asyncLogHandler = None
         try:
-            handlers = self.getHandlers()
-            self.log.info(handlers)
-            application = Application(handlers=self.getHandlers())
-            application.executor = ThreadPoolExecutor(10)
-            ssl_options = None
-            if self.ssl_options:
-                ssl_enabled = True
-                if self.ssl_options["package"]:
-                    package = self.ssl_options["package"]
-                
-                directory = ""
-                if self.ssl_options["directory"]:
-                    directory = self.ssl_options["directory"]
-                
-                if self.ssl_options["certfile"]:
-                    ssl_certificate_file = self.ssl_options["certfile"]
-                    if os.path.dirname(ssl_certificate_file) == "" and package:
-                        ssl_certificate_file = pkg_resources.resource_filename(package, directory + ssl_certificate_file)  # @UndefinedVariable
-                
-                if self.ssl_options["keyfile"]:
-                    ssl_key_file = self.ssl_options["keyfile"]
-                    if os.path.dirname(ssl_key_file) == "" and package:
-                        ssl_key_file = pkg_resources.resource_filename(package, directory + ssl_key_file)  # @UndefinedVariable        
-                
-                if not os.path.exists(ssl_certificate_file):
-                    self.log.error("SSL certificate file not found at location: %s", ssl_certificate_file)
-                    ssl_enabled = False
-                    
-                if not os.path.exists(ssl_key_file):
-                    self.log.error("SSL key file not found at location: %s", ssl_key_file)
-                    ssl_enabled = False
-                    
-                if not self.ssl_version:    
-                    self.log.error("SSL version not specified")
-                    ssl_enabled = False
-                
-                if ssl_enabled:
-                    ssl_options = {
-                        "ssl_version": self.ssl_version,
-                        "certfile": ssl_certificate_file,
-                        "keyfile": ssl_key_file
-                    }
-                    self.log.info(ssl_options)
-                else:
-                    self.log.warning("SSL options specified but unable to enable SSL for REST server")    
-    
-            restServer = HTTPServer(application, ssl_options=ssl_options)
-            restServer.listen(self.port)
-            IOLoop.current().start()
+            self.log.debug(self.handlers)
+            sharedStore = self.createSharedStore(**dict(
+                (key, self.cache[key])
+                for key in ("shared", "directory", "slots", "slotSize")
+                if key in self.cache
+            ))
+            jobStore = self.createJobStore()
+            changeLogStore = self.createChangeLogStore()
+            sockets = self.sockets or bind_sockets(self.port)
+            unixSockets = self.unixSockets or []
+            if self.unix_socket and not unixSockets:
+                unixSockets.append(bindUnixSocket(**self.unix_socket))
+            if self.workers > 1 and not self.forkWorkers():
+                return
+            ioloop = createIOLoop()
+            if self.async_logging.get("enabled", True):
+                asyncLogHandler = installAsyncLogging(**dict(
+                    (key, value)
+                    for key, value in self.async_logging.items()
+                    if key != "enabled"
+                ))
+
+            self.statistics.setWorker(self.workerId)
+            server = RestServer(self.node, ssl_options=self.ssl_options, ssl_version=self.ssl_version,
+                                circuit_breaker=self.circuit_breaker, cache=self.cache, device_status=self.device_status,
+                                history=self.history, jobs=self.jobs, admin_token=self.admin_token,
+                                slow_requests=self.slow_requests, change_log=self.change_log, shutdown_timeout=self.shutdown_timeout,
+                                sockets=sockets, unixSockets=unixSockets, handlers=self.handlers,
+                                statistics=self.statistics, sharedStore=sharedStore, jobStore=jobStore,
+                                changeLogStore=changeLogStore, changeConnection=self.changePipes[self.workerId][0],
+                                primaryWorker=self.workerId == 0)
+            server.start()
+
+            def handleTerminate(signum, frame): # pylint: disable=unused-argument
+                """
+                Drain in-flight requests on termination
+                """
+                ioloop.add_callback_from_signal(self.drain, server)
+            signal.signal(signal.SIGTERM, handleTerminate)
+
+            if not self.ready.is_set():
+                self.startupTime.value = time.time() - self.startTime
+                self.log.info("REST server started in %.3f seconds", self.startupTime.value)
+            self.ready.set()
+            ioloop.start()
         except KeyboardInterrupt:
             self.log.info("Exiting..")
         except Exception as exception:
             self.log.info("Forced exiting..")
             self.log.exception(exception)
+        finally:
+            if asyncLogHandler is not None:
+                uninstallAsyncLogging(asyncLogHandler)
+
+    @gen.coroutine
+    def drain(self, server):
+        """
+        Stop the server once in-flight requests finished or the shutdown
+        timeout expired and then stop the IOLoop
 
-def getRouteMap():
+        :param server: REST server
+        :type server: :class:`RestServer`
+        """
+        yield server.stop()
+        IOLoop.current().stop()
+
+def createIOLoop():
+    """
+    Create a new IOLoop and make it the current one. Forked processes must
+    not continue to use an IOLoop, and its poller, inherited from the parent.
+
+    :returns: IOLoop
+    :rtype: :class:`~tornado.ioloop.IOLoop`
+    """
+    with warnings.catch_warnings():
+        # clear_current and make_current are deprecated in newer Tornado versions but still required for older ones
+        warnings.simplefilter("ignore", DeprecationWarning)
+        IOLoop.clear_current()
+        ioloop = IOLoop()
+        ioloop.make_current()
+    return ioloop
+
+def bindUnixSocket(path, mode=0o600, group=None):
+    """
+    Bind a Unix domain socket whose file system permissions restrict
+    which local users are able to connect
+
+    :param path: socket path
+    :type path: str
+    :param mode: permissions of the socket file, octal strings are supported
+    :type mode: int
+    :param group: group owning the socket file
+    :type group: str
+    :returns: listening socket
+    :rtype: :class:`~socket.socket`
+    """
+    if not isinstance(mode, int):
+        mode = int(mode, 8)
+    unixSocket = bind_unix_socket(path, mode=mode)
+    if group is not None:
+        os.chown(path, -1, grp.getgrnam(group).gr_gid)
+    log.info("listening on Unix domain socket '%s' with mode %o", path, mode)
+    return unixSocket
+
+def getRouteMap(refresh=False):
     """
     Retrieve route to handler map by looking for request handlers
-    extending the :class:`BaseRequestHandler` and decorated with ``route``
+    extending the :class:`BaseRequestHandler` and decorated with ``route``.
+    Scanning the handler modules is expensive so the map is only computed once
+    unless a refresh is requested.
+
+    :param refresh: scan handler modules again
+    :type refresh: bool
+    :returns: route to handler map
+    :rtype: dict
+    """
+    if refresh or "routeMap" not in _routeMapCache:
+        _routeMapCache["routeMap"] = _scanRouteMap()
+    return dict(_routeMapCache["routeMap"])
+
+def _scanRouteMap():
+    """
+    Scan handler modules for request handlers
 
     :returns: route to handler map
     :rtype: dict
     """
     restHandlers = sorted(getModuleClasses(c4.rest.handlers, BaseRequestHandler))
 
-    # remove base class
-    if BaseRequestHandler in restHandlers:
-        restHandlers.remove(BaseRequestHandler)
+    # remove base classes
+    for baseClass in (BaseRequestHandler, AdminRequestHandler):
+        if baseClass in restHandlers:
+            restHandlers.remove(baseClass)
+
+    # plugin handlers are only imported on the first request to their route
+    restHandlers.extend(
+        createLazyHandler(entryPoint)
+        for entryPoint in iterEntryPoints(HANDLER_ENTRY_POINT_GROUP)
+    )
 
     routeMap = {}
     for handler in restHandlers:
@@ -160,10 +1189,75 @@ def getRouteMap():
 
     return routeMap
 
+def iterEntryPoints(group):
+    """
+    Get entry points registered for the specified group without loading them
+
+    :param group: entry point group
+    :type group: str
+    :returns: entry points
+    :rtype: list
+    """
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        # pkg_resources is slow to import, only use it on older Python versions
+        import pkg_resources
+        return list(pkg_resources.iter_entry_points(group))
+    entryPoints = entry_points()
+    if hasattr(entryPoints, "select"):
+        return list(entryPoints.select(group=group))
+    return list(entryPoints.get(group, []))
+
+class LazyRequestHandler(BaseRequestHandler):
+    """
+    Placeholder for a request handler registered through an entry point.
+    The handler module is imported on the first request and instantiating
+    the placeholder returns an instance of the actual handler class.
+
+    Note that handlers using :func:`~tornado.web.stream_request_body` cannot be loaded lazily.
+    """
+    entryPoint = None
+    handlerClass = None
+
+    def __new__(cls, application, request, **kwargs):
+        return cls.load()(application, request, **kwargs)
+
+    @classmethod
+    def load(cls):
+        """
+        Load the actual request handler class
+
+        :returns: request handler class
+        :rtype: :class:`BaseRequestHandler`
+        """
+        if cls.handlerClass is None:
+            log.debug("loading REST handler '%s' for route '%s'", cls.entryPoint, cls.route)
+            cls.handlerClass = cls.entryPoint.load()
+        return cls.handlerClass
+
+def createLazyHandler(entryPoint):
+    """
+    Create a placeholder request handler for an entry point of the form
+    ``<route> = <module>:<request handler class>``
+
+    :param entryPoint: entry point
+    :returns: lazily loaded request handler
+    :rtype: :class:`LazyRequestHandler`
+    """
+    return type(str("LazyRequestHandler"), (LazyRequestHandler,), {
+        "entryPoint": entryPoint,
+        "handlerClass": None,
+        "route": entryPoint.name
+    })
+
 def route(path):
     """
     Route decorator to be used on request handler classes that
-    should be exposed externally through REST
+    should be exposed externally through REST. The path may contain
+    parameters in the form of ``{name}`` which are passed to the
+    request handler methods as keyword arguments, e.g.,
+    ``/api/nodes/{node}/devices/{device}``
 
     :param cls: a request handler class
     :returns: a request handler class decorated with additional route information
@@ -19,16 +19,21 @@ setup(
     cmdclass = versioneer.get_cmdclass(),
     description = "REST server and device manager for project C4",
     entry_points = {},
+    extras_require = {
+        "cbor": ["cbor2"],
+        "msgpack": ["msgpack"],
+        "numpy": ["numpy"]
+    },
     install_requires = [
         "c4-systemmanager",
         "futures",
-        "tornado"
+        "tornado>=4.5"
     ],
     keywords = "python c4 rest",
     license = "MIT",
     name = "c4-rest-server",
     package_data = {},
-    packages = find_packages(),
+    packages = find_packages(exclude=["benchmarks"]),
     setup_requires=[] + pytest_runner,
     tests_require=[
         "pytest",
@@ -0,0 +1,162 @@
+import json
+import threading
+import time
+
+import pytest
+from tornado import gen
+from tornado.httpclient import AsyncHTTPClient
+from tornado.ioloop import IOLoop
+
+from c4.rest.handlers.admin import Memory, Profile, SlowRequests
+from c4.rest.server import (BaseRequestHandler,
+                            MemoryTracker,
+                            RestServer,
+                            StackSampler)
+
+
+def waitForRelease(event):
+    event.wait()
+
+def test_stackSampler():
+
+    release = threading.Event()
+    thread = threading.Thread(target=waitForRelease, args=(release,), name="blocked")
+    thread.start()
+    try:
+        sampler = StackSampler(interval=0.01).run(0.1)
+    finally:
+        release.set()
+        thread.join()
+    assert sampler.samples >= 5
+    stacks = [stack for stack in sampler.stacks if stack.startswith("blocked;")]
+    assert stacks
+    assert all("waitForRelease" in stack for stack in stacks)
+    assert sampler.toCollapsed().count("\n") == len(sampler.stacks)
+
+def test_profile():
+
+    handlers = [("/api/admin/profile", Profile, dict(node="node1"))]
+    server = RestServer("node1", port=0, address="127.0.0.1", handlers=handlers, history={"interval": 0},
+                        admin_token="secret")
+
+    @gen.coroutine
+    def run():
+        server.start()
+        client = AsyncHTTPClient()
+        url = "http://127.0.0.1:{0}/api/admin/profile?seconds=0.1&format=json".format(server.port)
+
+        response = yield client.fetch(url, raise_error=False)
+        assert response.code == 401
+        response = yield client.fetch(url, headers={"Authorization": "Bearer wrong"}, raise_error=False)
+        assert response.code == 401
+
+        response = yield client.fetch(url + "&interval=1e-9", headers={"Authorization": "Bearer secret"}, raise_error=False)
+        assert response.code == 400
+
+        response = yield client.fetch(url, headers={"Authorization": "Bearer secret"})
+        profile = json.loads(response.body.decode("utf-8"))
+        assert profile["samples"] > 0
+        # the IOLoop thread is waiting for events while the sampler runs
+        assert any(stack.startswith("MainThread;") for stack in profile["stacks"])
+
+        server.application.adminToken = None
+        response = yield client.fetch(url, headers={"Authorization": "Bearer secret"}, raise_error=False)
+        assert response.code == 403
+        yield server.stop()
+    IOLoop.current().run_sync(run)
+
+def test_memory():
+
+    handlers = [("/api/admin/memory", Memory, dict(node="node1"))]
+    server = RestServer("node1", port=0, address="127.0.0.1", handlers=handlers, history={"interval": 0},
+                        admin_token="secret")
+    server.application.metricHistory.record(("node1", "cpu"), 1.0, {"usage": 10})
+    headers = {"Authorization": "Bearer secret"}
+
+    @gen.coroutine
+    def run():
+        server.start()
+        client = AsyncHTTPClient()
+        url = "http://127.0.0.1:{0}/api/admin/memory".format(server.port)
+
+        response = yield client.fetch(url, headers=headers)
+        memory = json.loads(response.body.decode("utf-8"))
+        assert memory["tracing"] is False
+        assert "top" not in memory
+        assert memory["caches"]["metricHistory"]["entries"] == 1
+        assert memory["caches"]["responseCache"]["entries"] == 0
+
+        response = yield client.fetch(url, method="PUT", headers=headers, body="{}", raise_error=False)
+        assert response.code == 400
+        response = yield client.fetch(url + "?limit=-1", headers=headers, raise_error=False)
+        assert response.code == 400
+        response = yield client.fetch(url, method="PUT", headers=headers, body=json.dumps({"tracing": True}))
+        assert json.loads(response.body.decode("utf-8"))["tracing"] is True
+        try:
+            response = yield client.fetch(url + "?baseline=true&limit=5", headers=headers)
+            memory = json.loads(response.body.decode("utf-8"))
+            assert memory["tracing"] is True
+            assert memory["traced"]["current"] > 0
+            assert 0 < len(memory["top"]) <= 5
+            assert "diff" not in memory
+
+            leak = [bytearray(1024) for _ in range(100)]
+            response = yield client.fetch(url + "?limit=5", headers=headers)
+            memory = json.loads(response.body.decode("utf-8"))
+            assert any(statistic["sizeDiff"] >= 100 * 1024 for statistic in memory["diff"])
+            del leak
+        finally:
+            response = yield client.fetch(url, method="PUT", headers=headers, body=json.dumps({"tracing": False}))
+        assert json.loads(response.body.decode("utf-8"))["tracing"] is False
+        yield server.stop()
+    IOLoop.current().run_sync(run)
+
+class Slow(BaseRequestHandler):
+
+    @gen.coroutine
+    def get(self):
+        value = yield self.backendCall(("slow",), time.sleep, 0.2)
+        self.write({"value": value})
+
+def test_slowRequests():
+
+    handlers = [
+        ("/api/admin/slow-requests", SlowRequests, dict(node="node1")),
+        ("/api/slow", Slow, dict(node="node1"))
+    ]
+    server = RestServer("node1", port=0, address="127.0.0.1", handlers=handlers, history={"interval": 0},
+                        admin_token="secret", slow_requests={"threshold": 0.1, "size": 2})
+    headers = {"Authorization": "Bearer secret"}
+
+    @gen.coroutine
+    def run():
+        server.start()
+        client = AsyncHTTPClient()
+        url = "http://127.0.0.1:{0}".format(server.port)
+        for index in range(3):
+            yield client.fetch(url + "/api/slow?index={0}".format(index))
+
+        response = yield client.fetch(url + "/api/admin/slow-requests", headers=headers)
+        slowRequests = json.loads(response.body.decode("utf-8"))
+        assert slowRequests["threshold"] == 0.1
+        # only the most recent requests are kept and the admin request itself is fast
+        assert [request["query"] for request in slowRequests["requests"]] == [{"index": ["2"]}, {"index": ["1"]}]
+        request = slowRequests["requests"][0]
+        assert request["path"] == "/api/slow"
+        assert request["status"] == 200
+        assert request["duration"] >= 0.2
+        assert request["phases"]["backend"] >= 0.2
+        assert request["responseSize"] == len('{"value": null}')
+        assert request["executorWait"] >= 0
+        yield server.stop()
+    IOLoop.current().run_sync(run)
+
+def test_memoryTrackerStopped():
+
+    tracker = MemoryTracker()
+    if not tracker.available:
+        pytest.skip("allocation tracing is not supported")
+    tracker.start()
+    tracker.stop()
+    # statistics requested while tracing was running are not available once it stopped
+    assert tracker.getStatistics() is None
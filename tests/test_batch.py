@@ -0,0 +1,92 @@
+import json
+
+from concurrent.futures import ThreadPoolExecutor
+from tornado import gen
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.netutil import bind_sockets
+
+from c4.rest.handlers.batch import Batch
+from c4.rest.server import (BaseRequestHandler,
+                            CircuitBreaker,
+                            RestApplication)
+from c4.rest.server.stats import ServerStatistics
+
+
+calls = []
+
+def getDevice(node, device):
+    calls.append((node, device))
+    return {"node": node, "device": device}
+
+class DeviceHandler(BaseRequestHandler):
+
+    @gen.coroutine
+    def get(self, node, device):
+        value = yield self.backendCall(("getDevice", node, device), getDevice, node, device)
+        self.write(value)
+
+class HeadersHandler(BaseRequestHandler):
+
+    def get(self):
+        self.add_header("Vary", "Accept")
+        self.add_header("Vary", "Authorization")
+        self.write(dict((name, self.request.headers.get(name)) for name in ("Authorization", "Content-Type", "X-Test")))
+
+def test_batch():
+
+    application = RestApplication(handlers=[
+        ("/api/batch", Batch, dict(node="node1")),
+        ("/api/headers", HeadersHandler, dict(node="node1")),
+        ("/api/nodes/{node}/devices/{device}", DeviceHandler, dict(node="node1"))
+    ])
+    application.activeRequests = 0
+    application.statistics = ServerStatistics()
+    application.executor = ThreadPoolExecutor(2)
+    application.circuitBreaker = CircuitBreaker()
+    sockets = bind_sockets(0, "127.0.0.1")
+    server = HTTPServer(application)
+    server.add_sockets(sockets)
+    url = "http://127.0.0.1:{0}/api/batch".format(sockets[0].getsockname()[1])
+
+    @gen.coroutine
+    def fetch():
+        client = AsyncHTTPClient()
+        body = {"requests": [
+            {"path": "/api/nodes/node1/devices/cpu"},
+            {"path": "/api/nodes/node1/devices/cpu"},
+            {"path": "/api/nodes/node2/devices/disk"},
+            {"path": "/api/unknown"},
+            {"path": "/api/batch", "method": "POST"}
+        ]}
+        response = yield client.fetch(url, method="POST", body=json.dumps(body))
+        responses = json.loads(response.body.decode("utf-8"))["responses"]
+        assert [subResponse["status"] for subResponse in responses] == [200, 200, 200, 404, 400]
+        assert responses[0]["body"] == {"node": "node1", "device": "cpu"}
+        assert responses[2]["body"] == {"node": "node2", "device": "disk"}
+        # identical backend reads are shared within the batch
+        assert sorted(calls) == [("node1", "cpu"), ("node2", "disk")]
+
+        body = {"requests": [
+            {"path": "/api/headers", "headers": {"X-Test": "test"}},
+            {"path": 5},
+            {"path": "/api/headers", "headers": ["X-Test"]},
+            {"path": "/api/headers", "headers": {"X-Test": 1}}
+        ]}
+        response = yield client.fetch(url, method="POST", body=json.dumps(body),
+                                      headers={"Authorization": "Bearer token", "Content-Type": "application/json"})
+        responses = json.loads(response.body.decode("utf-8"))["responses"]
+        # invalid sub-requests only fail themselves
+        assert [subResponse["status"] for subResponse in responses] == [200, 400, 400, 400]
+        # only allowed headers of the batch request are passed on
+        assert responses[0]["body"] == {"Authorization": "Bearer token", "Content-Type": None, "X-Test": "test"}
+        assert responses[0]["headers"]["Vary"] == ["Accept", "Authorization"]
+
+        response = yield client.fetch(url, method="POST", body="invalid", raise_error=False)
+        assert response.code == 400
+    try:
+        IOLoop.current().run_sync(fetch)
+    finally:
+        server.stop()
+        application.executor.shutdown()
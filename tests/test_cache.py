@@ -0,0 +1,133 @@
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from c4.rest.server import (CacheRefresher,
+                            CircuitBreaker,
+                            ResponseCache,
+                            SharedResponseStore)
+
+
+class Application(object):
+
+    def __init__(self, ttl=5.0, idleTimeout=300.0):
+        self.circuitBreaker = CircuitBreaker()
+        self.executor = ThreadPoolExecutor(2)
+        self.responseCache = ResponseCache(ttl=ttl, idleTimeout=idleTimeout)
+
+@pytest.fixture
+def application(request):
+    application = Application(ttl=1.0, idleTimeout=10.0)
+    request.addfinalizer(lambda: application.executor.shutdown(wait=False))
+    return application
+
+@gen.coroutine
+def counter(context, values):
+    value = yield context.backendCall(("counter",), values.pop)
+    raise gen.Return(str(value))
+
+def test_evictIdle(monkeypatch):
+
+    cache = ResponseCache(idleTimeout=10)
+    cache.put(("a",), "a", counter)
+    cache.put(("b",), "b", counter)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 5)
+    assert cache.get(("b",)).value == "b"
+
+    monkeypatch.setattr(time, "time", lambda: now + 12)
+    assert cache.evictIdle() == [("a",)]
+    assert len(cache) == 1
+
+def test_refresh(application):
+
+    values = [2, 1]
+    application.responseCache.put(("counter",), "0", counter, (values,))
+
+    refresher = CacheRefresher(application)
+    IOLoop.current().run_sync(lambda: refresher.refresh(("counter",)))
+    assert application.responseCache.get(("counter",)).value == "1"
+
+    IOLoop.current().run_sync(lambda: refresher.refresh(("counter",)))
+    assert application.responseCache.get(("counter",)).value == "2"
+
+def test_refresh_keeps_value_on_stale_snapshot(application):
+
+    values = [1]
+    application.responseCache.put(("counter",), "0", counter, (values,))
+    refresher = CacheRefresher(application)
+    IOLoop.current().run_sync(lambda: refresher.refresh(("counter",)))
+
+    # empty list makes the backend call fail, breaker falls back to snapshot
+    IOLoop.current().run_sync(lambda: refresher.refresh(("counter",)))
+    assert application.responseCache.get(("counter",)).value == "1"
+
+def test_produce_coalesces(application):
+
+    calls = []
+
+    @gen.coroutine
+    def slow(context):
+        calls.append(context)
+        yield gen.sleep(0.1)
+        raise gen.Return("nodes")
+
+    cache = application.responseCache
+
+    @gen.coroutine
+    def run():
+        results = yield [cache.produce(("nodes",), slow, (), None) for _ in range(5)]
+        assert results == [("nodes", None)] * 5
+        assert len(calls) == 1
+        assert cache.get(("nodes",)).value == "nodes"
+        assert not cache.pending
+    IOLoop.current().run_sync(run)
+
+def test_invalidate_refreshes(application):
+
+    values = [2, 1]
+    cache = application.responseCache
+    cache.put(("counter",), "0", counter, (values,))
+    cache.invalidate()
+    entry = cache.get(("counter",))
+    assert entry.expired
+
+    refresher = CacheRefresher(application)
+
+    @gen.coroutine
+    def run():
+        # requests for the expired entry wait for the refresh instead of computing it again
+        refresh = refresher.refresh(("counter",))
+        result = yield cache.produce(("counter",), counter, (values,), None)
+        yield refresh
+        assert result == ("1", None)
+        assert values == [2]
+        assert not cache.get(("counter",)).expired
+    IOLoop.current().run_sync(run)
+
+def test_invalidate_shared(request, tmpdir):
+
+    store = SharedResponseStore(str(tmpdir.join("responses.cache")), slots=4, slotSize=1024)
+    request.addfinalizer(store.close)
+    primary = ResponseCache(sharedStore=store)
+    other = ResponseCache(sharedStore=store)
+    primary.put(("nodes",), "old", None)
+    assert other.load(("nodes",), None).value == b"old"
+
+    # every worker receives the change, only the primary one invalidates the shared store
+    changed = time.time()
+    primary.invalidate(changed=changed)
+    other.invalidate(changed=changed, shared=False)
+    assert other.get(("nodes",)).expired
+    assert store.claim(("nodes",), 30)
+    assert not store.claim(("nodes",), 30)
+
+    # a response recomputed by one worker after the change is used by the others
+    primary.put(("nodes",), "new", None)
+    entry = other.get(("nodes",))
+    assert entry.value == b"new"
+    assert not entry.expired
@@ -0,0 +1,131 @@
+import multiprocessing
+
+import pytest
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from c4.rest.server import (ChangeLog,
+                            ChangeLogUpdater,
+                            RestServer,
+                            SharedResponseStore,
+                            createConfigurationChange,
+                            createNodeStateChange)
+
+
+def test_changeListener():
+
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    server = RestServer("node1", port=0, address="127.0.0.1", handlers=[], history={"interval": 0},
+                        change_log={"enabled": False}, changeConnection=receiver)
+    application = server.application
+    changes = []
+    application.changeCallbacks.append(changes.append)
+
+    @gen.coroutine
+    def run():
+        server.start()
+        application.responseCache.put(("nodeList",), "[]", None)
+
+        sender.send(createNodeStateChange("node2", "MAINTENANCE"))
+        sender.send(createConfigurationChange(5))
+        while len(changes) < 2:
+            yield gen.sleep(0.01)
+        assert [change["type"] for change in changes] == ["nodeState", "configuration"]
+        assert changes[0]["node"] == "node2"
+        assert application.configurationVersion == 5
+        # entries are kept so that they are recomputed
+        assert application.responseCache.get(("nodeList",)).expired
+
+        # listener stops when the device manager closes its end
+        sender.close()
+        yield gen.sleep(0.05)
+        yield server.stop()
+    IOLoop.current().run_sync(run)
+
+def test_changeLog():
+
+    changeLog = ChangeLog(maxChanges=4)
+    with pytest.raises(ValueError):
+        changeLog.getChanges(None)
+    changeLog.update({"node1": {"state": "RUNNING"}, "node2": {"state": "RUNNING"}})
+    assert changeLog.getChanges(None)["added"] == {"node1": {"state": "RUNNING"}, "node2": {"state": "RUNNING"}}
+    assert changeLog.getChanges(0) == {"version": 0, "added": {}, "changed": {}, "removed": []}
+
+    assert changeLog.update({"node1": {"state": "RUNNING"}, "node2": {"state": "RUNNING"}}) == []
+    assert changeLog.update({"node1": {"state": "MAINTENANCE"}, "node3": {"state": "RUNNING"}}) == ["node1", "node2", "node3"]
+    assert changeLog.version == 1
+    assert changeLog.getChanges(0) == {
+        "version": 1,
+        "added": {"node3": {"state": "RUNNING"}},
+        "changed": {"node1": {"state": "MAINTENANCE"}},
+        "removed": ["node2"]
+    }
+
+    # pushed configuration versions are used
+    changeLog.update({"node1": {"state": "RUNNING"}, "node3": {"state": "RUNNING"}}, version=5)
+    assert changeLog.version == 5
+    assert changeLog.getChanges(1)["changed"] == {"node1": {"state": "RUNNING"}}
+    assert changeLog.getChanges(0)["added"] == {"node3": {"state": "RUNNING"}}
+    assert changeLog.getChanges(0)["removed"] == ["node2"]
+    with pytest.raises(ValueError):
+        changeLog.getChanges(6)
+
+    # changes before the oldest kept change are no longer available
+    changeLog.update({"node1": {"state": "RUNNING"}})
+    assert changeLog.version == 6
+    assert changeLog.oldestVersion == 1
+    # node3 was added before version 1 and is only reported as removed
+    assert changeLog.getChanges(1) == {"version": 6, "added": {}, "changed": {"node1": {"state": "RUNNING"}}, "removed": ["node3"]}
+    with pytest.raises(ValueError):
+        changeLog.getChanges(0)
+
+def test_changeLogUpdater():
+
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    server = RestServer("node1", port=0, address="127.0.0.1", handlers=[], history={"interval": 0},
+                        change_log={"enabled": False}, changeConnection=receiver)
+    application = server.application
+    nodes = {"node1": {"state": "RUNNING"}}
+
+    @gen.coroutine
+    def getNodes(context):
+        raise gen.Return(dict(nodes))
+
+    @gen.coroutine
+    def run():
+        server.start()
+        updater = ChangeLogUpdater(application, getNodes, interval=0)
+        updater.start()
+        while not application.changeLog.initialized:
+            yield gen.sleep(0.01)
+
+        nodes["node2"] = {"state": "RUNNING"}
+        sender.send(createConfigurationChange(3))
+        while application.changeLog.version != 3:
+            yield gen.sleep(0.01)
+        assert application.changeLog.getChanges(0)["added"] == {"node2": {"state": "RUNNING"}}
+        updater.stop()
+        yield server.stop()
+    IOLoop.current().run_sync(run)
+
+def test_sharedChangeLog(request, tmpdir):
+
+    store = SharedResponseStore(str(tmpdir.join("responses.changes")), slots=1, slotSize=65536)
+    request.addfinalizer(store.close)
+    changeLog = ChangeLog(sharedStore=store)
+    otherChangeLog = ChangeLog(sharedStore=store)
+
+    assert not otherChangeLog.load()
+    changeLog.update({"node1": {"state": "RUNNING"}})
+    changeLog.update({"node1": {"state": "MAINTENANCE"}})
+    assert otherChangeLog.load()
+    assert not otherChangeLog.load()
+    assert otherChangeLog.version == changeLog.version == 1
+    assert otherChangeLog.getChanges(0) == changeLog.getChanges(0)
+
+    # a replaced worker continues the published change log
+    replacedChangeLog = ChangeLog(sharedStore=store)
+    assert replacedChangeLog.update({"node1": {"state": "RUNNING"}}) == ["node1"]
+    assert replacedChangeLog.version == 2
+    assert otherChangeLog.load()
+    assert otherChangeLog.getChanges(1)["changed"] == {"node1": {"state": "RUNNING"}}
@@ -0,0 +1,91 @@
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tornado.ioloop import IOLoop
+
+from c4.rest.server import (CircuitBreaker,
+                            CircuitBreakerOpen)
+
+
+@pytest.fixture
+def executor(request):
+    executor = ThreadPoolExecutor(2)
+    request.addfinalizer(lambda: executor.shutdown(wait=False))
+    return executor
+
+def failing():
+    raise ValueError("backend locked")
+
+def test_opens_after_failures():
+
+    breaker = CircuitBreaker(failureThreshold=2)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.recordFailure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.recordFailure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allowRequest()
+
+def test_slow_calls_count_as_failures():
+
+    breaker = CircuitBreaker(failureThreshold=1, slowCallThreshold=0.5)
+    breaker.recordSuccess(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.recordSuccess(1.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_half_open_probe(monkeypatch):
+
+    breaker = CircuitBreaker(failureThreshold=1, resetTimeout=10)
+    breaker.recordFailure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # only a single probe is let through
+    assert breaker.allowRequest()
+    assert not breaker.allowRequest()
+
+    breaker.recordSuccess(0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_serves_snapshot_when_open(executor):
+
+    breaker = CircuitBreaker(failureThreshold=1)
+
+    value, age = IOLoop.current().run_sync(lambda: breaker.call(("names",), executor, lambda: ["node1"]))
+    assert value == ["node1"]
+    assert age is None
+
+    value, age = IOLoop.current().run_sync(lambda: breaker.call(("names",), executor, failing))
+    assert value == ["node1"]
+    assert age >= 0
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitBreakerOpen):
+        IOLoop.current().run_sync(lambda: breaker.call(("other",), executor, failing))
+
+def test_call_timeout(executor):
+
+    breaker = CircuitBreaker(failureThreshold=1, callTimeout=0.1)
+
+    with pytest.raises(Exception):
+        IOLoop.current().run_sync(lambda: breaker.call(("slow",), executor, time.sleep, 1))
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_bounded_snapshots(monkeypatch):
+
+    breaker = CircuitBreaker(maxSnapshots=2, maxSnapshotAge=60)
+    breaker.putSnapshot(("getNode", "node1"), "node1")
+    breaker.putSnapshot(("getNode", "node2"), "node2")
+    breaker.putSnapshot(("getNode", "node1"), "node1")
+    breaker.putSnapshot(("getNode", "node3"), "node3")
+    # least recently stored snapshot is evicted
+    assert list(breaker.snapshots) == [("getNode", "node1"), ("getNode", "node3")]
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert breaker.getSnapshot(("getNode", "node1")) is None
+    assert ("getNode", "node1") not in breaker.snapshots
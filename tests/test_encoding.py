@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from tornado import gen
+from tornado.httpclient import AsyncHTTPClient
+from tornado.ioloop import IOLoop
+
+from c4.rest.server import (BaseRequestHandler,
+                            RestServer,
+                            negotiate,
+                            registerEncoder)
+from c4.rest.server.encoding import ENCODERS
+
+
+@pytest.fixture
+def encoders(request):
+    encoders = ENCODERS.copy()
+    def restore():
+        ENCODERS.clear()
+        ENCODERS.update(encoders)
+    request.addfinalizer(restore)
+    for mediaType in list(ENCODERS)[1:]:
+        del ENCODERS[mediaType]
+    registerEncoder("application/x-test", lambda data: repr(data))
+
+def test_negotiate(encoders):
+
+    assert negotiate(None).mediaType == "application/json"
+    assert negotiate("text/html,application/xhtml+xml,*/*;q=0.8").mediaType == "application/json"
+    assert negotiate("text/plain").mediaType == "application/json"
+    assert negotiate("application/x-test").mediaType == "application/x-test"
+    # explicitly listed types win over wildcards with the same quality
+    assert negotiate("*/*, application/x-test").mediaType == "application/x-test"
+    assert negotiate("application/x-test;q=0.5, application/json").mediaType == "application/json"
+    assert negotiate("application/json;q=0, */*").mediaType == "application/x-test"
+
+class Data(BaseRequestHandler):
+
+    produced = 0
+
+    @gen.coroutine
+    def get(self):
+        response = yield self.cachedResponse(("data",), self.createResponse)
+        self.writeEncoded(response)
+
+    @classmethod
+    @gen.coroutine
+    def createResponse(cls, context):
+        cls.produced += 1
+        raise gen.Return(json.dumps({"nodes": ["node1", "node2"], "count": 2}))
+
+@pytest.mark.parametrize("mediaType, module, decode", [
+    ("application/msgpack", "msgpack", "unpackb"),
+    ("application/cbor", "cbor2", "loads")
+])
+def test_cachedResponse(mediaType, module, decode):
+
+    decode = getattr(pytest.importorskip(module), decode)
+    Data.produced = 0
+    server = RestServer("node1", port=0, address="127.0.0.1", handlers=[("/api/data", Data, dict(node="node1"))],
+                        history={"interval": 0}, change_log={"enabled": False})
+
+    @gen.coroutine
+    def run():
+        server.start()
+        client = AsyncHTTPClient()
+        url = "http://127.0.0.1:{0}/api/data".format(server.port)
+
+        response = yield client.fetch(url)
+        assert response.headers["Content-Type"] == "application/json; charset=UTF-8"
+        assert json.loads(response.body.decode("utf-8")) == {"nodes": ["node1", "node2"], "count": 2}
+
+        for _ in range(2):
+            response = yield client.fetch(url, headers={"Accept": mediaType})
+            assert response.headers["Content-Type"] == mediaType
+            assert response.headers["Vary"] == "Accept"
+            assert decode(response.body) == {"nodes": ["node1", "node2"], "count": 2}
+        # encoded responses are derived from the cached JSON response
+        assert len(server.application.responseCache) == 1
+        assert Data.produced == 1
+        assert mediaType in server.application.responseCache.get(("data",)).variants
+        yield server.stop()
+    IOLoop.current().run_sync(run)
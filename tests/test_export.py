@@ -0,0 +1,60 @@
+import json
+
+from tornado import gen
+from tornado.httpclient import AsyncHTTPClient
+from tornado.ioloop import IOLoop
+
+import c4.rest.handlers.export
+from c4.rest.server import RestServer
+
+
+class Information(object):
+
+    def __init__(self, name, devices=None, **properties):
+        self.name = name
+        self.devices = devices or {}
+        self.properties = properties
+
+    def toJSONSerializable(self):
+        serialized = dict(self.properties, name=self.name)
+        if self.devices:
+            serialized["devices"] = dict((name, device.toJSONSerializable()) for name, device in self.devices.items())
+        return serialized
+
+def test_export(monkeypatch):
+
+    nodes = {
+        "node1": Information("node1", state="RUNNING", devices={
+            "cpu": Information("cpu", state="RUNNING"),
+            "disk": Information("disk", state="RUNNING", devices={"sda": Information("sda", state="REGISTERED")})
+        }),
+        "node2": Information("node2", state="MAINTENANCE")
+    }
+    monkeypatch.setattr(c4.rest.handlers.export, "getNodeNames", lambda: ["node1", "node2", "node3"])
+    monkeypatch.setattr(c4.rest.handlers.export, "getNode", nodes.get)
+
+    server = RestServer("node1", port=0, address="127.0.0.1", history={"interval": 0}, change_log={"enabled": False},
+                        handlers=[("/api/export", c4.rest.handlers.export.Export, dict(node="node1"))])
+
+    @gen.coroutine
+    def run():
+        server.start()
+        chunks = []
+        response = yield AsyncHTTPClient().fetch("http://127.0.0.1:{0}/api/export".format(server.port),
+                                                 streaming_callback=chunks.append)
+        assert response.headers["Content-Type"] == "application/x-ndjson"
+        # nodes are written one at a time
+        assert len(chunks) > 1
+        records = [json.loads(line) for line in b"".join(chunks).decode("utf-8").splitlines()]
+        assert records == [
+            {"type": "node", "name": "node1", "state": "RUNNING"},
+            {"type": "device", "name": "cpu", "node": "node1", "state": "RUNNING"},
+            {"type": "device", "name": "disk", "node": "node1", "state": "RUNNING"},
+            {"type": "device", "name": "disk.sda", "node": "node1", "state": "REGISTERED"},
+            {"type": "node", "name": "node2", "state": "MAINTENANCE"},
+            {"type": "end", "nodes": 2, "devices": 3}
+        ]
+        # node information is not kept as snapshot
+        assert list(server.application.circuitBreaker.snapshots) == [("getNodeNames",)]
+        yield server.stop()
+    IOLoop.current().run_sync(run)
@@ -0,0 +1,92 @@
+import pytest
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from c4.rest.server import (HistorySampler,
+                            MetricHistory,
+                            RingBuffer,
+                            StatusCollector)
+import c4.rest.server.history
+
+
+class Application(object):
+
+    def __init__(self):
+        self.metricHistory = MetricHistory()
+        self.statusCollector = StatusCollector()
+
+
+def test_ringBuffer():
+
+    buffer = RingBuffer(capacity=4)
+    for timestamp in range(6):
+        buffer.append(timestamp, timestamp * 10)
+    assert len(buffer) == 4
+
+    timestamps, values = buffer.getRange(0, 10)
+    assert list(timestamps) == [2, 3, 4, 5]
+    assert list(values) == [20, 30, 40, 50]
+
+    timestamps, values = buffer.getRange(3, 5)
+    assert list(timestamps) == [3, 4]
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_downsample(monkeypatch, vectorized):
+
+    if vectorized:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(c4.rest.server.history, "numpy", None)
+
+    history = MetricHistory(capacity=100)
+    for timestamp in range(20):
+        history.record(("deviceStatus", "node1", "cpu"), 1000 + timestamp,
+                       {"usage": float(timestamp), "load": {"avg1": 1}, "state": "running", "ok": True})
+
+    metrics = history.query(("deviceStatus", "node1", "cpu"), 1005, 1020, 10)
+    assert sorted(metrics) == ["load.avg1", "usage"]
+    usage = metrics["usage"]
+    assert usage["timestamp"] == [1005, 1015]
+    assert usage["count"] == [10, 5]
+    assert usage["min"] == [5, 15]
+    assert usage["max"] == [14, 19]
+    assert usage["mean"] == [9.5, 17]
+    assert usage["p50"] == [9.5, 17]
+    assert usage["p90"] == pytest.approx([13.1, 18.6])
+
+    metrics = history.query(("deviceStatus", "node1", "cpu"), 0, 100, 10, metrics=["usage"])
+    assert metrics["usage"]["count"] == []
+    assert sorted(metrics) == ["usage"]
+
+    with pytest.raises(ValueError):
+        history.query(("deviceStatus", "node1", "cpu"), 0, 100000, 1)
+    for start, end, step in ((float("nan"), 100, 10), (0, float("inf"), 10), (0, 100, float("nan"))):
+        with pytest.raises(ValueError):
+            history.query(("deviceStatus", "node1", "cpu"), start, end, step)
+
+def test_sampler():
+
+    application = Application()
+    reports = {"cpu": (100.0, {"usage": 10}), "disk": (100.0, {"usage": 50})}
+
+    @gen.coroutine
+    def getCalls(context):
+        raise gen.Return(dict(
+            (("deviceSample", "node1", device), (reports.get, device))
+            for device in sorted(reports)
+        ))
+
+    sampler = HistorySampler(application, getCalls, interval=10)
+    try:
+        IOLoop.current().run_sync(sampler.sample)
+        # only the cpu reported again, the disk sample is not repeated
+        reports["cpu"] = (110.0, {"usage": 20})
+        IOLoop.current().run_sync(sampler.sample)
+    finally:
+        application.statusCollector.shutdown()
+
+    metrics = application.metricHistory.query(("deviceSample", "node1", "cpu"), 0, 200, 100)
+    assert metrics["usage"]["count"] == [2]
+    metrics = application.metricHistory.query(("deviceSample", "node1", "disk"), 0, 200, 100)
+    assert metrics["usage"]["count"] == [1]
+    assert metrics["usage"]["timestamp"] == [100.0]
@@ -0,0 +1,94 @@
+import time
+
+import pytest
+from tornado import gen
+from tornado.ioloop import IOLoop
+
+from c4.rest.server import (Job,
+                            JobManager,
+                            JobStoreFull,
+                            SharedResponseStore)
+
+
+@gen.coroutine
+def sleeping(context, seconds):
+    yield gen.sleep(seconds)
+    raise gen.Return({"slept": seconds})
+
+@gen.coroutine
+def failing(context):
+    raise ValueError("backend locked")
+
+def test_jobs():
+
+    manager = JobManager(None, maxConcurrent=1)
+
+    @gen.coroutine
+    def run():
+        first = manager.submit("sleep", sleeping, 0.1)
+        second = manager.submit("sleep", sleeping, 0.1)
+        failed = manager.submit("fail", failing)
+        yield gen.moment
+        # only one job runs at a time
+        assert manager.get(first.id)["state"] == Job.RUNNING
+        assert manager.get(second.id)["state"] == Job.PENDING
+
+        information = yield manager.wait(second.id, 5)
+        assert information["state"] == Job.DONE
+        assert information["result"] == {"slept": 0.1}
+        assert manager.get(first.id)["finished"] <= information["started"]
+
+        information = yield manager.wait(failed.id, 5)
+        assert information["state"] == Job.FAILED
+        assert information["error"] == "backend locked"
+
+        assert manager.get("unknown") is None
+    IOLoop.current().run_sync(run)
+
+def test_bounded_store(monkeypatch):
+
+    manager = JobManager(None, maxJobs=2, ttl=10)
+
+    @gen.coroutine
+    def run():
+        first = manager.submit("sleep", sleeping, 0)
+        second = manager.submit("sleep", sleeping, 1)
+        yield first.done
+        # oldest finished job makes room
+        third = manager.submit("sleep", sleeping, 1)
+        assert manager.get(first.id) is None
+        with pytest.raises(JobStoreFull):
+            manager.submit("sleep", sleeping, 0)
+
+        yield [second.done, third.done]
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 11)
+        # expired jobs are neither served nor kept when no job is submitted
+        assert manager.get(second.id) is None
+        assert len(manager) == 0
+    IOLoop.current().run_sync(run)
+
+@gen.coroutine
+def large(context):
+    raise gen.Return("x" * 2048)
+
+def test_shared_jobs(request, tmpdir):
+
+    store = SharedResponseStore(str(tmpdir.join("responses.jobs")), slots=4, slotSize=1024)
+    request.addfinalizer(store.close)
+    manager = JobManager(None, sharedStore=store)
+    otherManager = JobManager(None, sharedStore=store)
+
+    @gen.coroutine
+    def run():
+        job = manager.submit("large", large)
+        yield job.done
+        # other workers see that the job finished even if its result does not fit
+        information = otherManager.get(job.id)
+        assert information["state"] == Job.DONE
+        assert information["result"] is None
+        assert "too large" in information["error"]
+
+        manager.remove(job.id)
+        assert otherManager.get(job.id) is None
+    IOLoop.current().run_sync(run)
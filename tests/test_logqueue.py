@@ -0,0 +1,65 @@
+import logging
+import threading
+
+from c4.rest.server import AsyncLogHandler
+
+
+class BlockingHandler(logging.Handler):
+    """
+    Handler that blocks until released, e.g., like a stalled disk
+    """
+    def __init__(self):
+        super(BlockingHandler, self).__init__()
+        self.blocked = threading.Event()
+        self.released = threading.Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.blocked.set()
+        self.released.wait()
+        self.messages.append((record.levelno, record.getMessage()))
+
+def createRecord(name, level, message, *args):
+    return logging.LogRecord(name, level, __file__, 1, message, args, None)
+
+def test_sampling():
+
+    handler = BlockingHandler()
+    handler.released.set()
+    asyncHandler = AsyncLogHandler([handler], accessLogSampleRate=0)
+    asyncHandler.start()
+    asyncHandler.handle(createRecord("tornado.access", logging.INFO, "200 GET /api"))
+    asyncHandler.handle(createRecord("tornado.access", logging.ERROR, "500 GET /api"))
+    asyncHandler.handle(createRecord("c4.rest", logging.INFO, "started %s", "server"))
+    asyncHandler.close()
+
+    assert asyncHandler.sampled == 1
+    assert handler.messages == [(logging.ERROR, "500 GET /api"), (logging.INFO, "started server")]
+
+def test_overload():
+
+    handler = BlockingHandler()
+    asyncHandler = AsyncLogHandler([handler], queueSize=2)
+    asyncHandler.start()
+    try:
+        # first record blocks the writer, the next two fill the queue
+        asyncHandler.handle(createRecord("tornado.access", logging.INFO, "request 0"))
+        assert handler.blocked.wait(5)
+        for index in range(1, 10):
+            asyncHandler.handle(createRecord("tornado.access", logging.INFO, "request %d", index))
+        # client errors are logged as warnings but are access log lines as well
+        asyncHandler.handle(createRecord("tornado.access", logging.WARNING, "404 GET /api"))
+        assert asyncHandler.dropped == 8
+
+        # errors are queued beyond the limit without blocking
+        for index in range(3):
+            asyncHandler.handle(createRecord("c4.rest", logging.ERROR, "failed %d", index))
+        assert asyncHandler.dropped == 8
+    finally:
+        handler.released.set()
+    asyncHandler.close()
+
+    levels = [level for level, _ in handler.messages]
+    assert levels.count(logging.ERROR) == 3
+    assert levels.count(logging.INFO) == 3
+    assert any("dropped" in message for level, message in handler.messages if level == logging.WARNING)
@@ -0,0 +1,43 @@
+import pytest
+
+from c4.rest.server import RouteTrie
+
+
+@pytest.fixture
+def routes():
+    routes = RouteTrie()
+    for path in ["/api", "/api/", "/api/nodes", "/api/nodes/", "/api/nodes/changes",
+                 "/api/nodes/{node}", "/api/nodes/{node}/devices/{device}", "/api/nodes/{node}/devices/{device}/status"]:
+        routes.add(path, path)
+    return routes
+
+def test_static(routes):
+
+    assert routes.match("/api") == ("/api", {})
+    assert routes.match("/api/") == ("/api/", {})
+    assert routes.match("/api/nodes/") == ("/api/nodes/", {})
+    assert routes.match("/unknown") is None
+
+def test_parameters(routes):
+
+    assert routes.match("/api/nodes/node1") == ("/api/nodes/{node}", {"node": b"node1"})
+    assert routes.match("/api/nodes/node1/devices/cpu/status") == (
+        "/api/nodes/{node}/devices/{device}/status", {"node": b"node1", "device": b"cpu"})
+    assert routes.match("/api/nodes/node%201") == ("/api/nodes/{node}", {"node": b"node 1"})
+    # parameters do not match empty segments
+    assert routes.match("/api/nodes//devices/cpu") is None
+    assert routes.match("/api/nodes/node1/devices") is None
+
+def test_staticTakesPrecedence(routes):
+
+    assert routes.match("/api/nodes/changes") == ("/api/nodes/changes", {})
+    # falls back to the parameter if the static branch does not match
+    assert routes.match("/api/nodes/changes/devices/cpu") == (
+        "/api/nodes/{node}/devices/{device}", {"node": b"changes", "device": b"cpu"})
+
+def test_conflicts(routes):
+
+    with pytest.raises(ValueError):
+        routes.add("/api/nodes", "duplicate")
+    with pytest.raises(ValueError):
+        routes.add("/api/nodes/{name}/info", "conflicting parameter")
@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+
+import pytest
+
+from c4.rest.server import SharedResponseStore
+from c4.rest.server.sharedcache import getRuntimeDirectory
+
+
+@pytest.fixture
+def store(request, tmpdir):
+    store = SharedResponseStore(str(tmpdir.join("responses.cache")), slots=4, slotSize=1024)
+    request.addfinalizer(store.close)
+    return store
+
+def test_putAndGet(store):
+
+    assert store.get(("nodes", False)) is None
+
+    version = store.put(("nodes", False), b"nodes")
+    value, storedVersion, _ = store.get(("nodes", False))
+    assert value == b"nodes"
+    assert storedVersion == version
+
+    assert store.get(("nodes", False), newerThan=version) is None
+    newVersion = store.put(("nodes", False), b"updated nodes")
+    assert newVersion > version
+    assert store.get(("nodes", False), newerThan=version)[0] == b"updated nodes"
+
+def test_valueTooLarge(store):
+
+    assert store.put(("large",), b"x" * 2048) is None
+    assert store.get(("large",)) is None
+
+def test_evictsOldest(store):
+
+    for index in range(5):
+        store.put(("key", index), str(index).encode("ascii"), created=index + 1)
+    assert store.get(("key", 0)) is None
+    for index in range(1, 5):
+        assert store.get(("key", index))[0] == str(index).encode("ascii")
+
+def test_invalidate(store):
+
+    store.put(("nodes", False), b"nodes")
+    store.invalidate()
+    assert store.get(("nodes", False)) is None
+    assert len(store) == 0
+
+def test_len(store):
+
+    assert len(store) == 0
+    store.put(("nodes", False), b"nodes")
+    store.put(("nodes", True), b"nodes")
+    store.put(("nodes", True), b"updated nodes")
+    assert len(store) == 2
+    store.delete(("nodes", False))
+    assert len(store) == 1
+
+def test_delete(store):
+
+    store.put(("job", "1"), b"first")
+    store.put(("job", "2"), b"second")
+    assert store.delete(("job", "1"))
+    assert not store.delete(("job", "1"))
+    assert store.get(("job", "1")) is None
+    assert store.get(("job", "2"))[0] == b"second"
+
+def test_claim(store):
+
+    store.put(("nodes", False), b"nodes")
+    assert store.claim(("nodes", False), 60)
+    assert not store.claim(("nodes", False), 60)
+    # publishing a new version releases the claim
+    store.put(("nodes", False), b"updated nodes")
+    assert store.claim(("nodes", False), 60)
+
+    # keys that are not stored can be claimed as well
+    assert store.claim(("nodes", True), 60)
+    assert not store.claim(("nodes", True), 60)
+    assert store.get(("nodes", True)) is None
+    assert len(store) == 1
+
+def test_sharedAcrossProcesses(store):
+
+    def publish():
+        store.put(("nodes", False), b"from worker")
+        os._exit(0)
+
+    process = multiprocessing.Process(target=publish)
+    process.start()
+    process.join()
+
+    assert store.get(("nodes", False))[0] == b"from worker"
+
+def test_concurrentReads(store):
+
+    values = {b"a"[0]: b"a" * 100, b"b"[0]: b"b" * 1000}
+    stop = multiprocessing.Event()
+
+    def publish():
+        while not stop.is_set():
+            for value in values.values():
+                store.put(("nodes", False), value)
+        os._exit(0)
+
+    process = multiprocessing.Process(target=publish)
+    process.start()
+    try:
+        reads = 0
+        while reads < 20000:
+            shared = store.get(("nodes", False))
+            if shared is not None:
+                # torn reads would mix the length of one value with another
+                assert shared[0] == values[shared[0][0]]
+                reads += 1
+    finally:
+        stop.set()
+        process.join()
+
+def test_privateFiles(tmpdir, monkeypatch):
+
+    # files other users can access or symbolic links they could have placed are refused
+    path = tmpdir.join("public.cache")
+    path.write("")
+    path.chmod(0o644)
+    with pytest.raises(ValueError):
+        SharedResponseStore(str(path), slots=4, slotSize=1024)
+    link = tmpdir.join("link.cache")
+    link.mksymlinkto(tmpdir.join("target.cache"))
+    with pytest.raises(OSError):
+        SharedResponseStore(str(link), slots=4, slotSize=1024)
+    assert not tmpdir.join("target.cache").exists()
+
+    directory = tmpdir.join("runtime")
+    directory.mkdir()
+    directory.chmod(0o755)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(directory))
+    with pytest.raises(ValueError):
+        getRuntimeDirectory()
+    directory.chmod(0o700)
+    assert getRuntimeDirectory() == str(directory)
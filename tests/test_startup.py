@@ -0,0 +1,41 @@
+import os
+import time
+
+import pytest
+from tornado.httpclient import HTTPClient
+from tornado.netutil import bind_sockets
+
+from c4.rest.server import RestServerProcess
+
+
+# seconds from starting the REST server process until the first request is served,
+# wall-clock budgets are unreliable on loaded machines so the test only runs if one is set
+STARTUP_BUDGET = os.environ.get("C4_REST_STARTUP_BUDGET")
+
+@pytest.mark.skipif(STARTUP_BUDGET is None, reason="C4_REST_STARTUP_BUDGET is not set")
+def test_startupTime():
+
+    budget = float(STARTUP_BUDGET)
+    sockets = bind_sockets(0, "127.0.0.1")
+    url = "http://127.0.0.1:{0}/api/health".format(sockets[0].getsockname()[1])
+    client = HTTPClient()
+
+    process = RestServerProcess("node1", sockets=sockets)
+    start = time.time()
+    process.start()
+    try:
+        while True:
+            try:
+                assert client.fetch(url, request_timeout=budget).code == 200
+                break
+            except IOError:
+                assert time.time() - start < budget
+                time.sleep(0.01)
+        startupTime = time.time() - start
+        assert startupTime < budget
+        assert 0 < process.startupTime.value <= startupTime
+    finally:
+        process.terminate()
+        process.join()
+        for listeningSocket in sockets:
+            listeningSocket.close()
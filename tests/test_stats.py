@@ -0,0 +1,46 @@
+import multiprocessing
+import os
+
+from c4.rest.server.stats import (ServerStatistics,
+                                  getPercentile)
+
+
+def test_getPercentile():
+
+    histogram = [0] * 13
+    assert getPercentile(histogram, 0.5) is None
+    # 90 requests below 1ms, 10 requests below 100ms
+    histogram[0] = 90
+    histogram[6] = 10
+    assert getPercentile(histogram, 0.5) == 0.001
+    assert getPercentile(histogram, 0.99) == 0.1
+
+def test_snapshot():
+
+    statistics = ServerStatistics(workers=2)
+
+    def work(workerId):
+        statistics.setWorker(workerId)
+        statistics.connectionOpened()
+        for _ in range(10):
+            statistics.recordRequest(0.0005)
+        statistics.recordCacheHit()
+        statistics.recordCacheMiss()
+        os._exit(0)
+
+    statistics.snapshot()
+    processes = [multiprocessing.Process(target=work, args=(workerId,)) for workerId in range(2)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    snapshot = statistics.snapshot()
+    assert snapshot["requests"] == 20
+    assert snapshot["requestRate"] > 0
+    assert snapshot["latencyP99"] == 0.001
+    assert snapshot["openConnections"] == 2
+    assert snapshot["cacheHitRatio"] == 0.5
+
+    # percentiles only cover requests since the previous snapshot
+    assert statistics.snapshot()["latencyP50"] is None
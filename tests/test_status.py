@@ -0,0 +1,69 @@
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tornado.ioloop import IOLoop
+
+from c4.rest.server import StatusCollector
+
+
+@pytest.fixture
+def executor(request):
+    executor = ThreadPoolExecutor(4)
+    request.addfinalizer(lambda: executor.shutdown(wait=False))
+    return executor
+
+def test_collects_concurrently(executor):
+
+    collector = StatusCollector(executor, timeout=2.0)
+    calls = dict(
+        (("deviceStatus", "node1", device), (time.sleep, 0.2))
+        for device in ("cpu", "disk", "memory")
+    )
+
+    start = time.time()
+    results = IOLoop.current().run_sync(lambda: collector.collectAll(calls))
+    assert time.time() - start < 0.5
+    assert sorted(results) == sorted(calls)
+    assert all(result == (None, None, None) for result in results.values())
+
+def test_timeout_serves_latest(executor):
+
+    collector = StatusCollector(executor, timeout=0.1)
+    release = threading.Event()
+    cpu = ("deviceStatus", "node1", "cpu")
+    disk = ("deviceStatus", "node1", "disk")
+
+    value, age = IOLoop.current().run_sync(lambda: collector.collect(cpu, lambda: {"load": 1}))
+    assert value == {"load": 1}
+    assert age is None
+
+    # a single slow target only affects its own result
+    try:
+        results = IOLoop.current().run_sync(lambda: collector.collectAll({
+            cpu: (release.wait,),
+            disk: (release.wait,),
+            ("deviceStatus", "node1", "memory"): (lambda: {"usage": 10},)
+        }))
+    finally:
+        release.set()
+    assert results[cpu][0] == {"load": 1}
+    assert results[cpu][1] >= 0
+    assert results[disk][0] is None
+    assert results[disk][2]
+    assert results[("deviceStatus", "node1", "memory")] == ({"usage": 10}, None, None)
+
+def test_timeout_starts_with_call():
+
+    # more targets than threads, later calls wait for a thread without timing out
+    collector = StatusCollector(timeout=0.3, maxWorkers=2)
+    calls = dict(
+        (("deviceStatus", "node1", "disk{0}".format(index)), (time.sleep, 0.2))
+        for index in range(6)
+    )
+    try:
+        results = IOLoop.current().run_sync(lambda: collector.collectAll(calls))
+    finally:
+        collector.shutdown()
+    assert all(result == (None, None, None) for result in results.values())
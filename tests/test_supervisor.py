@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from c4.devices.rest import RESTServer as RESTServerDeviceManager, RESTServerSupervisor
+from c4.rest.server import RestServerProcess
+from c4.system.configuration import States
+
+
+class Process(object):
+
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.flushed = 0
+
+    def is_alive(self):
+        return self.alive
+
+    def flushChanges(self):
+        self.flushed += 1
+
+class RESTServer(object):
+
+    def __init__(self):
+        self.properties = {"port": 8888}
+        self.restServerProcess = Process()
+        self.state = States.RUNNING
+        self.recoveries = 0
+
+    def recover(self):
+        self.recoveries += 1
+        self.restServerProcess = Process()
+
+@pytest.fixture
+def restServer():
+    return RESTServer()
+
+def test_healthy(restServer, monkeypatch):
+
+    supervisor = RESTServerSupervisor(restServer)
+    monkeypatch.setattr(supervisor, "probe", lambda: 0.01)
+    supervisor.check()
+    assert supervisor.probeLatency == 0.01
+    assert restServer.recoveries == 0
+
+def test_restartsWedgedServer(restServer, monkeypatch):
+
+    supervisor = RESTServerSupervisor(restServer, failureThreshold=2, initialBackoff=60)
+    monkeypatch.setattr(supervisor, "probe", lambda: None)
+    supervisor.check()
+    assert restServer.recoveries == 0
+    supervisor.check()
+    assert restServer.recoveries == 1
+    assert supervisor.backoff == 120
+
+    # backing off before restarting again
+    supervisor.check()
+    supervisor.check()
+    assert restServer.recoveries == 1
+
+def test_restartsDeadServer(restServer):
+
+    supervisor = RESTServerSupervisor(restServer)
+    restServer.restServerProcess.alive = False
+    supervisor.check()
+    assert restServer.recoveries == 1
+    assert supervisor.restarts == 1
+
+def test_changesToWedgedWorker(monkeypatch):
+
+    restServer = RESTServerDeviceManager("node1", "rest")
+    process = RestServerProcess("node1", workers=2)
+    monkeypatch.setattr(process, "is_alive", lambda: True)
+    restServer.restServerProcess = process
+    receiver = process.changePipes[1][0]
+
+    def notify():
+        # worker 1 stopped reading, worker 0 reads its changes
+        for version in range(5000):
+            restServer.handleConfigurationChanged({"version": version}, None)
+            while process.changePipes[0][0].poll():
+                process.changePipes[0][0].recv()
+    notifier = threading.Thread(target=notify)
+    notifier.daemon = True
+    notifier.start()
+    notifier.join(30)
+    assert not notifier.is_alive()
+    assert 1 in process.missedChanges
+    assert 0 not in process.missedChanges
+    # the device manager is not held up
+    assert restServer.processLock.acquire(False)
+    restServer.processLock.release()
+
+    # once the worker reads again it gets a single change for all dropped ones
+    versions = []
+    while receiver.poll():
+        versions.append(receiver.recv()["version"])
+    assert versions == list(range(len(versions)))
+    process.flushChanges()
+    assert receiver.recv()["version"] == 4999
+    assert not receiver.poll()
+    assert not process.missedChanges
@@ -0,0 +1,48 @@
+import os
+import ssl
+import subprocess
+
+import pytest
+
+from c4.rest.server.tls import (CertificateReloader,
+                                createSSLContext)
+
+
+def generateCertificate(directory, name):
+    certfile = str(directory.join(name + ".pem"))
+    keyfile = str(directory.join(name + ".key"))
+    subprocess.check_call(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+                           "-subj", "/CN=" + name, "-days", "1",
+                           "-keyout", keyfile, "-out", certfile],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return certfile, keyfile
+
+@pytest.fixture
+def certificate(tmpdir):
+    try:
+        return generateCertificate(tmpdir, "localhost")
+    except OSError:
+        pytest.skip("openssl is not available")
+
+def test_createSSLContext(certificate):
+
+    context = createSSLContext(*certificate, sessionTickets=False)
+    assert context.options & ssl.OP_NO_TICKET
+    assert context.options & ssl.OP_NO_COMPRESSION
+
+def test_reload(tmpdir, certificate):
+
+    certfile, keyfile = certificate
+    context = createSSLContext(certfile, keyfile)
+    reloader = CertificateReloader(context, certfile, keyfile)
+    initialStates = reloader.fileStates
+
+    # a key that does not match the certificate must not be loaded
+    otherCertfile, otherKeyfile = generateCertificate(tmpdir, "other")
+    os.rename(otherKeyfile, keyfile)
+    reloader.check()
+    assert reloader.fileStates == initialStates
+
+    os.rename(otherCertfile, certfile)
+    reloader.check()
+    assert reloader.fileStates != initialStates
@@ -0,0 +1,219 @@
+import json
+import os
+import stat
+import time
+
+import pytest
+from tornado import gen
+from tornado.httpclient import AsyncHTTPClient, HTTPClient
+from tornado.httpserver import HTTPServer
+from tornado.httputil import HTTPServerRequest
+from tornado.ioloop import IOLoop
+from tornado.iostream import StreamClosedError
+from tornado.netutil import bind_sockets
+from tornado.tcpclient import TCPClient
+from tornado.web import Application
+
+from c4.rest.server import (BaseRequestHandler,
+                            RestApplication,
+                            RestServer,
+                            RestServerProcess,
+                            RestServerThread,
+                            bindUnixSocket,
+                            getRouteMap)
+from c4.rest.server.stats import ServerStatistics
+from c4.rest.server.tornadoserver import LazyRequestHandler
+
+
+def test_bindUnixSocket(tmpdir):
+
+    path = str(tmpdir.join("rest.sock"))
+    unixSocket = bindUnixSocket(path, mode="0660")
+    try:
+        assert stat.S_ISSOCK(os.stat(path).st_mode)
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o660
+    finally:
+        unixSocket.close()
+
+def test_handOverSockets():
+
+    sockets = bind_sockets(0, "127.0.0.1")
+    port = sockets[0].getsockname()[1]
+    client = HTTPClient()
+
+    oldProcess = RestServerProcess("node1", sockets=sockets)
+    oldProcess.start()
+    assert oldProcess.ready.wait(10)
+    assert client.fetch("http://127.0.0.1:{0}/api".format(port)).code == 200
+
+    newProcess = RestServerProcess("node1", sockets=sockets)
+    newProcess.start()
+    assert newProcess.ready.wait(10)
+
+    # old process drains and exits while the new one keeps serving
+    oldProcess.terminate()
+    oldProcess.join()
+    assert oldProcess.exitcode == 0
+    assert client.fetch("http://127.0.0.1:{0}/api".format(port)).code == 200
+
+    newProcess.terminate()
+    newProcess.join()
+    for listeningSocket in sockets:
+        listeningSocket.close()
+
+def test_processStores(tmpdir):
+
+    process = RestServerProcess("node1", workers=2, cache={"directory": str(tmpdir)}, jobs={"maxJobs": 2, "slotSize": 1024})
+    oldStore = process.createJobStore()
+    oldStore.put(("job", "1"), b"running")
+    # the process started on restart gets its own store, the old one keeps its jobs
+    newStore = process.createJobStore()
+    assert newStore.slots == 4
+    assert newStore.get(("job", "1")) is None
+    assert oldStore.get(("job", "1"))[0] == b"running"
+    assert tmpdir.listdir() == []
+    for store in (oldStore, newStore):
+        store.close()
+
+class Connection(object):
+
+    def set_close_callback(self, callback):
+        pass
+
+class EntryPoint(object):
+
+    def __init__(self, name, handlerClass):
+        self.name = name
+        self.handlerClass = handlerClass
+        self.loaded = 0
+
+    def load(self):
+        self.loaded += 1
+        return self.handlerClass
+
+class PluginHandler(BaseRequestHandler):
+
+    def get(self):
+        self.write({"plugin": True})
+
+def test_lazyPluginRoutes(monkeypatch):
+
+    entryPoint = EntryPoint("/api/plugin", PluginHandler)
+    monkeypatch.setattr("c4.rest.server.tornadoserver.iterEntryPoints", lambda group: [entryPoint])
+
+    routeMap = getRouteMap(refresh=True)
+    try:
+        handler = routeMap["/api/plugin"]
+        assert issubclass(handler, LazyRequestHandler)
+        assert entryPoint.loaded == 0
+
+        application = Application([("/api/plugin", handler, dict(node="node1"))])
+        request = HTTPServerRequest(method="GET", uri="/api/plugin", connection=Connection())
+        assert isinstance(handler(application, request, node="node1"), PluginHandler)
+        assert isinstance(handler(application, request, node="node1"), PluginHandler)
+        assert entryPoint.loaded == 1
+    finally:
+        monkeypatch.undo()
+        getRouteMap(refresh=True)
+
+class NodeDeviceHandler(BaseRequestHandler):
+
+    def get(self, node, device):
+        self.write({"node": node, "device": device})
+
+def test_parameterizedRoutes():
+
+    application = RestApplication(handlers=[
+        ("/api/nodes/{node}/devices/{device}", NodeDeviceHandler, dict(node="node1"))
+    ])
+    application.activeRequests = 0
+    application.statistics = ServerStatistics()
+    sockets = bind_sockets(0, "127.0.0.1")
+    server = HTTPServer(application)
+    server.add_sockets(sockets)
+    url = "http://127.0.0.1:{0}".format(sockets[0].getsockname()[1])
+
+    @gen.coroutine
+    def fetch():
+        client = AsyncHTTPClient()
+        response = yield client.fetch(url + "/api/nodes/node%202/devices/cpu")
+        assert json.loads(response.body.decode("utf-8")) == {"node": "node 2", "device": "cpu"}
+        response = yield client.fetch(url + "/api/nodes/node2/devices", raise_error=False)
+        assert response.code == 404
+    try:
+        IOLoop.current().run_sync(fetch)
+    finally:
+        server.stop()
+
+class SlowHandler(BaseRequestHandler):
+
+    @gen.coroutine
+    def get(self):
+        yield gen.sleep(0.2)
+        self.write({"slow": True})
+
+def test_drainClosesKeepAliveConnections():
+
+    handlers = [
+        ("/api/nodes/{node}/devices/{device}", NodeDeviceHandler, dict(node="node1")),
+        ("/api/slow", SlowHandler, dict(node="node1"))
+    ]
+    server = RestServer("node1", port=0, address="127.0.0.1", handlers=handlers, history={"interval": 0},
+                        change_log={"enabled": False}, shutdown_timeout=5)
+
+    @gen.coroutine
+    def request(stream, path):
+        yield stream.write("GET {0} HTTP/1.1\r\nHost: localhost\r\n\r\n".format(path).encode("ascii"))
+        headers = yield stream.read_until(b"\r\n\r\n")
+        length = [line for line in headers.decode("ascii").split("\r\n") if line.lower().startswith("content-length")]
+        yield stream.read_bytes(int(length[0].split(":")[1]))
+        raise gen.Return(headers)
+
+    @gen.coroutine
+    def run():
+        server.start()
+        idle = yield TCPClient().connect("127.0.0.1", server.port)
+        busy = yield TCPClient().connect("127.0.0.1", server.port)
+        yield request(idle, "/api/nodes/node1/devices/cpu")
+
+        slowRequest = request(busy, "/api/slow")
+        yield gen.sleep(0.05)
+        start = time.time()
+        yield server.stop()
+        assert time.time() - start < 1
+
+        # the request in progress is answered before its connection is closed
+        headers = yield slowRequest
+        assert headers.startswith(b"HTTP/1.1 200")
+        for stream in (idle, busy):
+            with pytest.raises(StreamClosedError):
+                yield stream.read_bytes(1)
+    IOLoop.current().run_sync(run)
+
+def test_embeddedServer():
+
+    handlers = [("/api/nodes/{node}/devices/{device}", NodeDeviceHandler, dict(node="node1"))]
+    server = RestServer("node1", port=0, address="127.0.0.1", handlers=handlers, history={"interval": 0})
+
+    @gen.coroutine
+    def run():
+        # caller-owned IOLoop
+        server.start()
+        response = yield AsyncHTTPClient().fetch("http://127.0.0.1:{0}/api/nodes/node1/devices/cpu".format(server.port))
+        assert json.loads(response.body.decode("utf-8")) == {"node": "node1", "device": "cpu"}
+        yield server.stop()
+        assert not server.tasks
+    IOLoop.current().run_sync(run)
+
+def test_serverThread():
+
+    handlers = [("/api/nodes/{node}/devices/{device}", NodeDeviceHandler, dict(node="node1"))]
+    thread = RestServerThread("node1", port=0, address="127.0.0.1", handlers=handlers, history={"interval": 0})
+    thread.start()
+    try:
+        url = "http://127.0.0.1:{0}/api/nodes/node1/devices/cpu".format(thread.server.port)
+        response = HTTPClient().fetch(url)
+        assert json.loads(response.body.decode("utf-8")) == {"node": "node1", "device": "cpu"}
+    finally:
+        thread.stop(timeout=10)
+    assert not thread.is_alive()